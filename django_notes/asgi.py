@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_notes.settings')
+# Route the note views to their native async implementations (see settings.NOTE_ASYNC_VIEWS).
+os.environ.setdefault('DJANGO_NOTES_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
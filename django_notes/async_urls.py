@@ -0,0 +1,9 @@
+"""
+URL configuration with the note list/detail/add/edit/delete paths served by native async views.
+
+``django_notes.urls`` uses it when ``settings.NOTE_ASYNC_VIEWS`` is on; tests and benchmarks
+point ROOT_URLCONF here directly.
+"""
+from .urls import build_urlpatterns
+
+urlpatterns = build_urlpatterns('note.async_urls')
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,7 +45,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'note.middleware.MetricsMiddleware',
+    'note.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'note.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -55,13 +59,23 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'django_notes.urls'
 
+# Serve the note list/detail/add/edit/delete paths with the native async views in
+# note/async_views.py. django_notes/asgi.py turns this on; WSGI keeps the sync views.
+NOTE_ASYNC_VIEWS = os.environ.get('DJANGO_NOTES_ASYNC_VIEWS', '0') == '1'
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [BASE_DIR / 'templates']
-        ,
-        'APP_DIRS': True,
+        'BACKEND': 'note.metrics.InstrumentedDjangoTemplates',
+        'DIRS': [BASE_DIR / 'templates'],
         'OPTIONS': {
+            # Compiled templates are kept in memory whatever DEBUG is; the development
+            # server's autoreloader still resets them when a template file changes.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -82,9 +96,92 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests (seconds, 0 closes after each request)
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_NOTES_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Read replicas: DJANGO_NOTES_SQLITE_REPLICAS=/path/replica1.sqlite3,/path/replica2.sqlite3 adds
+# aliases replica_1, replica_2, ... (refresh local copies with `manage.py sync_sqlite_replicas`).
+# Any replica alias works, e.g. PostgreSQL streaming replicas configured by hand.
+for number, path in enumerate(filter(None, os.environ.get('DJANGO_NOTES_SQLITE_REPLICAS', '').split(',')), 1):
+    DATABASES['replica_{}'.format(number)] = dict(DATABASES['default'], NAME=path, TEST={'MIRROR': 'default'})
+
+# Aliases the GET side of the list, detail, edit and delete views read notes from (see note/routers.py)
+NOTE_DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# After a write, the client reads from the primary for this many seconds
+NOTE_REPLICA_STICKY_SECONDS = 10
+
+DATABASE_ROUTERS = ['note.routers.PrimaryReplicaRouter']
+
+# Overrides of the pragmas run on every new SQLite connection (note.db.DEFAULT_SQLITE_PRAGMAS),
+# e.g. {'busy_timeout': 10000}; a pragma set to None is skipped, None disables the tuning.
+NOTE_SQLITE_PRAGMAS = {}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Any backend works for the note fragment cache, e.g. FileBasedCache or
+# 'django.core.cache.backends.redis.RedisCache' with 'LOCATION': 'redis://127.0.0.1:6379'.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Cache alias and timeout (seconds, 0 disables) of the per-user note list/detail fragments
+NOTE_CACHE_ALIAS = 'default'
+NOTE_FRAGMENT_CACHE_TIMEOUT = 600
+
+# Sessions are read from the cache (written through to the database); set
+# DJANGO_NOTES_SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies to keep
+# them in the client's cookie instead.
+SESSION_ENGINE = os.environ.get('DJANGO_NOTES_SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+
+# The logged-in user of a session is cached for this many seconds (0 disables), see note/auth.py
+AUTHENTICATION_BACKENDS = ['note.auth.CachedModelBackend']
+NOTE_USER_CACHE_TIMEOUT = 60
+
+# Token buckets for login and signup POSTs, (capacity, tokens refilled per minute) per
+# client IP and per submitted username; see note/throttle.py. Use
+# 'note.throttle.CacheBucketStore' to share the buckets between worker processes.
+NOTE_THROTTLE_RATES = {
+    'ip': (20, 10),
+    'username': (5, 2),
+}
+NOTE_THROTTLE_STORE = 'note.throttle.LocalBucketStore'
+
+# Maximum number of notes per JSON API batch request
+NOTE_API_MAX_BATCH = 100
+
+# Note revisions are deltas against the previous one; every Nth revision is a full snapshot
+NOTE_REVISION_SNAPSHOT_EVERY = 20
+
+# Background jobs (note.jobs, run by `manage.py run_workers`): a failed job is retried after
+# NOTE_JOB_RETRY_DELAY * 2 ** (attempt - 1) seconds; a running job whose worker has not renewed
+# its lease for NOTE_JOB_LEASE_SECONDS is queued again. NOTE_JOB_CONCURRENCY caps the jobs of a
+# task running at once per worker command, e.g. {'export_notes': 2}, over the task's own default.
+NOTE_JOB_RETRY_DELAY = 10
+NOTE_JOB_LEASE_SECONDS = 60
+NOTE_JOB_CONCURRENCY = {}
+# Notes read or deleted per query/transaction by the job tasks
+NOTE_JOB_CHUNK_SIZE = 500
+# Export jobs and their files are deleted by `manage.py run_workers` this long after finishing
+NOTE_EXPORT_EXPIRY_HOURS = 24
+
+# Deleted notes stay in the trash for NOTE_TRASH_DAYS, then `manage.py purge_trash` deletes them
+# a chunk at a time, sleeping NOTE_PURGE_PAUSE seconds between chunks so other writers get in.
+NOTE_TRASH_DAYS = 30
+NOTE_PURGE_PAUSE = 0.1
+
+# Request metrics served in Prometheus format on /metrics/ to staff users, or to scrapers
+# sending "Authorization: Bearer <NOTE_METRICS_TOKEN>" (empty disables token access).
+# A sample rate below 1 measures only that fraction of requests.
+NOTE_METRICS_TOKEN = os.environ.get('DJANGO_NOTES_METRICS_TOKEN', '')
+NOTE_METRICS_SAMPLE_RATE = float(os.environ.get('DJANGO_NOTES_METRICS_SAMPLE_RATE', '1.0'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -121,6 +218,23 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = 'static/'
+# `manage.py collectstatic` writes content-hashed copies with .gz (and, with the brotli
+# package installed, .br) variants here; note.middleware.StaticFilesMiddleware serves them.
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+# Seconds browsers may cache static files without a hashed name
+NOTE_STATIC_MAX_AGE = 60
+
+# Uploaded and generated files, e.g. background note exports
+MEDIA_ROOT = BASE_DIR / 'media'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'note.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -14,10 +14,19 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 
-urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('', include('note.urls', namespace='note')),
-]
+from note.metrics import MetricsView
+
+
+def build_urlpatterns(note_urlconf):
+    return [
+        path('admin/', admin.site.urls),
+        path('metrics/', MetricsView.as_view(), name='metrics'),
+        path('', include(note_urlconf, namespace='note')),
+    ]
+
+
+urlpatterns = build_urlpatterns('note.async_urls' if settings.NOTE_ASYNC_VIEWS else 'note.urls')
@@ -1,9 +1,272 @@
-from django.contrib import admin
+from datetime import datetime
+from functools import partial
 
-from note.models import Note
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Sum
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from django.utils.text import capfirst
+
+from note import auth, bulk, jobs, search
+from note.models import Job, Note, NoteStats
+
+
+def count_notes(queryset):
+    """COUNT of a notes queryset; for all live notes, the sum of the users' maintained counts."""
+    if queryset.query.where != Note.objects.all().query.where:
+        return queryset.count()
+    return NoteStats.objects.using(queryset.db).aggregate(total=Sum('note_count'))['total'] or 0
+
+
+class NotePaginator(Paginator):
+    @cached_property
+    def count(self):
+        return count_notes(self.object_list)
+
+
+class NoteActionForm(helpers.ActionForm):
+    author = forms.CharField(required=False, label='New author (username):')
+
+
+class AuthorFilter(admin.SimpleListFilter):
+    """
+    Filter on ``?author=<user id>`` (the author column links to it). Only the selected
+    author is offered as a choice: a list of every user would not scale.
+    """
+    title = 'author'
+    parameter_name = 'author'
+
+    def lookups(self, request, model_admin):
+        value = self.value()
+        if value and value.isdigit():
+            return [(user.pk, user.get_username()) for user in User.objects.filter(pk=value)]
+        return []
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value is None:
+            return queryset
+        # The per-author changelist reads note_author_created_id_idx in order.
+        return queryset.filter(author_id=value) if value.isdigit() else queryset.none()
+
+
+class CreatedFilter(admin.SimpleListFilter):
+    """
+    Year and month of creation, replacing ``date_hierarchy``: its links come from the
+    distinct truncated dates of every note, a full scan on SQLite. The years here span the
+    oldest and newest note, two reads at the ends of note_created_id_idx, and the selected
+    range is an index range read too.
+    """
+    title = 'created'
+    parameter_name = 'created'
+
+    def lookups(self, request, model_admin):
+        live = model_admin.get_queryset(request).order_by('created').values_list('created', flat=True)
+        # ORDER BY created LIMIT 1 each way, both answered from the ends of the index.
+        first, last = live.first(), live.reverse().first()
+        if first is None:
+            return []
+        first, last = timezone.localtime(first), timezone.localtime(last)
+        selected = self.get_range()
+        choices = []
+        for year in range(last.year, first.year - 1, -1):
+            choices.append((str(year), str(year)))
+            if selected and selected[0].year == year:
+                months = range(first.month if year == first.year else 1, (last.month if year == last.year else 12) + 1)
+                choices += [('{}-{:02d}'.format(year, month),) * 2 for month in months]
+        return choices
+
+    def get_range(self):
+        """``(start, end)`` of the selected year or month, or None."""
+        try:
+            parts = [int(part) for part in (self.value() or '').split('-')]
+            if len(parts) == 1:
+                start = timezone.make_aware(datetime(parts[0], 1, 1))
+                return start, start.replace(year=parts[0] + 1)
+            if len(parts) == 2:
+                start = timezone.make_aware(datetime(parts[0], parts[1], 1))
+                year, month = divmod(parts[1], 12)
+                return start, start.replace(year=parts[0] + year, month=month + 1)
+        except ValueError:
+            pass
+        return None
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        selected = self.get_range()
+        if selected is None:
+            return queryset.none()
+        return queryset.filter(created__gte=selected[0], created__lt=selected[1])
+
+
+class NoteChangeList(ChangeList):
+    def get_queryset(self, request):
+        # The changelist never shows note bodies; the change form still loads them, for
+        # the revision recorded when it is saved.
+        return super().get_queryset(request).defer('content')
 
 
-# Register your models here.
 @admin.register(Note)
-class PostAdmin(admin.ModelAdmin):
-    pass
+class NoteAdmin(admin.ModelAdmin):
+    """
+    Changelist sized for millions of notes: no full COUNT(*), index-backed ordering and
+    filters, full-text search, and bulk actions that run set-based (see ``note.bulk``).
+    """
+    list_display = ('title', 'author_link', 'created', 'updated')
+    list_select_related = ('author',)
+    # note_created_id_idx, or note_author_created_id_idx once filtered on an author
+    sortable_by = ('created',)
+    list_filter = (AuthorFilter, CreatedFilter)
+    # Shows the search box; the terms are matched with the full-text index.
+    search_fields = ('title',)
+    show_full_result_count = False
+    paginator = NotePaginator
+    raw_id_fields = ('author',)
+    readonly_fields = ('created', 'updated')
+    action_form = NoteActionForm
+    actions = ['reassign_author', 'delete_notes']
+
+    def get_changelist(self, request, **kwargs):
+        return NoteChangeList
+
+    @admin.display(description='Author')
+    def author_link(self, note):
+        return format_html('<a href="?{}={}">{}</a>', AuthorFilter.parameter_name, note.author_id, note.author)
+
+    def get_actions(self, request):
+        # Replaced by delete_notes: delete_selected loads and signals every selected note.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search.get_backend(queryset.db).search(queryset, search_term), False
+
+    @admin.action(description='Give selected notes to the new author', permissions=['change'])
+    def reassign_author(self, request, queryset):
+        username = request.POST.get('author', '').strip()
+        try:
+            author = User.objects.get(username=username)
+        except User.DoesNotExist:
+            self.message_user(request, 'No user named "{}".'.format(username), messages.ERROR)
+            return
+        moved = bulk.reassign_notes(queryset, author)
+        self.message_user(request, 'Gave {} note(s) to {}.'.format(moved, author.get_username()))
+
+    @admin.action(description='Delete selected notes', permissions=['delete'])
+    def delete_notes(self, request, queryset):
+        if request.POST.get('post'):
+            deleted = bulk.delete_notes(queryset)
+            self.message_user(request, 'Deleted {} note(s).'.format(deleted))
+            return None
+        return TemplateResponse(request, 'admin/note/note/delete_notes_confirmation.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'count': count_notes(queryset),
+            'select_across': request.POST.get('select_across') == '1',
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'media': self.media,
+        })
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'task', 'user', 'status', 'attempts', 'created', 'finished')
+    list_filter = ('status', 'task')
+    readonly_fields = ('worker', 'lease_expires', 'result', 'error', 'finished')
+
+
+@admin.register(NoteStats)
+class NoteStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'note_count', 'content_bytes', 'last_created', 'last_updated')
+    list_select_related = ('user',)
+    readonly_fields = ('note_count', 'content_bytes', 'last_created', 'last_updated')
+
+
+class NoteUserAdmin(UserAdmin):
+    actions = ['delete_in_background']
+    # Totals from the joined NoteStats row instead of a COUNT per listed user.
+    list_display = UserAdmin.list_display + ('note_count', 'last_note_update')
+    list_select_related = ('note_stats',)
+
+    @admin.display(description='Notes', ordering='note_stats__note_count')
+    def note_count(self, user):
+        return getattr(getattr(user, 'note_stats', None), 'note_count', 0)
+
+    @admin.display(description='Last note update', ordering='note_stats__last_updated')
+    def last_note_update(self, user):
+        return getattr(getattr(user, 'note_stats', None), 'last_updated', None)
+
+    @admin.action(description='Delete selected users in the background', permissions=['delete'])
+    def delete_in_background(self, request, queryset):
+        pks = list(queryset.values_list('pk', flat=True))
+        if self.count_user_notes(pks) and not self.can_delete_notes(request):
+            self.message_user(request, 'You do not have permission to delete their notes.', messages.ERROR)
+            return
+        users = self.delete_queryset(request, queryset)
+        self.message_user(request, 'Queued the deletion of {} user(s).'.format(len(users)))
+
+    def get_deleted_objects(self, objs, request):
+        """
+        What the delete confirmation lists: the users and how many notes go with them.
+
+        The default collects the whole cascade, every note, revision and tag link, just to
+        show it. The notes are counted from NoteStats and the trash index instead.
+        """
+        users = list(objs)
+        opts = self.model._meta
+        deleted_objects = [
+            format_html('{}: <a href="{}">{}</a>', capfirst(opts.verbose_name),
+                        reverse('admin:{}_{}_change'.format(opts.app_label, opts.model_name), args=[user.pk]), user)
+            for user in users
+        ]
+        notes = self.count_user_notes([user.pk for user in users])
+        model_count = {opts.verbose_name_plural: len(users), Note._meta.verbose_name_plural: notes}
+        # As the default: the notes go with the users, so deleting them needs their permission too.
+        perms_needed = set()
+        if notes and not self.can_delete_notes(request):
+            perms_needed.add(Note._meta.verbose_name_plural)
+        return deleted_objects, model_count, perms_needed, []
+
+    def count_user_notes(self, pks):
+        live = NoteStats.objects.filter(user__in=pks).aggregate(total=Sum('note_count'))['total'] or 0
+        return live + Note.all_objects.filter(author__in=pks, deleted__isnull=False).count()
+
+    def can_delete_notes(self, request):
+        note_admin = self.admin_site._registry.get(Note)
+        return note_admin is None or note_admin.has_delete_permission(request)
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, User.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        # Not the cascade in one transaction: the delete_user job purges the notes in chunks
+        # first. Deactivated right away so they cannot log in in the meantime.
+        users = list(queryset)
+        queryset.update(is_active=False)
+        for user in users:
+            # After the admin's transaction commits, or a request in between caches them active again.
+            transaction.on_commit(partial(auth.invalidate_user, user.pk), using=queryset.db)
+            jobs.enqueue('delete_user', user_id=user.pk)
+        return users
+
+
+admin.site.unregister(User)
+admin.site.register(User, NoteUserAdmin)
@@ -0,0 +1,291 @@
+"""
+JSON API for notes under ``/api/``.
+
+Authentication is the regular session; write requests need the ``X-CSRFToken`` header
+like any form POST. Batch endpoints validate every item with the same forms as the HTML
+views and write the whole batch in one transaction with ``bulk_create``/``bulk_update``.
+``PATCH /api/notes/<pk>/`` updates one note partially, checked against its ``version``
+(see ``note.updates``). ``GET /api/jobs/<pk>/`` reports the status of a background job
+(see ``note.jobs``).
+"""
+import json
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views import View
+
+from . import bulk, search, tags, updates
+from .forms import NoteAddForm, NoteEditForm
+from .models import Job, Note
+from .pagination import KeysetPaginator
+
+FIELDS = ('id', 'title', 'content', 'created', 'updated', 'version', 'url')
+DEFAULT_FIELDS = FIELDS
+
+
+def error(message, status=400, **extra):
+    return JsonResponse(dict({'error': message}, **extra), status=status)
+
+
+def serialize(note, fields):
+    data = {}
+    for field in fields:
+        if field == 'url':
+            data['url'] = note.get_absolute_url()
+        elif field == 'id':
+            data['id'] = note.pk
+        elif field == 'version':
+            data['version'] = updates.get_version(note)
+        else:
+            data[field] = getattr(note, field)
+    return data
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.response = error(message, status, **extra)
+
+
+class ApiView(View):
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error('Authentication required', status=401)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as e:
+            return e.response
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        return error('Method not allowed', status=405)
+
+    def get_fields(self):
+        requested = self.request.GET.get('fields')
+        if not requested:
+            return DEFAULT_FIELDS
+        fields = tuple(field.strip() for field in requested.split(',') if field.strip())
+        unknown = sorted(set(fields) - set(FIELDS))
+        if unknown:
+            raise ApiError('Unknown fields: {}'.format(', '.join(unknown)))
+        return fields
+
+    @staticmethod
+    def load_fields(queryset, fields):
+        # Only read the columns that are serialized (the list never pays for unrequested bodies).
+        columns = {'id', 'created'} | {field for field in fields if field not in ('id', 'url', 'version')}
+        if 'version' in fields:
+            columns.add('updated')
+        return queryset.only(*columns)
+
+    def get_body(self):
+        try:
+            body = json.loads(self.request.body or b'null')
+        except ValueError:
+            raise ApiError('Invalid JSON body')
+        if not isinstance(body, dict):
+            raise ApiError('Expected a JSON object')
+        return body
+
+    def get_batch(self, body, key):
+        items = body.get(key)
+        if not isinstance(items, list) or not items:
+            raise ApiError('Expected a non-empty "{}" list'.format(key))
+        limit = getattr(settings, 'NOTE_API_MAX_BATCH', 100)
+        if len(items) > limit:
+            raise ApiError('At most {} items per batch'.format(limit))
+        return items
+
+
+class NoteListApiView(ApiView):
+    max_limit = 100
+
+    def get(self, request, *args, **kwargs):
+        fields = self.get_fields()
+        try:
+            limit = min(max(int(request.GET.get('limit', 25)), 1), self.max_limit)
+        except ValueError:
+            raise ApiError('limit must be an integer')
+
+        queryset = Note.objects.filter(author=request.user)
+        search_query = request.GET.get('search', '')
+        if search_query:
+            queryset = search.get_backend(queryset.db).search(queryset, search_query)
+        page = KeysetPaginator(self.load_fields(queryset, fields), limit).page(request.GET.get('cursor'))
+        return JsonResponse({
+            'results': [serialize(note, fields) for note in page],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        })
+
+
+class NoteDetailApiView(ApiView):
+    def get(self, request, *args, **kwargs):
+        fields = self.get_fields()
+        queryset = self.load_fields(Note.objects.filter(author=request.user), fields)
+        try:
+            note = queryset.get(pk=kwargs['pk'])
+        except Note.DoesNotExist:
+            return error('Not found', status=404)
+        return JsonResponse(serialize(note, fields))
+
+    def patch(self, request, *args, **kwargs):
+        """
+        Update the fields sent, or apply a text ``patch`` to the content, if the note is
+        still at ``version``. Only changed columns are written.
+        """
+        body = self.get_body()
+        try:
+            version = updates.parse_version(body.get('version'))
+        except ValueError:
+            raise ApiError('Expected the "version" the update is based on')
+        if 'content' in body and 'patch' in body:
+            raise ApiError('Send either "content" or "patch", not both')
+
+        try:
+            note = Note.objects.get(pk=kwargs['pk'], author=request.user)
+        except Note.DoesNotExist:
+            return error('Not found', status=404)
+        if note.updated != version:
+            return self.conflict(note)
+
+        data = {field: body.get(field, getattr(note, field)) for field in NoteBatchUpdateApiView.fields}
+        if 'patch' in body:
+            try:
+                data['content'] = updates.apply_patch(note.content or '', body['patch'])
+            except updates.PatchError as e:
+                raise ApiError(str(e))
+        form = NoteEditForm(data=data, instance=note)
+        if not form.is_valid():
+            return error('Validation failed', errors=form.errors.get_json_data())
+
+        try:
+            updates.save_changes(note, form.get_changed_fields(), version)
+        except updates.Conflict:
+            return self.conflict(Note.objects.filter(pk=note.pk).first())
+        return JsonResponse(serialize(note, ('id', 'title', 'updated', 'version')))
+
+    @staticmethod
+    def conflict(current):
+        if current is None:
+            return error('Not found', status=404)
+        return error('Conflict', status=409, version=updates.get_version(current))
+
+
+class NoteBatchCreateApiView(ApiView):
+    def post(self, request, *args, **kwargs):
+        items = self.get_batch(self.get_body(), 'notes')
+        notes, labels, errors = [], [], {}
+        for index, item in enumerate(items):
+            form = NoteAddForm(data=item if isinstance(item, dict) else {})
+            if form.is_valid():
+                note = form.save(commit=False)
+                note.author = request.user
+                notes.append(note)
+                if form.cleaned_data['folder'] or form.cleaned_data['tags']:
+                    labels.append((note, form.cleaned_data['folder'], form.cleaned_data['tags']))
+            else:
+                errors[index] = form.errors.get_json_data()
+        if errors:
+            return error('Validation failed', errors=errors)
+
+        with transaction.atomic():
+            notes = Note.objects.bulk_create(notes)
+            # bulk_create sets the pks on the same instances, so the labels can link them.
+            tags.notes_labelled(labels, request.user)
+            bulk.notes_created(notes)
+        return JsonResponse({'results': [serialize(note, ('id', 'title', 'url')) for note in notes]}, status=201)
+
+
+class NoteBatchUpdateApiView(ApiView):
+    fields = ('title', 'content')
+
+    def post(self, request, *args, **kwargs):
+        """
+        Update the fields sent for each note. Items with a ``version`` are only written if
+        their note is still at it; otherwise nothing is written and 409 lists the current
+        versions of the conflicting notes.
+        """
+        items = self.get_batch(self.get_body(), 'notes')
+        if not all(isinstance(item, dict) and isinstance(item.get('id'), int) for item in items):
+            raise ApiError('Every item needs an integer "id"')
+        duplicates = sorted(pk for pk, count in Counter(item['id'] for item in items).items() if count > 1)
+        if duplicates:
+            raise ApiError('Every note may only appear once', duplicates=duplicates)
+        versions = {}
+        for item in items:
+            if 'version' in item:
+                try:
+                    versions[item['id']] = updates.parse_version(item['version'])
+                except ValueError as e:
+                    raise ApiError(str(e))
+
+        try:
+            with transaction.atomic():
+                existing = Note.objects.filter(author=request.user).in_bulk([item['id'] for item in items])
+                missing = sorted({item['id'] for item in items} - set(existing))
+                if missing:
+                    return error('Not found', status=404, missing=missing)
+
+                now = timezone.now()
+                notes, errors = [], {}
+                for index, item in enumerate(items):
+                    note = existing[item['id']]
+                    # Partial update: fields that are not sent keep their stored value.
+                    data = {field: item.get(field, getattr(note, field)) for field in self.fields}
+                    form = NoteEditForm(data=data, instance=note)
+                    if form.is_valid():
+                        note.updated = now
+                        notes.append(note)
+                    else:
+                        errors[index] = form.errors.get_json_data()
+                if errors:
+                    return error('Validation failed', errors=errors)
+
+                if versions:
+                    # One UPDATE claims every versioned note still at its version; the
+                    # rows it missed were changed or trashed since.
+                    still_at = reduce(or_, (Q(pk=pk, updated=version) for pk, version in versions.items()))
+                    if Note.objects.filter(still_at).update(updated=now) != len(versions):
+                        raise updates.Conflict
+                Note.objects.bulk_update(notes, list(self.fields) + ['updated'])
+                bulk.notes_updated(notes)
+        except updates.Conflict:
+            current = Note.objects.filter(author=request.user, pk__in=versions).only('updated')
+            return error('Conflict', status=409, versions={
+                note.pk: updates.get_version(note) for note in current if note.updated != versions[note.pk]
+            })
+        return JsonResponse({'results': [serialize(note, ('id', 'title', 'updated', 'version')) for note in notes]})
+
+
+class NoteBatchDeleteApiView(ApiView):
+    def post(self, request, *args, **kwargs):
+        ids = self.get_batch(self.get_body(), 'ids')
+        if not all(isinstance(pk, int) for pk in ids):
+            raise ApiError('"ids" must be integers')
+
+        with transaction.atomic():
+            queryset = Note.objects.filter(author=request.user, pk__in=ids)
+            found = set(queryset.values_list('pk', flat=True))
+            missing = sorted(set(ids) - found)
+            if missing:
+                return error('Not found', status=404, missing=missing)
+            bulk.trash_notes(queryset)
+        return JsonResponse({'deleted': sorted(found)})
+
+
+class JobApiView(ApiView):
+    def get(self, request, *args, **kwargs):
+        try:
+            job = Job.objects.get(pk=kwargs['pk'], user=request.user)
+        except Job.DoesNotExist:
+            return error('Not found', status=404)
+        return JsonResponse({
+            'id': job.pk, 'task': job.task, 'status': job.status, 'attempts': job.attempts,
+            'result': job.result, 'finished': job.finished, 'url': job.get_absolute_url(),
+        })
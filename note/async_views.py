@@ -0,0 +1,239 @@
+"""
+Native async versions of the note list, detail, add, edit and delete views.
+
+They are routed by ``note.async_urls`` when ``settings.NOTE_ASYNC_VIEWS`` is on (the
+default under ``django_notes.asgi``), so under ASGI these paths run on the event loop
+with the async ORM instead of in a thread per request.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.db import transaction
+from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse_lazy
+from django.views import View
+
+from . import bulk, cache as note_cache, listing, routers, search, stats, tags, updates
+from .forms import NoteAddForm, NoteEditForm
+from .mixins import ReMixinLoginRequired, check_validators, get_fragment_key, set_validators, store_fragment
+from .models import Note, Tag
+from .pagination import KeysetPaginator
+
+
+async def aget_request_user(request):
+    # request.user is lazy and resolving it reads the session and user tables.
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+class ReMixinAsyncLoginRequired:
+    login_url = ReMixinLoginRequired.login_url
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await aget_request_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), self.login_url)
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class ReMixinAsyncReplicaReads:
+    async def dispatch(self, request, *args, **kwargs):
+        routers.allow_replica_reads(request)
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class ReMixinAsyncConditionalGet:
+    """``ReMixinConditionalGet`` for async views, which provide ``aget_validators()``."""
+    trust_last_modified = True
+
+    async def aget_validators(self):
+        return None, None
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await super().dispatch(request, *args, **kwargs)
+
+        etag, timestamp, response = check_validators(
+            request, *await self.aget_validators(), trust_last_modified=self.trust_last_modified
+        )
+        if response is None:
+            response = await super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return set_validators(response, etag, timestamp)
+
+
+class ReMixinAsyncFragmentCache:
+    """``ReMixinFragmentCache`` for async views, which render it with ``arender_fragment()``."""
+    fragment_template_name = None
+    fragment_cache_name = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.fragment_cache_key = await sync_to_async(get_fragment_key)(request, self.fragment_cache_name)
+        if self.fragment_cache_key:
+            fragment = await sync_to_async(note_cache.get_fragment)(self.fragment_cache_key)
+            if fragment is not None:
+                return render(request, self.template_name, {'fragment': fragment})
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def arender_fragment(self, context):
+        fragment = render_to_string(self.fragment_template_name, context, self.request)
+        await sync_to_async(store_fragment)(self.fragment_cache_key, fragment)
+        return fragment
+
+
+class ReMixinAsyncOwnedNote:
+    async def aget_note(self):
+        if not hasattr(self, '_note'):
+            try:
+                self._note = await Note.objects.select_related('author').aget(
+                    pk=self.kwargs['pk'], author=self.request.user
+                )
+            except Note.DoesNotExist:
+                self._note = None
+        return self._note
+
+    def bad_request(self):
+        return render(self.request, 'note/custom_error.html', context={
+            'error_message': 'Bad Request: No note found matching the query'
+        }, status=400)
+
+
+class IndexView(ReMixinAsyncLoginRequired, ReMixinAsyncReplicaReads, ReMixinAsyncConditionalGet,
+                ReMixinAsyncFragmentCache, View):
+    template_name = 'note/index.html'
+    fragment_template_name = 'note/fragments/note_list.html'
+    fragment_cache_name = 'list'
+    paginate_by = 25
+    # See note.views.IndexView: only the count-bearing ETag is trusted.
+    trust_last_modified = False
+
+    def get_queryset(self):
+        queryset = Note.objects.filter(author=self.request.user).defer('content')
+        search_query = self.request.GET.get('search', '')
+        if search_query:
+            queryset = search.get_backend(queryset.db).search(queryset, search_query)
+        for kind in (Tag.FOLDER, Tag.TAG):
+            if self.request.GET.get(kind):
+                queryset = tags.filter_notes(queryset, self.request.user, kind, self.request.GET[kind])
+        return queryset
+
+    async def aget_validators(self):
+        return await sync_to_async(listing.list_validators)(self.request, self.get_queryset())
+
+    async def get(self, request, *args, **kwargs):
+        page = await KeysetPaginator(self.get_queryset(), self.paginate_by).apage(request.GET.get('cursor'))
+        listing.add_row_urls(page.object_list)
+        context = dict(listing.list_filters(request), **{
+            'note_list': page.object_list,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+        })
+        context['tag_list'] = [tag async for tag in context['tag_list']]
+        context['note_stats'] = await sync_to_async(stats.for_user)(request.user)
+        context['fragment'] = await self.arender_fragment(context)
+        return render(request, self.template_name, context)
+
+
+class SingleView(ReMixinAsyncLoginRequired, ReMixinAsyncReplicaReads, ReMixinAsyncConditionalGet,
+                 ReMixinAsyncFragmentCache, ReMixinAsyncOwnedNote, View):
+    template_name = 'note/single.html'
+    fragment_template_name = 'note/fragments/note_detail.html'
+    fragment_cache_name = 'detail'
+
+    async def aget_validators(self):
+        note = await self.aget_note()
+        if note is None:
+            return None, None
+        return listing.note_validators(self.request, note)
+
+    async def get(self, request, *args, **kwargs):
+        note = await self.aget_note()
+        if note is None:
+            return self.bad_request()
+        context = {'note': note, 'object': note}
+        context['fragment'] = await self.arender_fragment(context)
+        return render(request, self.template_name, context)
+
+
+class AddView(ReMixinAsyncLoginRequired, View):
+    template_name = 'note/add.html'
+    success_url = reverse_lazy('noteapp:index')
+
+    async def get(self, request, *args, **kwargs):
+        return render(request, self.template_name, {'form': NoteAddForm()})
+
+    async def post(self, request, *args, **kwargs):
+        form = NoteAddForm(request.POST)
+        if not form.is_valid():
+            return render(request, self.template_name, {'form': form})
+        note = form.save(commit=False)
+        note.author = request.user
+        await sync_to_async(self.save_note)(form, note)
+        return redirect(self.success_url)
+
+    @staticmethod
+    def save_note(form, note):
+        with transaction.atomic():
+            note.save()
+            if form.labels_changed():
+                form.save_labels(note)
+
+
+class EditView(ReMixinAsyncLoginRequired, ReMixinAsyncReplicaReads, ReMixinAsyncOwnedNote, View):
+    template_name = 'note/edit.html'
+    success_url = reverse_lazy('noteapp:index')
+
+    async def get(self, request, *args, **kwargs):
+        note = await self.aget_note()
+        if note is None:
+            return self.bad_request()
+        form = NoteEditForm(instance=note, initial=await self.aget_initial(note))
+        return render(request, self.template_name, {'form': form, 'note': note, 'object': note})
+
+    async def post(self, request, *args, **kwargs):
+        note = await self.aget_note()
+        if note is None:
+            return self.bad_request()
+        form = NoteEditForm(request.POST, instance=note, initial=await self.aget_initial(note))
+        if not form.is_valid():
+            return render(request, self.template_name, {'form': form, 'note': note, 'object': note})
+        try:
+            await sync_to_async(form.save_changes)()
+        except updates.Conflict:
+            return await self.form_conflict(form, note)
+        return redirect(self.success_url)
+
+    @staticmethod
+    async def aget_initial(note):
+        folder, tag_names = await sync_to_async(tags.get_labels)(note)
+        return {'folder': folder, 'tags': tag_names}
+
+    async def form_conflict(self, form, note):
+        current = await Note.objects.filter(pk=note.pk).afirst()
+        if current is None:
+            return render(self.request, 'note/custom_error.html', context={
+                'error_message': 'Bad Request: The note was deleted while you were editing it'
+            }, status=400)
+        form.data = form.data.copy()
+        form.data['version'] = updates.get_version(current)
+        form.add_error(None, 'This note was changed since you opened it. Submit again to overwrite those changes.')
+        return render(self.request, self.template_name, {'form': form, 'note': note, 'object': note}, status=409)
+
+
+class Delete(ReMixinAsyncLoginRequired, ReMixinAsyncReplicaReads, ReMixinAsyncOwnedNote, View):
+    template_name = 'note/delete.html'
+    success_url = reverse_lazy('noteapp:index')
+
+    async def get(self, request, *args, **kwargs):
+        note = await self.aget_note()
+        if note is None:
+            return self.bad_request()
+        return render(request, self.template_name, {'note': note, 'object': note})
+
+    async def post(self, request, *args, **kwargs):
+        note = await self.aget_note()
+        if note is None:
+            return self.bad_request()
+        await sync_to_async(bulk.trash_notes)(Note.objects.filter(pk=note.pk))
+        return redirect(self.success_url)
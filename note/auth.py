@@ -0,0 +1,40 @@
+"""
+Authentication backend that resolves the session's user from the cache.
+
+``AuthenticationMiddleware`` looks the user up on every request; ``CachedModelBackend``
+answers from the ``NOTE_CACHE_ALIAS`` cache for ``NOTE_USER_CACHE_TIMEOUT`` seconds
+(0 disables it). ``note.signals`` drops the entry once a save or delete of the user
+commits, which covers password changes, and on logout, and refills it on login. The session's
+auth hash is still checked against the cached password hash by ``django.contrib.auth``.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+
+from .cache import get_cache
+
+USER_KEY = 'note:user:{}'
+
+
+def get_timeout():
+    return getattr(settings, 'NOTE_USER_CACHE_TIMEOUT', 60)
+
+
+def cache_user(user):
+    if get_timeout() > 0:
+        get_cache().set(USER_KEY.format(user.pk), user, get_timeout())
+
+
+def invalidate_user(user_id):
+    get_cache().delete(USER_KEY.format(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        if get_timeout() <= 0:
+            return super().get_user(user_id)
+        user = get_cache().get(USER_KEY.format(user_id))
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache_user(user)
+        return user
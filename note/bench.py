@@ -0,0 +1,67 @@
+import random
+import statistics
+import time
+
+WORDS = (
+    'meeting project idea budget travel recipe garden invoice draft review sprint release '
+    'kitchen python django database backup reminder birthday holiday report summary agenda '
+    'client design sketch lecture chapter grocery workout journal paper server deploy network'
+).split()
+
+
+def random_text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def make_rng(seed=None):
+    return random.Random(seed)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    ms = [sample * 1000 for sample in samples]
+    return {
+        'count': len(ms),
+        'mean_ms': statistics.mean(ms) if ms else 0.0,
+        'p50_ms': percentile(ms, 50),
+        'p95_ms': percentile(ms, 95),
+        'p99_ms': percentile(ms, 99),
+        'max_ms': max(ms) if ms else 0.0,
+    }
+
+
+def time_calls(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def format_summary(label, summary):
+    return '{:<28} n={count:<6} mean={mean_ms:8.2f}ms p50={p50_ms:8.2f}ms p95={p95_ms:8.2f}ms ' \
+           'p99={p99_ms:8.2f}ms'.format(label, **summary)
+
+
+def compare(current, baseline):
+    """Per-endpoint relative change of the latency percentiles, e.g. {'index': {'p95_ms': 0.12}}."""
+    changes = {}
+    for name, stats in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        changes[name] = {
+            key: (stats[key] - base[key]) / base[key] if base.get(key) else None
+            for key in ('p50_ms', 'p95_ms', 'p99_ms', 'rps', 'queries')
+            if stats.get(key) is not None and base.get(key) is not None
+        }
+    return changes
@@ -0,0 +1,152 @@
+import time
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from . import cache, revisions, search, stats, tags
+from .models import Note, NoteRevision
+
+CHUNK_SIZE = 500
+# What note.stats needs of a note leaving or joining its author's totals
+STATS_FIELDS = ('author', 'content', 'created', 'updated')
+
+
+def notes_created(notes, using=DEFAULT_DB_ALIAS):
+    """Apply the ``Note`` post_save side effects to notes inserted with ``bulk_create``."""
+    notes = list(notes)
+    search.get_backend(using).index(notes)
+    stats.notes_created(notes, using)
+    for author_id in {note.author_id for note in notes}:
+        cache.bump_user_version(author_id, using)
+
+
+def notes_updated(notes, using=DEFAULT_DB_ALIAS):
+    """Apply the ``Note`` post_save side effects to notes written with ``bulk_update``."""
+    notes = list(notes)
+    search.get_backend(using).index(notes)
+    revisions.record(notes, using)
+    stats.notes_updated(notes, using)
+    for author_id in {note.author_id for note in notes}:
+        cache.bump_user_version(author_id, using)
+
+
+def trash_notes(queryset, using=DEFAULT_DB_ALIAS, chunk_size=CHUNK_SIZE):
+    """
+    Move the live notes of ``queryset`` to the trash with one UPDATE per chunk of notes.
+
+    They leave the search index, their tags' counts and the authors' stats, as if
+    deleted, but keep their revisions and tag links until ``restore_notes`` or the purge
+    (``delete_notes``, see ``manage.py purge_trash``). Returns the number trashed.
+    """
+    trashed, authors = 0, set()
+    for pks in _pk_chunks(queryset, using, chunk_size):
+        now = timezone.now()
+        with transaction.atomic(using):
+            Note.objects.using(using).filter(pk__in=pks).update(deleted=now)
+            # The ones this UPDATE trashed, not a concurrent one
+            notes = list(Note.all_objects.using(using).filter(pk__in=pks, deleted=now).only('title', *STATS_FIELDS))
+            tags.notes_trashed([note.pk for note in notes], using)
+            search.get_backend(using).remove(notes)
+            stats.notes_deleted(notes, using)
+        trashed += len(notes)
+        authors.update(note.author_id for note in notes)
+    for author_id in authors:
+        cache.bump_user_version(author_id, using)
+    return trashed
+
+
+def restore_notes(queryset, using=DEFAULT_DB_ALIAS, chunk_size=CHUNK_SIZE):
+    """Take the trashed notes of ``queryset`` out of the trash; returns how many."""
+    restored, authors = 0, set()
+    for pks in _pk_chunks(queryset, using, chunk_size):
+        now = timezone.now()
+        with transaction.atomic(using):
+            # Restoring counts as an edit, so the note's and the list's validators change.
+            Note.all_objects.using(using).filter(pk__in=pks, deleted__isnull=False).update(deleted=None, updated=now)
+            notes = list(Note.objects.using(using).filter(pk__in=pks, updated=now).only('title', *STATS_FIELDS))
+            tags.notes_restored([note.pk for note in notes], using)
+            search.get_backend(using).index(notes)
+            stats.notes_created(notes, using)
+        restored += len(notes)
+        authors.update(note.author_id for note in notes)
+    for author_id in authors:
+        cache.bump_user_version(author_id, using)
+    return restored
+
+
+def delete_notes(queryset, using=DEFAULT_DB_ALIAS, chunk_size=CHUNK_SIZE, pause=0):
+    """
+    Delete the notes of ``queryset``, live or trashed, with one DELETE per table and chunk.
+
+    ``QuerySet.delete()`` loads every note to send its pre/post_delete signals; here the
+    receivers' side effects are applied set-based instead. Each chunk is one short
+    transaction and ``pause`` seconds between chunks let other writers take the lock, so
+    the write lock is never held for more than a chunk. Returns the number deleted.
+    """
+    deleted, authors = 0, set()
+    queryset = queryset.using(using).order_by()
+    while True:
+        # Deleted rows leave the queryset: each chunk is simply its first rows, in the
+        # order of the index its WHERE clause uses (e.g. note_deleted_idx for the purge).
+        pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            break
+        if deleted and pause:
+            time.sleep(pause)
+        with transaction.atomic(using):
+            # Starts with a write, so SQLite never has to upgrade a read snapshot to a write lock.
+            NoteRevision.objects.using(using).filter(note__in=pks).delete()
+            notes = list(Note.all_objects.using(using).filter(pk__in=pks).only('title', 'deleted', *STATS_FIELDS))
+            live = [note for note in notes if note.deleted is None]
+            tags.notes_trashed([note.pk for note in live], using)
+            tags.notes_deleted(pks, using)
+            # No signals: their side effects are the calls around it.
+            Note.all_objects.using(using).filter(pk__in=pks)._raw_delete(using)
+            search.get_backend(using).remove(live)
+            stats.notes_deleted(live, using)
+        deleted += len(notes)
+        authors.update(note.author_id for note in live)
+        if len(pks) < chunk_size:
+            break
+    for author_id in authors:
+        cache.bump_user_version(author_id, using)
+    return deleted
+
+
+def reassign_notes(queryset, author, using=DEFAULT_DB_ALIAS, chunk_size=CHUNK_SIZE):
+    """
+    Give the notes of ``queryset`` to ``author`` with one UPDATE per chunk of notes.
+
+    Their tags and folders move to the author's of the same names and both authors'
+    stats are adjusted; revisions and the search index do not depend on the author.
+    Returns the number of notes moved.
+    """
+    moved, authors = 0, {author.pk}
+    for pks in _pk_chunks(queryset.exclude(author=author), using, chunk_size):
+        with transaction.atomic(using):
+            tags.notes_moved(pks, author, using)
+            notes = list(Note.objects.using(using).filter(pk__in=pks).only(*STATS_FIELDS))
+            Note.objects.using(using).filter(pk__in=pks).update(author=author)
+            stats.notes_deleted(notes, using)
+            authors.update(note.author_id for note in notes)
+            for note in notes:
+                note.author_id = author.pk
+            stats.notes_created(notes, using)
+        moved += len(notes)
+    for author_id in authors:
+        cache.bump_user_version(author_id, using)
+    return moved
+
+
+def _pk_chunks(queryset, using, chunk_size):
+    # Keyset over the primary key: each chunk is an indexed range read, however far in.
+    queryset = queryset.using(using).order_by('pk')
+    last = None
+    while True:
+        chunk = queryset if last is None else queryset.filter(pk__gt=last)
+        pks = list(chunk.values_list('pk', flat=True)[:chunk_size])
+        if pks:
+            yield pks
+        if len(pks) < chunk_size:
+            return
+        last = pks[-1]
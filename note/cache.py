@@ -0,0 +1,93 @@
+import hashlib
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.safestring import mark_safe
+
+VERSION_KEY = 'note:version:{}'
+FRAGMENT_KEY = 'note:fragment:{}:{}:{}:{}'
+HITS_KEY = 'note:fragment-stats:hits'
+MISSES_KEY = 'note:fragment-stats:misses'
+
+
+def get_cache():
+    return caches[getattr(settings, 'NOTE_CACHE_ALIAS', 'default')]
+
+
+def is_enabled():
+    return getattr(settings, 'NOTE_FRAGMENT_CACHE_TIMEOUT', 600) > 0
+
+
+def _fresh_version():
+    # Millisecond clock: if the version key is ever evicted, the restarted counter
+    # lands above every version already used, so stale fragments are never reachable.
+    return int(time.time() * 1000)
+
+
+def get_user_version(user_id):
+    cache = get_cache()
+    key = VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_user_version(user_id, using=DEFAULT_DB_ALIAS):
+    """
+    Invalidate every cached fragment of a user by moving them to a new key space, once
+    the transaction writing to ``using`` commits (right away outside of one). Bumped
+    earlier, a request rendering the rows as they were before the commit would cache
+    them under the new version, and serve them until the next write.
+    """
+    transaction.on_commit(partial(_bump, user_id), using=using)
+
+
+def _bump(user_id):
+    cache = get_cache()
+    key = VERSION_KEY.format(user_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _fresh_version()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def fragment_key(user_id, name, variant=''):
+    digest = hashlib.md5(variant.encode('utf-8')).hexdigest()
+    return FRAGMENT_KEY.format(name, user_id, get_user_version(user_id), digest)
+
+
+def _count(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_fragment(key):
+    fragment = get_cache().get(key)
+    _count(MISSES_KEY if fragment is None else HITS_KEY)
+    return None if fragment is None else mark_safe(fragment)
+
+
+def set_fragment(key, fragment):
+    get_cache().set(key, str(fragment), getattr(settings, 'NOTE_FRAGMENT_CACHE_TIMEOUT', 600))
+
+
+def get_stats():
+    values = get_cache().get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = values.get(HITS_KEY, 0), values.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0.0}
+
+
+def reset_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,44 @@
+"""
+SQLite connection tuning applied to every new connection through ``connection_created``.
+
+The defaults trade a little durability for concurrency: WAL lets readers run while a
+writer commits, ``synchronous=NORMAL`` only syncs at checkpoints in WAL mode, and
+``busy_timeout`` makes a writer wait for the lock instead of failing with "database is
+locked". ``settings.NOTE_SQLITE_PRAGMAS`` only holds overrides of these defaults: a
+pragma set to ``None`` is not run, and ``NOTE_SQLITE_PRAGMAS = None`` disables the tuning.
+"""
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,  # milliseconds
+    'cache_size': -64000,  # negative: KiB, so 64 MB of page cache per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+ALLOWED_PRAGMAS = frozenset(DEFAULT_SQLITE_PRAGMAS) | {'wal_autocheckpoint', 'journal_size_limit'}
+_VALUE_RE = re.compile(r'^(-?\d+|[A-Za-z]+)$')
+
+
+def get_sqlite_pragmas():
+    overrides = getattr(settings, 'NOTE_SQLITE_PRAGMAS', {})
+    if overrides is None:
+        return {}
+    pragmas = {name: value for name, value in {**DEFAULT_SQLITE_PRAGMAS, **overrides}.items() if value is not None}
+    for name, value in pragmas.items():
+        if name not in ALLOWED_PRAGMAS:
+            raise ImproperlyConfigured('Unsupported SQLite pragma in NOTE_SQLITE_PRAGMAS: {!r}.'.format(name))
+        if not _VALUE_RE.match(str(value)):
+            raise ImproperlyConfigured('Invalid value for SQLite pragma {}: {!r}.'.format(name, value))
+    return pragmas
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas=None):
+    """Run the pragmas on a DB-API sqlite3 connection (bypasses Django's query log)."""
+    pragmas = get_sqlite_pragmas() if pragmas is None else pragmas
+    for name, value in pragmas.items():
+        dbapi_connection.execute('PRAGMA {} = {}'.format(name, value))
@@ -0,0 +1,79 @@
+import zlib
+
+from django.db import models
+
+
+class FullTextDocumentField(models.TextField):
+    """The hidden column of an SQLite FTS5 table that accepts ``MATCH`` queries."""
+
+
+@FullTextDocumentField.register_lookup
+class FullTextMatch(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return '{} MATCH {}'.format(lhs, rhs), lhs_params + rhs_params
+
+
+class CompressedTextField(models.TextField):
+    """
+    Text stored as a binary column, zlib-compressed above ``min_length`` bytes.
+
+    Every stored value starts with a header byte naming its encoding (``RAW`` or
+    ``ZLIB``). Values without a known header, and ``str`` values left in the column by
+    the old ``TextField`` schema, are read as plain text. The column cannot be
+    searched with SQL string lookups.
+    """
+    RAW = b'\x00'
+    ZLIB = b'\x01'
+
+    def __init__(self, *args, min_length=256, level=6, **kwargs):
+        self.min_length = min_length
+        self.level = level
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.min_length != 256:
+            kwargs['min_length'] = self.min_length
+        if self.level != 6:
+            kwargs['level'] = self.level
+        return name, path, args, kwargs
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is None:
+            return None
+        return connection.Database.Binary(self.compress(value))
+
+    def from_db_value(self, value, expression, connection):
+        return self.decompress(value)
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return self.decompress(value)
+        return super().to_python(value)
+
+    def compress(self, text):
+        raw = text.encode('utf-8')
+        if len(raw) >= self.min_length:
+            packed = zlib.compress(raw, self.level)
+            if len(packed) < len(raw):
+                return self.ZLIB + packed
+        return self.RAW + raw
+
+    def decompress(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        header, body = value[:1], value[1:]
+        if header == self.ZLIB:
+            return zlib.decompress(body).decode('utf-8')
+        if header == self.RAW:
+            return body.decode('utf-8')
+        return value.decode('utf-8')
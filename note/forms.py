@@ -1,21 +1,80 @@
 from django import forms
+from django.db import transaction
 
+from . import tags, updates
 from .models import Note
 
 
-class NoteAddForm(forms.ModelForm):
+class ReMixinLabelFields(forms.Form):
+    """Folder and comma separated tags of a note, saved with ``note.tags.set_labels``."""
+    folder = forms.CharField(required=False, max_length=50)
+    tags = forms.CharField(label='Tags (comma separated)', required=False)
+    label_fields = ('folder', 'tags')
+
+    def clean_folder(self):
+        return ' '.join(self.cleaned_data['folder'].split())
+
+    def clean_tags(self):
+        names = tags.parse_names(self.cleaned_data['tags'])
+        if len(names) > tags.MAX_TAGS:
+            raise forms.ValidationError('At most {} tags.'.format(tags.MAX_TAGS))
+        if any(len(name) > 50 for name in names):
+            raise forms.ValidationError('Tags are at most 50 characters long.')
+        return names
+
+    def labels_changed(self):
+        return any(field in self.changed_data for field in self.label_fields)
+
+    def save_labels(self, note):
+        tags.set_labels(note, self.cleaned_data['folder'], self.cleaned_data['tags'])
+
+
+class NoteAddForm(ReMixinLabelFields, forms.ModelForm):
     title = forms.CharField(label='Title (Max length: 50)', min_length=5, max_length=50)
 
     class Meta:
         model = Note
-        exclude = ['created', 'author']
+        exclude = ['created', 'author', 'tags']
 
 
-class NoteEditForm(forms.ModelForm):
+class NoteEditForm(ReMixinLabelFields, forms.ModelForm):
+    # Version of the note the edit started from, see note.updates. Optional for callers
+    # that do not check versions.
+    version = forms.CharField(widget=forms.HiddenInput, required=False)
+
     class Meta:
         model = Note
         fields = '__all__'
-        exclude = ['author', 'created']
+        exclude = ['author', 'created', 'tags']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['version'].initial = updates.get_version(self.instance)
 
+    def clean_version(self):
+        version = self.cleaned_data['version']
+        if not version:
+            return None
+        try:
+            return updates.parse_version(version)
+        except ValueError:
+            raise forms.ValidationError('Invalid version.')
 
+    def get_changed_fields(self):
+        """Note fields that differ from the instance the form was built for."""
+        return [field for field in self.changed_data if field not in ('version',) + self.label_fields]
 
+    def save_changes(self):
+        """
+        Write the changed fields and labels with ``updates.save_changes``, which raises
+        ``Conflict`` if the note was saved since ``version``.
+        """
+        fields, version = self.get_changed_fields(), self.cleaned_data['version']
+        if not self.labels_changed():
+            updates.save_changes(self.instance, fields, version)
+            return
+        # A labels-only edit still bumps the version: the list shows the tags' note counts.
+        with transaction.atomic():
+            updates.save_changes(self.instance, fields, version, touch=True)
+            self.save_labels(self.instance)
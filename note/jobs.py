@@ -0,0 +1,117 @@
+"""
+Background jobs without a broker: the ``Job`` table is the queue, ``manage.py run_workers`` runs it.
+
+A request thread only calls ``enqueue()`` and answers with the job's status page, which
+polls until the job is done. ``run_workers`` claims due jobs with a conditional UPDATE,
+so several worker commands (on one or more hosts) never run a job twice, and runs them in
+a process pool. Per task concurrency limits keep e.g. exports from taking every process.
+
+A task that raises is retried after ``NOTE_JOB_RETRY_DELAY * 2 ** (attempt - 1)`` seconds
+until ``max_attempts`` is reached. The worker command renews the lease of the jobs it is
+running; a job whose lease expired (its worker died) is queued again.
+"""
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+TASKS = {}
+
+
+def task(name=None, max_attempts=3, concurrency=None):
+    """
+    Register a function as a job task. Its keyword arguments are stored as JSON, and its
+    return value, if any, as the job's result. ``concurrency`` caps how many jobs of
+    the task one worker command runs at once.
+    """
+    def decorator(func):
+        func.job_name = name or func.__name__
+        func.max_attempts = max_attempts
+        func.concurrency = concurrency
+        TASKS[func.job_name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    try:
+        return TASKS[name]
+    except KeyError:
+        raise LookupError('Unknown job task {!r}.'.format(name)) from None
+
+
+def get_lease():
+    return timedelta(seconds=getattr(settings, 'NOTE_JOB_LEASE_SECONDS', 60))
+
+
+def enqueue(name, user=None, **kwargs):
+    """Queue a call of the task ``name``; ``user`` is the one allowed to follow the job."""
+    func = get_task(name)
+    return Job.objects.create(task=name, kwargs=kwargs, user=user, max_attempts=func.max_attempts)
+
+
+def release_expired(now=None):
+    """Queue again the running jobs whose lease expired, or fail them if out of attempts."""
+    now = now or timezone.now()
+    expired = Job.objects.filter(status=Job.RUNNING, lease_expires__lt=now)
+    expired.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, error='The worker running the job stopped.', finished=now, lease_expires=None,
+    )
+    return expired.update(status=Job.QUEUED, run_after=now, worker='', lease_expires=None)
+
+
+def claim(worker, exclude=(), now=None):
+    """Mark the next due job as running for ``worker`` and return it, ``None`` if there is none."""
+    now = now or timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).exclude(task__in=exclude)
+    for pk in due.order_by('run_after', 'pk').values_list('pk', flat=True)[:10]:
+        # Another worker may have taken the job since it was read; only one UPDATE matches.
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker, lease_expires=now + get_lease(), attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def renew(worker, pks, now=None):
+    """Extend the lease of the jobs ``worker`` is still running."""
+    now = now or timezone.now()
+    return Job.objects.filter(pk__in=pks, status=Job.RUNNING, worker=worker).update(
+        lease_expires=now + get_lease(),
+    )
+
+
+def run(pk):
+    """Run a claimed job and record its outcome; returns its new status, ``None`` if it was taken over."""
+    close_old_connections()
+    try:
+        job = Job.objects.get(pk=pk)
+        try:
+            result = get_task(job.task)(**job.kwargs)
+        except Exception:
+            return finish(job, error=traceback.format_exc())
+        return finish(job, result=result)
+    finally:
+        close_old_connections()
+
+
+def finish(job, result=None, error=None):
+    now = timezone.now()
+    if error is None:
+        values = {'status': Job.SUCCEEDED, 'result': result, 'error': '', 'finished': now}
+    elif job.attempts < job.max_attempts:
+        delay = getattr(settings, 'NOTE_JOB_RETRY_DELAY', 10) * 2 ** (job.attempts - 1)
+        values = {'status': Job.QUEUED, 'run_after': now + timedelta(seconds=delay), 'error': error}
+    else:
+        values = {'status': Job.FAILED, 'error': error, 'finished': now}
+    # A worker that lost its lease no longer owns the job and must not overwrite it.
+    updated = Job.objects.filter(pk=job.pk, status=Job.RUNNING, worker=job.worker).update(
+        worker='', lease_expires=None, **values,
+    )
+    return values['status'] if updated else None
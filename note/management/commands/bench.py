@@ -0,0 +1,222 @@
+import datetime
+import http.cookiejar
+import json
+import subprocess
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from note import bench
+
+ENDPOINTS = ('index', 'index_search', 'single', 'add', 'edit', 'delete')
+
+
+class ClientTransport:
+    """In-process requests through the Django test client, with per-request SQL query counts."""
+
+    def __init__(self, username, password):
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError('User {!r} does not exist, run seed_notes first.'.format(username))
+        self.client = Client()
+        self.client.force_login(user)
+
+    def request(self, method, path, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, data or {})
+        return response.status_code, response.content, len(queries)
+
+
+class ServerTransport:
+    """Requests over HTTP against a running server, logged in through the login form."""
+
+    def __init__(self, base_url, username, password):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect(),
+        )
+        self.request('get', reverse('noteapp:login'))
+        status, _, _ = self.request('post', reverse('noteapp:login'), {'username': username, 'password': password})
+        if status != 302:
+            raise CommandError('Login as {!r} failed with status {}.'.format(username, status))
+
+    def _csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def request(self, method, path, data=None):
+        url = self.base_url + path
+        body = None
+        headers = {'Referer': self.base_url + '/'}
+        if method == 'post':
+            body = urllib.parse.urlencode(dict(data or {}, csrfmiddlewaretoken=self._csrf_token())).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif data:
+            url += '?' + urllib.parse.urlencode(data)
+        try:
+            with self.opener.open(urllib.request.Request(url, data=body, headers=headers)) as response:
+                return response.status, response.read(), None
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), None
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the note endpoints (index, index with search, single, add, edit, delete) and '
+        'report p50/p95/p99 latency, throughput and SQL queries per request. Uses the in-process '
+        'test client by default, or a running server with --server.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', help='Base URL of a running server, e.g. http://127.0.0.1:8000')
+        parser.add_argument('--username', default='seed_user_0')
+        parser.add_argument('--password', default='seed-password')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint.')
+        parser.add_argument('--concurrency', type=int, default=1, help='Parallel requests (with --server).')
+        parser.add_argument('--search', default='project')
+        parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--compare', help='JSON results of an earlier run to compare against.')
+
+    def handle(self, *args, **options):
+        if options['server']:
+            transport = ServerTransport(options['server'], options['username'], options['password'])
+            concurrency = options['concurrency']
+            results = self._run(transport, options, concurrency)
+        else:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                transport = ClientTransport(options['username'], options['password'])
+                results = self._run(transport, options, 1)
+
+        for name, stats in results.items():
+            self.stdout.write(bench.format_summary(name, stats))
+            self.stdout.write('{:<28} rps={:.1f} queries={} errors={}'.format(
+                '', stats['rps'], stats['queries'], stats['errors'],
+            ))
+
+        report = {
+            'meta': {
+                'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'commit': self._git_commit(),
+                'target': options['server'] or 'test-client',
+                'requests': options['requests'],
+                'concurrency': options['concurrency'] if options['server'] else 1,
+            },
+            'endpoints': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                baseline = json.load(f)
+            self.stdout.write('\nChange against {} ({}):'.format(options['compare'], baseline['meta'].get('commit')))
+            for name, changes in bench.compare(results, baseline['endpoints']).items():
+                self.stdout.write('{:<28} {}'.format(name, ' '.join(
+                    '{}={:+.1%}'.format(key, value) for key, value in changes.items() if value is not None
+                )))
+
+    def _run(self, transport, options, concurrency):
+        count = options['requests']
+        run_id = 'benchrun{}'.format(uuid.uuid4().hex[:8])
+        index = reverse('noteapp:index')
+
+        existing = self._note_ids(transport, '', count)
+        if not existing and {'single'} & set(options['endpoints']):
+            raise CommandError('{} has no notes, run seed_notes first.'.format(options['username']))
+
+        plans = {
+            'index': [('get', index, None)] * count,
+            'index_search': [('get', index, {'search': options['search']})] * count,
+            'single': [('get', reverse('noteapp:single', args=[existing[i % len(existing)]]), None)
+                       for i in range(count)],
+            'add': [('post', reverse('noteapp:add'), {'title': '{} {}'.format(run_id, i), 'content': 'Benchmark note'})
+                    for i in range(count)],
+        }
+
+        results = {}
+        for name in ENDPOINTS:
+            if name not in options['endpoints']:
+                continue
+            if name in ('edit', 'delete'):
+                # Edit and delete only touch the notes this run added.
+                own = self._note_ids(transport, run_id, count)
+                if not own:
+                    raise CommandError('{} needs the notes created by "add" in the same run.'.format(name))
+                if name == 'edit':
+                    plans[name] = [('post', reverse('noteapp:edit', args=[own[i % len(own)]]),
+                                    {'title': '{} edited {}'.format(run_id, i), 'content': 'Edited'})
+                                   for i in range(count)]
+                else:
+                    plans[name] = [('post', reverse('noteapp:delete', args=[pk]), None) for pk in own]
+            results[name] = self._measure(transport, plans[name], concurrency)
+        return results
+
+    @staticmethod
+    def _note_ids(transport, search, limit):
+        ids, cursor = [], None
+        while len(ids) < limit:
+            params = {'fields': 'id', 'limit': 100}
+            if search:
+                params['search'] = search
+            if cursor:
+                params['cursor'] = cursor
+            status, body, _ = transport.request('get', reverse('noteapp:api-list'), params)
+            if status != 200:
+                raise CommandError('Listing notes through the API failed with status {}.'.format(status))
+            data = json.loads(body)
+            ids.extend(note['id'] for note in data['results'])
+            cursor = data['next']
+            if not cursor:
+                break
+        return ids[:limit]
+
+    @staticmethod
+    def _measure(transport, plan, concurrency):
+        def call(step):
+            method, path, data = step
+            start = time.perf_counter()
+            status, _, queries = transport.request(method, path, data)
+            return time.perf_counter() - start, status, queries
+
+        start = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                outcomes = list(executor.map(call, plan))
+        else:
+            outcomes = [call(step) for step in plan]
+        elapsed = time.perf_counter() - start
+
+        stats = bench.summarize([duration for duration, _, _ in outcomes])
+        query_counts = [queries for _, _, queries in outcomes if queries is not None]
+        stats.update({
+            'rps': len(outcomes) / elapsed if elapsed else 0.0,
+            'queries': sum(query_counts) / len(query_counts) if query_counts else None,
+            'errors': sum(1 for _, status, _ in outcomes if status >= 400),
+        })
+        return stats
+
+    @staticmethod
+    def _git_commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,94 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from note import bench, bulk
+from note.models import Note
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requests per second and latency of the sync views through the WSGI handler '
+        '(a thread per in-flight request) with the async views through the ASGI handler '
+        '(one event loop), in process and at the given concurrency. Creates a temporary '
+        'user with notes in the configured database and deletes it afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--notes', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = bench.make_rng(options['seed'])
+        user = User.objects.create_user(username='__bench_asgi__')
+        try:
+            notes = Note.objects.bulk_create([
+                Note(title=bench.random_text(rng, 4), content=bench.random_text(rng, 150), author=user)
+                for _ in range(options['notes'])
+            ])
+            bulk.notes_created(notes)
+            paths = [
+                reverse('noteapp:index'),
+                reverse('noteapp:index') + '?search=project',
+            ] + [reverse('noteapp:single', kwargs={'pk': note.pk}) for note in notes[:20]]
+            targets = [paths[i % len(paths)] for i in range(options['requests'])]
+
+            for label, run in (('WSGI sync views', self._run_wsgi), ('ASGI async views', self._run_asgi)):
+                with override_settings(ALLOWED_HOSTS=['testserver']):
+                    elapsed, samples, errors = run(user, targets, options['concurrency'])
+                summary = bench.summarize(samples)
+                self.stdout.write(bench.format_summary(label, summary))
+                self.stdout.write('{:<28} rps={:.1f} errors={}'.format('', len(samples) / elapsed, errors))
+        finally:
+            user.delete()
+
+    def _run_wsgi(self, user, targets, concurrency):
+        login = Client()
+        login.force_login(user)
+
+        def fetch(path):
+            client = Client()
+            client.cookies = login.cookies
+            start = time.perf_counter()
+            status = client.get(path).status_code
+            close_old_connections()
+            return time.perf_counter() - start, status
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(fetch, targets))
+        return self._collect(time.perf_counter() - start, results)
+
+    def _run_asgi(self, user, targets, concurrency):
+        client = AsyncClient()
+        client.force_login(user)
+
+        async def main():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def fetch(path):
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.get(path)
+                    return time.perf_counter() - start, response.status_code
+
+            return await asyncio.gather(*(fetch(path) for path in targets))
+
+        with override_settings(ROOT_URLCONF='django_notes.async_urls'):
+            start = time.perf_counter()
+            results = asyncio.run(main())
+        return self._collect(time.perf_counter() - start, results)
+
+    @staticmethod
+    def _collect(elapsed, results):
+        samples = [duration for duration, status in results]
+        errors = sum(1 for duration, status in results if status != 200)
+        return elapsed, samples, errors
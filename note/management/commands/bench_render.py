@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand
+from django.template import Context, Engine
+
+from note import bench, listing
+from note.models import Note
+
+# note/fragments/note_list.html as it was, reversing three URLs per note.
+REVERSING_LIST = """{% if not note_list %}
+    <div class="text-danger">Nothing Found</div>
+{% endif %}
+<div class="row">
+    {% for note in note_list %}
+        <div class="row">
+            <div class="col-md-4">
+                <div class="d-flex justify-content-between align-items-center">
+                    <h4><a href="{{ note.get_absolute_url }}" class="mr-1">{{ note.title }}</a></h4>
+                </div>
+            </div>
+            <div class="col-md-1">
+                <div class="d-flex justify-content-between align-items-center">
+                    <a href="{% url 'note:edit' pk=note.pk %}" class="ml-2">Edit</a>
+                </div>
+            </div>
+            <div class="col-md-1">
+                <div class="d-flex justify-content-between align-items-center">
+                    <a href="{% url 'note:delete' pk=note.pk %}" class="ml-2">Delete</a>
+                </div>
+            </div>
+        </div>
+
+    {% endfor %}
+</div>
+{% if is_paginated %}
+    <div class="row mt-3">
+        <div class="col-md-6 d-flex">
+            {% if page_obj.has_previous %}
+                <a href="?{% if request.GET.search %}search={{ request.GET.search|urlencode }}&amp;{% endif %}cursor={{ page_obj.previous_cursor|urlencode }}" class="mr-2">&laquo; Previous</a>
+            {% endif %}
+            {% if page_obj.has_next %}
+                <a href="?{% if request.GET.search %}search={{ request.GET.search|urlencode }}&amp;{% endif %}cursor={{ page_obj.next_cursor|urlencode }}" class="ml-2">Next &raquo;</a>
+            {% endif %}
+        </div>
+    </div>
+{% endif %}"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Render time of the note list fragment for lists of the given sizes, reversing the row '
+        'URLs per note (before) vs. building them from one reversed prefix (after). Uses '
+        'unsaved notes, no database access.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = bench.make_rng(options['seed'])
+        engine = Engine.get_default()
+        before = engine.from_string(REVERSING_LIST)
+        after = engine.get_template('note/fragments/note_list.html')
+        for size in options['sizes']:
+            notes = [Note(pk=pk, title=bench.random_text(rng, 4)) for pk in range(1, size + 1)]
+
+            def render_before():
+                before.render(Context({'note_list': notes}))
+
+            def render_after():
+                after.render(Context({'note_list': listing.add_row_urls(notes)}))
+
+            for label, render in (('before', render_before), ('after', render_after)):
+                render()  # warm up
+                summary = bench.summarize(bench.time_calls(render, options['repeat']))
+                self.stdout.write(bench.format_summary('{} notes, {}'.format(size, label), summary))
@@ -0,0 +1,58 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from note import bench
+from note.models import Note
+from note.search import SimpleSearchBackend, get_backend
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare unindexed search (SimpleSearchBackend) with the full-text backend at growing note '
+        'volumes. Runs inside a transaction that is rolled back, so no data is left behind.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+        parser.add_argument('--words', type=int, default=200, help='Average words per note.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=25)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = bench.make_rng(options['seed'])
+        backend = get_backend()
+        simple = SimpleSearchBackend()
+        page = options['page_size']
+
+        with transaction.atomic():
+            user = User.objects.create_user(username='__bench_search__')
+            total = 0
+            for size in sorted(options['sizes']):
+                notes = []
+                for i in range(total, size):
+                    words = max(1, int(rng.lognormvariate(0, 0.6) * options['words']))
+                    content = bench.random_text(rng, words)
+                    if i % 100 == 0:
+                        content += ' needle{}'.format(i % 1000)
+                    notes.append(Note(title=bench.random_text(rng, 4), content=content, author=user))
+                notes = Note.objects.bulk_create(notes, batch_size=1000)
+                backend.index(notes)
+                total = size
+
+                self.stdout.write('\n{} notes'.format(total))
+                for label, term in (('common term', 'project'), ('rare term', 'needle7'), ('prefix', 'budg')):
+                    base = Note.objects.filter(author=user)
+                    unindexed = bench.time_calls(
+                        lambda: list(simple.search(base, term)[:page]),
+                        options['repeat'],
+                    )
+                    fulltext = bench.time_calls(
+                        lambda: list(backend.search(base, term)[:page]),
+                        options['repeat'],
+                    )
+                    self.stdout.write(bench.format_summary('  unindexed {}'.format(label), bench.summarize(unindexed)))
+                    self.stdout.write(bench.format_summary('  fulltext  {}'.format(label), bench.summarize(fulltext)))
+
+            transaction.set_rollback(True)
@@ -0,0 +1,150 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from note import bench, db
+
+SCHEMA = """
+CREATE TABLE note (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, content TEXT,
+    author_id INTEGER, created TEXT, updated TEXT
+);
+CREATE INDEX note_author_created_id_idx ON note (author_id, created, id);
+CREATE VIRTUAL TABLE note_fts USING fts5(title, content);
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Mixed read/write throughput of the note table under concurrent threads, with SQLite '
+        'defaults and a new connection per operation (before) vs. NOTE_SQLITE_PRAGMAS and '
+        'persistent connections (after). Uses throwaway database files.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per mode.')
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--authors', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        pragmas = db.get_sqlite_pragmas() or db.DEFAULT_SQLITE_PRAGMAS
+        for label, tuned in (('before (defaults)', False), ('after (tuned)', True)):
+            with tempfile.TemporaryDirectory() as tmpdir:
+                path = os.path.join(tmpdir, 'bench.sqlite3')
+                self._populate(path, options)
+                result = self._run(path, options, pragmas if tuned else None)
+            elapsed = options['duration']
+            self.stdout.write('\n{}: {:.0f} ops/s, {} errors'.format(
+                label, (len(result['read']) + len(result['write'])) / elapsed, result['errors'],
+            ))
+            self.stdout.write(bench.format_summary('  reads', bench.summarize(result['read'])))
+            self.stdout.write(bench.format_summary('  writes', bench.summarize(result['write'])))
+
+    @staticmethod
+    def _populate(path, options):
+        rng = bench.make_rng(options['seed'])
+        conn = sqlite3.connect(path)
+        conn.executescript(SCHEMA)
+        rows = [
+            (bench.random_text(rng, 4), bench.random_text(rng, 80), i % options['authors'],
+             '2024-01-01T00:00:{:06d}'.format(i), '2024-01-01T00:00:{:06d}'.format(i))
+            for i in range(options['rows'])
+        ]
+        conn.executemany('INSERT INTO note (title, content, author_id, created, updated) VALUES (?, ?, ?, ?, ?)', rows)
+        conn.execute('INSERT INTO note_fts (rowid, title, content) SELECT id, title, content FROM note')
+        conn.commit()
+        conn.close()
+
+    def _run(self, path, options, pragmas):
+        result = {'read': [], 'write': [], 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+
+        def connect():
+            # isolation_level=None: autocommit statements, like Django outside atomic().
+            conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            if pragmas:
+                db.apply_sqlite_pragmas(conn, pragmas)
+            return conn
+
+        def worker(index):
+            rng = bench.make_rng(options['seed'] + index)
+            persistent = connect() if pragmas else None
+            samples = {'read': [], 'write': []}
+            errors = 0
+            while time.perf_counter() < deadline:
+                kind = 'write' if rng.random() < options['write_ratio'] else 'read'
+                author = rng.randrange(options['authors'])
+                start = time.perf_counter()
+                conn = persistent or connect()
+                try:
+                    if kind == 'read':
+                        self._read(conn, author)
+                    else:
+                        self._write(conn, rng, author)
+                    samples[kind].append(time.perf_counter() - start)
+                except sqlite3.DatabaseError:
+                    errors += 1
+                finally:
+                    if persistent is None:
+                        conn.close()
+            if persistent is not None:
+                persistent.close()
+            with lock:
+                result['read'] += samples['read']
+                result['write'] += samples['write']
+                result['errors'] += errors
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return result
+
+    @staticmethod
+    def _read(conn, author):
+        # IndexView: the first page of an author's notes
+        conn.execute(
+            'SELECT id, title, content, created FROM note WHERE author_id = ? ORDER BY created DESC, id DESC LIMIT 26',
+            (author,),
+        ).fetchall()
+
+    @staticmethod
+    def _write(conn, rng, author):
+        # AddView / EditView: the row write followed by the search index update
+        title, content = bench.random_text(rng, 4), bench.random_text(rng, 80)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            pk = Command._write_note(conn, rng, author, title, content)
+            conn.execute('DELETE FROM note_fts WHERE rowid = ?', (pk,))
+            conn.execute('INSERT INTO note_fts (rowid, title, content) VALUES (?, ?, ?)', (pk, title, content))
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    @staticmethod
+    def _write_note(conn, rng, author, title, content):
+        if rng.random() < 0.5:
+            cursor = conn.execute(
+                "INSERT INTO note (title, content, author_id, created, updated) "
+                "VALUES (?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now'), strftime('%Y-%m-%dT%H:%M:%f', 'now'))",
+                (title, content, author),
+            )
+            pk = cursor.lastrowid
+        else:
+            row = conn.execute('SELECT id FROM note WHERE author_id = ? ORDER BY random() LIMIT 1', (author,)).fetchone()
+            pk = row[0]
+            conn.execute(
+                "UPDATE note SET title = ?, content = ?, updated = strftime('%Y-%m-%dT%H:%M:%f', 'now') WHERE id = ?",
+                (title, content, pk),
+            )
+        return pk
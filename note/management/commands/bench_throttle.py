@@ -0,0 +1,126 @@
+import logging
+import os
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import Client, RequestFactory, override_settings
+from django.urls import reverse
+
+from note import bench, bulk, throttle
+from note.models import Note
+
+ATTACKER_IP = '203.0.113.7'
+
+
+class Command(BaseCommand):
+    help = (
+        'Latency of the note pages while other threads post wrong passwords to the login view: '
+        'without an attack, under attack with throttling off, and under attack with '
+        'NOTE_THROTTLE_RATES. In process, with a temporary user and notes that are deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per phase.')
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--attackers', type=int, default=2 * (os.cpu_count() or 1))
+        parser.add_argument('--attack-rate', type=float, default=20.0,
+                            help='Login attempts per second sent by each attacker.')
+        parser.add_argument('--notes', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = bench.make_rng(options['seed'])
+        user = User.objects.create_user(username='__bench_throttle__')
+        try:
+            notes = Note.objects.bulk_create([
+                Note(title=bench.random_text(rng, 4), content=bench.random_text(rng, 150), author=user)
+                for _ in range(options['notes'])
+            ])
+            bulk.notes_created(notes)
+            paths = [reverse('noteapp:index')] + [
+                reverse('noteapp:single', kwargs={'pk': note.pk}) for note in notes[:10]
+            ]
+            phases = (
+                ('no attack', 0, throttle.get_rates()),
+                ('attack, unthrottled', options['attackers'], {}),
+                ('attack, throttled', options['attackers'], throttle.get_rates()),
+            )
+            for label, attackers, rates in phases:
+                with override_settings(ALLOWED_HOSTS=['testserver'], NOTE_THROTTLE_RATES=rates,
+                                       NOTE_THROTTLE_STORE=throttle.DEFAULT_STORE):
+                    throttle.get_store().clear()
+                    if attackers and rates:
+                        self._drain_burst()
+                    samples, logins = self._run(user, paths, options['readers'], attackers, options)
+                self.stdout.write(bench.format_summary('notes, ' + label, bench.summarize(samples)))
+                if attackers:
+                    self.stdout.write('{:<28} login attempts={} throttled (429)={}'.format(
+                        '', sum(logins.values()), logins.get(429, 0),
+                    ))
+        finally:
+            user.delete()
+
+    @staticmethod
+    def _drain_burst():
+        # A sustained attack has used up the attacker's burst allowance; measure from there.
+        request = RequestFactory().post(reverse('noteapp:login'), REMOTE_ADDR=ATTACKER_IP)
+        while not throttle.check(request, 'login'):
+            pass
+
+    @staticmethod
+    def _run(user, paths, readers, attackers, options):
+        login = Client()
+        login.force_login(user)
+        deadline = time.perf_counter() + options['duration']
+        interval = 1.0 / options['attack_rate']
+        samples, logins = [], {}
+        lock = threading.Lock()
+
+        def read(index):
+            client = Client()
+            client.cookies = login.cookies
+            own = []
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                client.get(paths[(index + len(own)) % len(paths)])
+                own.append(time.perf_counter() - start)
+            close_old_connections()
+            with lock:
+                samples.extend(own)
+
+        def attack(index):
+            client = Client(REMOTE_ADDR=ATTACKER_IP)
+            statuses = {}
+            attempt = 0
+            next_attempt = time.perf_counter()
+            while time.perf_counter() < deadline:
+                # Paced: an attempt that took longer than the interval is followed at once.
+                time.sleep(max(0.0, next_attempt - time.perf_counter()))
+                next_attempt += interval
+                attempt += 1
+                status = client.post(reverse('noteapp:login'), {
+                    'username': 'victim_{}_{}'.format(index, attempt % 3), 'password': 'wrong-password',
+                }).status_code
+                statuses[status] = statuses.get(status, 0) + 1
+            close_old_connections()
+            with lock:
+                for status, count in statuses.items():
+                    logins[status] = logins.get(status, 0) + count
+
+        threads = [threading.Thread(target=read, args=(i,)) for i in range(readers)]
+        threads += [threading.Thread(target=attack, args=(i,)) for i in range(attackers)]
+        # Every throttled attempt would log a "Too Many Requests" warning.
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            request_logger.setLevel(level)
+        return samples, logins
@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from note import transfer
+from note.models import Note
+
+
+class Command(BaseCommand):
+    help = 'Stream notes to JSON Lines or CSV in constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', default='-', help='Output file, "-" for stdout (default).')
+        parser.add_argument('--format', choices=transfer.FORMATS, help='Defaults to the output file extension.')
+        parser.add_argument('--author', action='append', default=[], help='Only export notes of these usernames.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        output = options['output']
+        fmt = options['format'] or (output.rsplit('.', 1)[-1] if '.' in output else 'jsonl')
+        if fmt not in transfer.FORMATS:
+            raise CommandError('Unknown format {!r}, use --format.'.format(fmt))
+
+        queryset = Note.objects.all()
+        if options['author']:
+            queryset = queryset.filter(author__username__in=options['author'])
+
+        self.count = 0
+        stream = sys.stdout if output == '-' else open(output, 'w', encoding='utf-8', newline='')
+        try:
+            records = self._counted(transfer.iter_records(queryset, chunk_size=options['chunk_size']))
+            for line in transfer.encode(records, fmt):
+                stream.write(line)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        self.stderr.write('Exported {} notes.'.format(self.count))
+
+    def _counted(self, records):
+        for record in records:
+            self.count += 1
+            yield record
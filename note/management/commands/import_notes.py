@@ -0,0 +1,138 @@
+import csv
+import itertools
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from note import bulk, transfer
+from note.models import Note
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream notes from JSON Lines or CSV (as written by export_notes) into the database with '
+        'batched bulk_create, one short transaction per batch.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Input file, "-" for stdin.')
+        parser.add_argument('--format', choices=transfer.FORMATS, help='Defaults to the input file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Processes used to decode and validate records; batches are still written in order.',
+        )
+        parser.add_argument(
+            '--author-map', action='append', default=[], metavar='OLD:NEW',
+            help='Import notes of username OLD as username NEW. May be repeated.',
+        )
+        parser.add_argument('--author', help='Import every note as this username, ignoring the file.')
+        parser.add_argument(
+            '--offset', type=int, default=0,
+            help='Skip this many records first, to resume an interrupted import.',
+        )
+        parser.add_argument('--skip-invalid', action='store_true', help='Skip invalid records instead of stopping.')
+
+    def handle(self, *args, **options):
+        path = options['input']
+        fmt = options['format'] or (path.rsplit('.', 1)[-1] if '.' in path else None)
+        if fmt not in transfer.FORMATS:
+            raise CommandError('Unknown format {!r}, use --format.'.format(fmt))
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        self.author_map = {}
+        for mapping in options['author_map']:
+            old, sep, new = mapping.partition(':')
+            if not sep:
+                raise CommandError('--author-map expects OLD:NEW, got {!r}.'.format(mapping))
+            self.author_map[old] = new
+        self.forced_author = options['author']
+        self.author_ids = {}
+        self.skip_invalid = options['skip_invalid']
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        try:
+            if fmt == 'jsonl':
+                records = (line for line in stream if line.strip())
+                parse = transfer.parse_jsonl_chunk
+            else:
+                records = csv.DictReader(stream)
+                parse = transfer.parse_csv_chunk
+
+            offset = options['offset']
+            records = itertools.islice(records, offset, None)
+            chunks = _chunks(records, options['batch_size'])
+
+            if options['workers'] > 1:
+                with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+                    self._import(self._parallel_map(executor, parse, chunks, options['workers']), offset)
+            else:
+                self._import(map(parse, chunks), offset)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+    @staticmethod
+    def _parallel_map(executor, parse, chunks, workers):
+        # Keep at most two chunks per worker in flight so memory stays bounded by the batch size.
+        pending = []
+        for chunk in chunks:
+            pending.append(executor.submit(parse, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+    def _author_id(self, username):
+        username = self.forced_author or self.author_map.get(username, username)
+        if not username:
+            raise transfer.RecordError('missing author')
+        if username not in self.author_ids:
+            try:
+                self.author_ids[username] = User.objects.values_list('pk', flat=True).get(username=username)
+            except User.DoesNotExist:
+                raise transfer.RecordError('unknown author {!r}'.format(username))
+        return self.author_ids[username]
+
+    def _import(self, batches, offset):
+        imported = skipped = 0
+        for batch in batches:
+            notes = []
+            for position, result in enumerate(batch, start=offset + 1):
+                try:
+                    if isinstance(result, transfer.RecordError):
+                        raise result
+                    author, title, content, created = result
+                    notes.append(Note(
+                        author_id=self._author_id(author), title=title, content=content,
+                        created=created or timezone.now(),
+                    ))
+                except transfer.RecordError as e:
+                    if not self.skip_invalid:
+                        raise CommandError(
+                            'Record {}: {}. Fix it and resume with --offset {}.'.format(position, e, offset)
+                        )
+                    skipped += 1
+
+            with transaction.atomic():
+                created = Note.objects.bulk_create(notes)
+                bulk.notes_created(created)
+            imported += len(created)
+            offset += len(batch)
+            self.stderr.write('Imported {} notes, skipped {} (offset {}).'.format(imported, skipped, offset))
+
+        self.stdout.write(self.style.SUCCESS('Imported {} notes, skipped {}.'.format(imported, skipped)))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from note import cache
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the note fragment cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them.')
+
+    def handle(self, *args, **options):
+        stats = cache.get_stats()
+        self.stdout.write('hits={hits} misses={misses} hit_ratio={hit_ratio:.2%}'.format(**stats))
+        if options['reset']:
+            cache.reset_stats()
@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from note import bulk
+from note.models import Note
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete the notes that have been in the trash for longer than NOTE_TRASH_DAYS, in short '
+        'transactions of --batch-size notes with --pause seconds in between, so the write lock '
+        'is only ever held for one batch.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--days', type=float, default=getattr(settings, 'NOTE_TRASH_DAYS', 30),
+                            help='Purge notes deleted more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Notes per transaction.')
+        parser.add_argument('--pause', type=float, default=getattr(settings, 'NOTE_PURGE_PAUSE', 0.1),
+                            help='Seconds to sleep between batches.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        # The range of note_deleted_idx, which holds only the trashed notes
+        queryset = Note.all_objects.filter(deleted__lt=cutoff)
+        deleted = bulk.delete_notes(
+            queryset, using=options['database'], chunk_size=options['batch_size'], pause=options['pause'],
+        )
+        self.stdout.write(self.style.SUCCESS('Purged {} notes deleted before {}.'.format(deleted, cutoff.isoformat())))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from note import jobs, tasks
+from note.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all notes, one chunk of notes per transaction.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--background', action='store_true',
+                            help='Queue a rebuild_search_index job for the workers instead.')
+
+    def handle(self, *args, **options):
+        kwargs = {'database': options['database'], 'chunk_size': options['chunk_size']}
+        if options['background']:
+            job = jobs.enqueue('rebuild_search_index', **kwargs)
+            self.stdout.write(self.style.SUCCESS('Queued job #{}.'.format(job.pk)))
+            return
+        result = tasks.rebuild_search_index(**kwargs)
+        self.stdout.write(self.style.SUCCESS(
+            'Indexed {} notes with {}.'.format(result['indexed'], type(get_backend(options['database'])).__name__)
+        ))
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from note import stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the users' note totals (see note.stats) from their notes and fix the ones "
+        'that drifted, in one short transaction per batch of users.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--batch-size', type=int, default=200, help='Users per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Report drifted totals without fixing them.')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.using(options['database']).order_by('pk').values_list('pk', flat=True)
+        checked = drifted = 0
+        batch = []
+        for user_id in users.iterator(chunk_size=options['batch_size']):
+            batch.append(user_id)
+            if len(batch) == options['batch_size']:
+                drifted += self.reconcile(batch, options)
+                checked, batch = checked + len(batch), []
+        if batch:
+            drifted += self.reconcile(batch, options)
+            checked += len(batch)
+        self.stdout.write(self.style.SUCCESS('Checked {} users, {} {}.'.format(
+            checked, drifted, 'drifted' if options['dry_run'] else 'fixed',
+        )))
+
+    def reconcile(self, user_ids, options):
+        rows = stats.reconcile(user_ids, using=options['database'], dry_run=options['dry_run'])
+        if options['verbosity'] > 1:
+            for row in rows:
+                self.stdout.write('User {}: {} notes, {} bytes'.format(row.user_id, row.note_count, row.content_bytes))
+        return len(rows)
@@ -0,0 +1,120 @@
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+
+from note import jobs, tasks
+from note.models import Job
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued background jobs (see note.jobs) in a pool of worker processes, claiming '
+        'new ones as processes free up, until interrupted.'
+    )
+    # Seconds between deletions of expired export files
+    cleanup_interval = 60
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (default: one per CPU); 0 runs jobs in this process.')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds between looks for new jobs when the queue is empty.')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due or running.')
+
+    def handle(self, *args, **options):
+        self.worker = '{}:{}'.format(socket.gethostname(), os.getpid())
+        self.limits = self.get_limits()
+        processes = options['processes']
+        pool = None
+        if processes:
+            # Spawned, not forked: a child must not share this process' database connections.
+            connections.close_all()
+            pool = ProcessPoolExecutor(
+                processes, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup,
+            )
+        self.stdout.write('Worker {} running jobs with {} process(es).'.format(self.worker, processes or 'no'))
+
+        running = {}
+        last_cleanup = None
+        try:
+            while True:
+                jobs.release_expired()
+                if last_cleanup is None or time.monotonic() - last_cleanup >= self.cleanup_interval:
+                    tasks.delete_expired_exports()
+                    last_cleanup = time.monotonic()
+                jobs.renew(self.worker, [job.pk for job in running.values()])
+                while len(running) < max(processes, 1):
+                    job = jobs.claim(self.worker, exclude=self.saturated(running.values()))
+                    if job is None:
+                        break
+                    if pool is None:
+                        self.report(job, self.run_inline(job, options['poll_interval']))
+                    else:
+                        running[pool.submit(jobs.run, job.pk)] = job
+                if not running:
+                    if options['burst']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.report(running.pop(future), future.result())
+        except KeyboardInterrupt:
+            self.stdout.write('Interrupted, waiting for {} running job(s).'.format(len(running)))
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+
+    def run_inline(self, job, interval):
+        """Run ``job`` in this process, with a thread renewing its lease as the loop does for the pool's."""
+        done = threading.Event()
+
+        def heartbeat():
+            try:
+                while not done.wait(interval):
+                    try:
+                        jobs.renew(self.worker, [job.pk])
+                    except DatabaseError:
+                        # E.g. the job holds SQLite's write lock for longer than the busy timeout.
+                        pass
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=heartbeat, name='lease-{}'.format(job.pk), daemon=True)
+        thread.start()
+        try:
+            return jobs.run(job.pk)
+        finally:
+            done.set()
+            thread.join()
+
+    def get_limits(self):
+        limits = {name: func.concurrency for name, func in jobs.TASKS.items() if func.concurrency}
+        limits.update(getattr(settings, 'NOTE_JOB_CONCURRENCY', {}))
+        return limits
+
+    def saturated(self, running_jobs):
+        """Tasks that already have as many jobs running as their limit allows."""
+        counts = {}
+        for job in running_jobs:
+            counts[job.task] = counts.get(job.task, 0) + 1
+        return [name for name, limit in self.limits.items() if counts.get(name, 0) >= limit]
+
+    def report(self, job, status):
+        if status == Job.FAILED:
+            line = self.style.ERROR('{} #{} failed after {} attempt(s).'.format(job.task, job.pk, job.attempts))
+        elif status == Job.QUEUED:
+            line = self.style.WARNING('{} #{} failed, will be retried.'.format(job.task, job.pk))
+        elif status is None:
+            line = self.style.WARNING('{} #{} was taken over by another worker.'.format(job.task, job.pk))
+        else:
+            line = '{} #{} {}.'.format(job.task, job.pk, status)
+        self.stdout.write(line)
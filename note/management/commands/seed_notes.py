@@ -0,0 +1,56 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from note import bench, bulk
+from note.models import Note
+
+
+class Command(BaseCommand):
+    help = (
+        'Create users and notes for load testing. Notes per user and note sizes follow '
+        'log-normal distributions: most users have a few short notes, a few have many long ones.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--notes-per-user', type=int, default=100, help='Median notes per user.')
+        parser.add_argument('--words', type=int, default=80, help='Median words per note body.')
+        parser.add_argument('--username-prefix', default='seed_user_')
+        parser.add_argument('--password', default='seed-password')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        rng = bench.make_rng(options['seed'])
+        prefix = options['username_prefix']
+        existing = User.objects.filter(username__startswith=prefix).count()
+        password = make_password(options['password'])  # hash once, PBKDF2 is deliberately slow
+
+        users = User.objects.bulk_create([
+            User(username='{}{}'.format(prefix, existing + i), password=password)
+            for i in range(options['users'])
+        ])
+        total = 0
+        for user in users:
+            count = max(1, int(rng.lognormvariate(0, 1.0) * options['notes_per_user']))
+            for start in range(0, count, options['batch_size']):
+                notes = [
+                    Note(
+                        title=bench.random_text(rng, rng.randint(2, 8))[:50],
+                        content=bench.random_text(rng, max(1, int(rng.lognormvariate(0, 1.2) * options['words']))),
+                        author=user,
+                    )
+                    for _ in range(min(options['batch_size'], count - start))
+                ]
+                with transaction.atomic():
+                    bulk.notes_created(Note.objects.bulk_create(notes))
+            total += count
+            self.stderr.write('{}: {} notes'.format(user.username, count))
+
+        self.stdout.write(self.style.SUCCESS(
+            'Created {} users ({}{}..) with {} notes, password {!r}.'.format(
+                len(users), prefix, existing, total, options['password'],
+            )
+        ))
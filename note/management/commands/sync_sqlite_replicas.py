@@ -0,0 +1,34 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from note import routers
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database into every SQLite alias of NOTE_DATABASE_REPLICAS with the '
+        'online backup API. Stands in for replication when trying read replicas locally.'
+    )
+
+    def handle(self, *args, **options):
+        primary = connections[routers.PRIMARY]
+        if primary.vendor != 'sqlite':
+            raise CommandError('The primary database is not SQLite.')
+        replicas = [alias for alias in routers.get_replicas() if connections[alias].vendor == 'sqlite']
+        if not replicas:
+            raise CommandError('No SQLite replicas configured, set DJANGO_NOTES_SQLITE_REPLICAS.')
+
+        source = sqlite3.connect(str(primary.settings_dict['NAME']))
+        try:
+            for alias in replicas:
+                connections[alias].close()
+                target = sqlite3.connect(str(connections[alias].settings_dict['NAME']))
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write('{} <- {}'.format(alias, routers.PRIMARY))
+        finally:
+            source.close()
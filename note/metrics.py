@@ -0,0 +1,251 @@
+"""
+Per-view request metrics in Prometheus text format.
+
+``note.middleware.MetricsMiddleware`` measures each sampled request: latency, SQL queries
+and their time (through ``connection.execute_wrapper``), template render time (through
+the ``InstrumentedDjangoTemplates`` backend) and response size, labelled by the resolved
+URL name. The registry lives in process memory, so every worker exposes its own series
+and Prometheus sums them per instance.
+"""
+import contextvars
+import hmac
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.views import View
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+_current = contextvars.ContextVar('note_metrics_request', default=None)
+
+
+def get_sample_rate():
+    return getattr(settings, 'NOTE_METRICS_SAMPLE_RATE', 1.0)
+
+
+def should_sample():
+    rate = get_sample_rate()
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    if match.url_name:
+        return ':'.join(match.app_names + [match.url_name])
+    return match.route
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class ViewStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.statuses = {}
+        self.query_seconds = 0.0
+        self.template_seconds = 0.0
+        self.response_bytes = 0
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    def record(self, view, method, status, duration, queries, query_seconds, template_seconds, response_bytes):
+        with self._lock:
+            stats = self._views.get((view, method))
+            if stats is None:
+                stats = self._views[(view, method)] = ViewStats()
+            stats.latency.observe(duration)
+            stats.queries.observe(queries)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.query_seconds += query_seconds
+            stats.template_seconds += template_seconds
+            stats.response_bytes += response_bytes
+
+    def render(self):
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = []
+            self._render_histogram(lines, 'note_http_request_duration_seconds', 'Request latency.',
+                                   views, lambda stats: stats.latency)
+            self._render_histogram(lines, 'note_db_queries_per_request', 'SQL queries per request.',
+                                   views, lambda stats: stats.queries)
+
+            lines += ['# HELP note_http_requests_total Requests by response status.',
+                      '# TYPE note_http_requests_total counter']
+            for (view, method), stats in views:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append('note_http_requests_total{} {}'.format(
+                        _labels(view=view, method=method, status=status), count))
+
+            for name, help_text, attr in (
+                ('note_db_query_duration_seconds_total', 'Time spent executing SQL.', 'query_seconds'),
+                ('note_template_render_seconds_total', 'Time spent rendering templates.', 'template_seconds'),
+                ('note_http_response_size_bytes_total', 'Response body bytes.', 'response_bytes'),
+            ):
+                lines += ['# HELP {} {}'.format(name, help_text), '# TYPE {} counter'.format(name)]
+                for (view, method), stats in views:
+                    lines.append('{}{} {}'.format(name, _labels(view=view, method=method), getattr(stats, attr)))
+
+        lines += ['# HELP note_metrics_sample_rate Fraction of requests that are measured.',
+                  '# TYPE note_metrics_sample_rate gauge',
+                  'note_metrics_sample_rate {}'.format(get_sample_rate())]
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histogram(lines, name, help_text, views, get_histogram):
+        lines += ['# HELP {} {}'.format(name, help_text), '# TYPE {} histogram'.format(name)]
+        for (view, method), stats in views:
+            histogram = get_histogram(stats)
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append('{}_bucket{} {}'.format(name, _labels(view=view, method=method, le=bound), count))
+            lines.append('{}_bucket{} {}'.format(name, _labels(view=view, method=method, le='+Inf'), histogram.count))
+            lines.append('{}_sum{} {}'.format(name, _labels(view=view, method=method), histogram.sum))
+            lines.append('{}_count{} {}'.format(name, _labels(view=view, method=method), histogram.count))
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join('{}="{}"'.format(key, escape(value)) for key, value in labels.items()) + '}'
+
+
+registry = Registry()
+
+
+class RequestMeasurement:
+    """Context manager around one request; set ``response`` before leaving it to record."""
+
+    def __init__(self, request):
+        self.request = request
+        self.response = None
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.template_seconds = 0.0
+        self.rendering = False
+
+    def _execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_seconds += time.perf_counter() - start
+            self.queries += 1
+
+    def _wrap_connections(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self._execute_wrapper))
+
+    def _start(self):
+        self._token = _current.set(self)
+        self._started = time.perf_counter()
+
+    def _finish(self):
+        duration = time.perf_counter() - self._started
+        _current.reset(self._token)
+        if self.response is not None:
+            registry.record(
+                view_label(self.request), self.request.method, self.response.status_code, duration,
+                self.queries, self.query_seconds, self.template_seconds, self._response_size(),
+            )
+
+    def __enter__(self):
+        self._wrap_connections()
+        self._start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        self._finish()
+
+    # Database connections are per thread: under ASGI the ORM runs in the request's
+    # thread-sensitive executor thread, so the wrappers are installed there.
+    async def __aenter__(self):
+        await sync_to_async(self._wrap_connections)()
+        self._start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await sync_to_async(self._stack.close)()
+        self._finish()
+
+    def _response_size(self):
+        if self.response.streaming:
+            return int(self.response.get('Content-Length', 0))
+        return len(self.response.content)
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        measurement = _current.get()
+        if measurement is None or measurement.rendering:
+            return super().render(context, request)
+        # Only the outermost render is timed, a template rendered from inside another one is part of it.
+        measurement.rendering = True
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            measurement.template_seconds += time.perf_counter() - start
+            measurement.rendering = False
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing renders for the request metrics."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class MetricsView(View):
+    """Prometheus scrape endpoint, for staff users or with ``Authorization: Bearer <NOTE_METRICS_TOKEN>``."""
+
+    def get(self, request, *args, **kwargs):
+        if not self.is_allowed(request):
+            return HttpResponseForbidden('Forbidden')
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    @staticmethod
+    def is_allowed(request):
+        token = getattr(settings, 'NOTE_METRICS_TOKEN', '')
+        header = request.headers.get('Authorization', '')
+        if token and header.startswith('Bearer ') and hmac.compare_digest(header[len('Bearer '):], token):
+            return True
+        return request.user.is_authenticated and request.user.is_staff
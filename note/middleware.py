@@ -0,0 +1,109 @@
+import os
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics, routers, staticfiles
+
+
+class MetricsMiddleware:
+    """
+    Record per-view request metrics, see ``note.metrics``.
+
+    With ``NOTE_METRICS_SAMPLE_RATE`` below 1 only that fraction of requests is measured;
+    the others pass straight through.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not metrics.should_sample():
+            return self.get_response(request)
+        with metrics.RequestMeasurement(request) as measurement:
+            measurement.response = self.get_response(request)
+        return measurement.response
+
+    async def __acall__(self, request):
+        if not metrics.should_sample():
+            return await self.get_response(request)
+        async with metrics.RequestMeasurement(request) as measurement:
+            measurement.response = await self.get_response(request)
+        return measurement.response
+
+
+class ReplicaRoutingMiddleware:
+    """Scope the database routing state of ``note.routers`` to one request."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = routers.begin_request(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end_request(token)
+        return routers.pin_client(request, response)
+
+    async def __acall__(self, request):
+        token = routers.begin_request(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.end_request(token)
+        return routers.pin_client(request, response)
+
+
+class StaticFilesMiddleware:
+    """
+    Serve the files collected into ``STATIC_ROOT``, see ``note.staticfiles``.
+
+    Not used until collectstatic has created ``STATIC_ROOT``; files collected later are
+    picked up on restart.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.STATIC_ROOT or not os.path.isdir(settings.STATIC_ROOT):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server = staticfiles.StaticFilesServer()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        name = self.match(request)
+        if name is None:
+            return self.get_response(request)
+        return self.server.serve(request, name)
+
+    async def __acall__(self, request):
+        name = self.match(request)
+        if name is None:
+            return await self.get_response(request)
+        return await sync_to_async(self.server.serve)(request, name)
+
+    def match(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        return self.server.match(request.path_info)
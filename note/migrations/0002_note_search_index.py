@@ -0,0 +1,40 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import note.fields
+
+
+def create_search_index(apps, schema_editor):
+    from note.search import get_backend
+
+    backend = get_backend(schema_editor.connection.alias)
+    backend.setup()
+    backend.rebuild(apps.get_model('note', 'Note').objects.all())
+
+
+def drop_search_index(apps, schema_editor):
+    from note.search import get_backend
+
+    get_backend(schema_editor.connection.alias).teardown()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('note', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteSearchEntry',
+            fields=[
+                ('note', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='note.note')),
+                ('document', note.fields.FullTextDocumentField(db_column='note_note_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'note_note_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.1 on 2026-10-17 15:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('note', '0002_note_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['author', 'created', 'id'], name='note_author_created_id_idx'),
+        ),
+    ]
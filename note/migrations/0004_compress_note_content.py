@@ -0,0 +1,50 @@
+# Generated by Django 4.2.1 on 2026-10-17 16:01
+
+from django.db import migrations
+import note.fields
+
+BATCH_SIZE = 500
+
+
+def compress_contents(apps, schema_editor):
+    # Rows come back as plain text (legacy values) and are written through the field, compressed.
+    Note = apps.get_model('note', 'Note')
+    queryset = Note.objects.using(schema_editor.connection.alias).only('pk', 'content').order_by('pk')
+    batch = []
+    for note in queryset.iterator(chunk_size=BATCH_SIZE):
+        batch.append(note)
+        if len(batch) >= BATCH_SIZE:
+            Note.objects.using(schema_editor.connection.alias).bulk_update(batch, ['content'])
+            batch = []
+    if batch:
+        Note.objects.using(schema_editor.connection.alias).bulk_update(batch, ['content'])
+
+
+def decompress_contents(apps, schema_editor):
+    # Back to plain values before the column returns to text. SQLite keeps str values as
+    # TEXT; other databases get header-less UTF-8 bytes for their bytea -> text cast.
+    Note = apps.get_model('note', 'Note')
+    connection = schema_editor.connection
+    table = connection.ops.quote_name(Note._meta.db_table)
+    rows = Note.objects.using(connection.alias).values_list('pk', 'content').order_by('pk')
+    with connection.cursor() as cursor:
+        for pk, content in rows.iterator(chunk_size=BATCH_SIZE):
+            if content is not None and connection.vendor != 'sqlite':
+                content = connection.Database.Binary(content.encode('utf-8'))
+            cursor.execute('UPDATE {} SET content = %s WHERE id = %s'.format(table), [content, pk])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('note', '0003_note_author_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='note',
+            name='content',
+            field=note.fields.CompressedTextField(null=True),
+        ),
+        migrations.RunPython(compress_contents, decompress_contents),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.1 on 2026-10-17 16:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import note.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('note', '0004_compress_note_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('snapshot_number', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=150)),
+                ('data', note.fields.CompressedTextField()),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('note', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='note.note')),
+            ],
+            options={
+                'ordering': ['-number'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='noterevision',
+            constraint=models.UniqueConstraint(fields=('note', 'number'), name='note_revision_note_number_uniq'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.1 on 2026-10-17 17:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 2000
+
+
+def fill_stats(apps, schema_editor):
+    # One pass over the notes; contents are compressed, so their sizes are summed here.
+    Note = apps.get_model('note', 'Note')
+    NoteStats = apps.get_model('note', 'NoteStats')
+    alias = schema_editor.connection.alias
+    stats = {}
+    rows = Note.objects.using(alias).values_list('author_id', 'content', 'created', 'updated').order_by()
+    for author_id, content, created, updated in rows.iterator(chunk_size=BATCH_SIZE):
+        row = stats.setdefault(author_id, NoteStats(user_id=author_id))
+        row.note_count += 1
+        row.content_bytes += len(content.encode('utf-8')) if content else 0
+        row.last_created = max(filter(None, (row.last_created, created)))
+        row.last_updated = max(filter(None, (row.last_updated, updated)))
+    NoteStats.objects.using(alias).bulk_create(stats.values(), batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('note', '0007_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='note_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('note_count', models.PositiveIntegerField(default=0)),
+                ('content_bytes', models.PositiveBigIntegerField(default=0)),
+                ('last_created', models.DateTimeField(blank=True, null=True)),
+                ('last_updated', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'note stats',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.1 on 2026-10-17 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('note', '0008_notestats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['created', 'id'], name='note_created_id_idx'),
+        ),
+    ]
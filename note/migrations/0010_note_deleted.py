@@ -0,0 +1,42 @@
+# Generated by Django 4.2.1 on 2026-10-17 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('note', '0009_note_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='note',
+            name='note_author_created_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='note',
+            name='note_created_id_idx',
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='deleted',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(condition=models.Q(('deleted__isnull', True)), fields=['author', 'created', 'id'], name='note_author_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(condition=models.Q(('deleted__isnull', True)), fields=['created', 'id'], name='note_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(condition=models.Q(('deleted__isnull', False)), fields=['author', 'deleted'], name='note_trash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(condition=models.Q(('deleted__isnull', False)), fields=['deleted'], name='note_deleted_idx'),
+        ),
+    ]
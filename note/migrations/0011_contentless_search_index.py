@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+def rebuild_search_index(apps, schema_editor, contentless=True):
+    from note.search import SqliteSearchBackend, get_backend
+
+    backend = get_backend(schema_editor.connection.alias)
+    if not isinstance(backend, SqliteSearchBackend):
+        return
+    backend.teardown()
+    if contentless:
+        backend.setup()
+    else:
+        # The table as 0002_note_search_index created it, with a copy of every note's text.
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE {} USING fts5("
+            "title, content, tokenize='unicode61 remove_diacritics 2', prefix='2 3')".format(backend.table)
+        )
+        schema_editor.execute(
+            "INSERT INTO {0}({0}, rank) VALUES ('rank', %s)".format(backend.table),
+            ['bm25({}, {})'.format(backend.title_weight, backend.content_weight)],
+        )
+    backend.rebuild(apps.get_model('note', 'Note').objects.filter(deleted__isnull=True))
+
+
+def restore_search_content(apps, schema_editor):
+    rebuild_search_index(apps, schema_editor, contentless=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('note', '0010_note_deleted'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_index, restore_search_content),
+    ]
@@ -1,14 +1,72 @@
+import hashlib
+import math
+from calendar import timegm
+
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.http import Http404
 from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 from django.views import View
 
+from . import cache as note_cache, routers, throttle
+from .pagination import KeysetPaginator
+
 
 class ReMixinLoginRequired(LoginRequiredMixin):
     login_url = '/user/login/'
 
 
+class ReMixinReplicaReads:
+    """Serve the GET side of the view from a read replica, see ``note.routers``."""
+
+    def dispatch(self, request, *args, **kwargs):
+        routers.allow_replica_reads(request)
+        return super().dispatch(request, *args, **kwargs)
+
+
+class ReMixinThrottle:
+    """Throttle POSTs per client IP and per submitted username, see ``note.throttle``."""
+    throttle_scope = None
+    throttle_username_field = 'username'
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method == 'POST':
+            # Before the form is validated, so a throttled request never reaches the hasher.
+            retry_after = throttle.check(
+                request, self.throttle_scope, request.POST.get(self.throttle_username_field, '')
+            )
+            if retry_after:
+                response = render(request, 'note/custom_error.html', context={
+                    'error_message': 'Too Many Requests: Try again in {} seconds'.format(math.ceil(retry_after))
+                }, status=429)
+                response.headers['Retry-After'] = str(math.ceil(retry_after))
+                return response
+        return super().dispatch(request, *args, **kwargs)
+
+
 class ReMixinGuardDispatchSingleObject(View):
+    owner_field = 'author'
+
+    def get_queryset(self):
+        # Ownership is part of the lookup, so other users' notes are simply not found.
+        return super().get_queryset().filter(
+            **{self.owner_field: self.request.user}
+        ).select_related(self.owner_field)
+
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        if not hasattr(self, '_guarded_object'):
+            try:
+                self._guarded_object = super().get_object()
+            except Http404 as e:
+                self._guarded_object = e
+        if isinstance(self._guarded_object, Http404):
+            raise self._guarded_object
+        return self._guarded_object
+
     def dispatch(self, request, *args, **kwargs):
         try:
             hasattr(self, 'get_object') and self.get_object()
@@ -23,3 +81,113 @@ class ReMixinGuardDispatchSingleObject(View):
             }, status=400)
 
         return super().dispatch(request, *args, **kwargs)
+
+
+class ReMixinKeysetPagination:
+    paginate_by = 25
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size)
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+class ReMixinFragmentCache:
+    """
+    Cache the rendered ``fragment_template_name`` per user, per URL and per user version.
+
+    On a hit the page is rendered around the cached fragment without touching the view's
+    queryset. ``note.signals`` bumps the user's version whenever one of their notes changes.
+    """
+    fragment_template_name = None
+    fragment_cache_name = None
+    fragment_context_name = 'fragment'
+
+    def dispatch(self, request, *args, **kwargs):
+        self.fragment_cache_key = get_fragment_key(request, self.fragment_cache_name)
+        if self.fragment_cache_key:
+            fragment = note_cache.get_fragment(self.fragment_cache_key)
+            if fragment is not None:
+                return self.response_class(
+                    request=request,
+                    template=[self.template_name],
+                    context={self.fragment_context_name: fragment},
+                    using=self.template_engine,
+                )
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        fragment = render_to_string(self.fragment_template_name, context, self.request)
+        store_fragment(self.fragment_cache_key, fragment)
+        context[self.fragment_context_name] = fragment
+        return context
+
+
+def get_fragment_key(request, name):
+    """The cache key of this GET's ``name`` fragment, or None when it is not cached."""
+    if request.method == 'GET' and request.user.is_authenticated and note_cache.is_enabled():
+        return note_cache.fragment_key(request.user.pk, name, request.get_full_path())
+    return None
+
+
+def store_fragment(key, fragment):
+    # Not when rendered from a replica: one lagging behind a write would store the old
+    # notes under the user version that write moved to, as fresh.
+    if key and not routers.read_from_replica():
+        note_cache.set_fragment(key, fragment)
+
+
+class ReMixinConditionalGet:
+    """
+    Answer GET/HEAD with 304 Not Modified when the client's validators still match.
+
+    Views provide ``get_validators()`` returning ``(etag_source, last_modified)``; either may
+    be ``None``. The check runs before any rendering, so a 304 costs only the validator query.
+    """
+    # Whether If-Modified-Since alone may produce a 304; views whose Last-Modified does
+    # not move on every change (e.g. deletions from a list) must only trust the ETag.
+    trust_last_modified = True
+
+    def get_validators(self):
+        return None, None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or not request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+
+        etag, timestamp, response = check_validators(
+            request, *self.get_validators(), trust_last_modified=self.trust_last_modified
+        )
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return set_validators(response, etag, timestamp)
+
+
+def check_validators(request, etag_source, last_modified, trust_last_modified=True):
+    """
+    ``(etag, timestamp, response)`` of a GET/HEAD with these validators; ``response`` is
+    the 304/412 to send when the client's copy still matches, else None.
+    """
+    etag = None
+    if etag_source is not None:
+        etag = quote_etag(hashlib.md5(etag_source.encode('utf-8')).hexdigest())
+    timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp if trust_last_modified else None
+    )
+    return etag, timestamp, response
+
+
+def set_validators(response, etag, timestamp):
+    if etag and not response.has_header('ETag'):
+        response.headers['ETag'] = etag
+    if timestamp and not response.has_header('Last-Modified'):
+        response.headers['Last-Modified'] = http_date(timestamp)
+    # Per-user pages: only the browser may keep them, and it must revalidate each time.
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
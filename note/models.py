@@ -3,19 +3,209 @@ from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+from .fields import CompressedTextField, FullTextDocumentField
+
+
+def content_bytes(content):
+    return len(content.encode('utf-8')) if content else 0
+
+
+class LiveNoteManager(models.Manager):
+    """Notes that are not in the trash; ``Note.all_objects`` includes the trashed ones."""
+
+    def get_queryset(self):
+        # Matches the partial indexes' condition, so SQLite and PostgreSQL can use them.
+        return super().get_queryset().filter(deleted__isnull=True)
+
 
 class Note(models.Model):
     title = models.CharField(max_length=150)
-    content = models.TextField(null=True)
+    content = CompressedTextField(null=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='note')
     updated = models.DateTimeField(auto_now=True)
     created = models.DateTimeField(default=timezone.now)
+    # When the note was moved to the trash (see note.bulk.trash_notes); purged after NOTE_TRASH_DAYS.
+    deleted = models.DateTimeField(null=True, blank=True, editable=False)
+    tags = models.ManyToManyField('Tag', through='NoteTag', related_name='notes', blank=True)
+
+    objects = LiveNoteManager()
+    all_objects = models.Manager()
 
     def get_absolute_url(self):
         return reverse('note:single', args=[self.pk])
 
     class Meta:
         ordering = ['-created']
+        # Partial indexes: the live ones leave the trash out, the trash ones hold only it.
+        indexes = [
+            # Serves the per-author list ordered by (created, id) and its keyset cursors.
+            models.Index(fields=['author', 'created', 'id'], name='note_author_created_id_idx',
+                         condition=models.Q(deleted__isnull=True)),
+            # Serves the admin changelist of all notes: (-created, -id) order and creation date filter.
+            models.Index(fields=['created', 'id'], name='note_created_id_idx',
+                         condition=models.Q(deleted__isnull=True)),
+            # The trash page of an author, and the purge of expired notes.
+            models.Index(fields=['author', 'deleted'], name='note_trash_idx',
+                         condition=models.Q(deleted__isnull=False)),
+            models.Index(fields=['deleted'], name='note_deleted_idx', condition=models.Q(deleted__isnull=False)),
+        ]
 
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded(field_names)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using, fields)
+        if fields is None:
+            fields = [field.attname for field in self._meta.concrete_fields
+                      if field.attname not in self.get_deferred_fields()]
+        self._remember_loaded(fields)
+
+    def _remember_loaded(self, field_names):
+        if 'title' in field_names and 'content' in field_names:
+            # Base of the next revision delta, see note.revisions
+            self._revision_base = (self.title, self.content or '')
+        elif 'title' in field_names or 'content' in field_names:
+            # Half of it is stale: note.revisions rebuilds the base from the stored revisions.
+            self.__dict__.pop('_revision_base', None)
+        if 'content' in field_names:
+            # Base of the author's content_bytes change on save, see note.stats
+            self._content_bytes = content_bytes(self.content)
+
+
+class Tag(models.Model):
+    """
+    A user's tag or folder. ``note_count`` is kept up to date as notes are tagged, untagged
+    and deleted (see ``note.tags``), so listing tags with their counts never counts rows.
+    """
+    TAG, FOLDER = 'tag', 'folder'
+    KIND_CHOICES = [(TAG, 'Tag'), (FOLDER, 'Folder')]
+
+    # The (user, kind, name) unique constraint indexes user lookups already.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tags', db_index=False)
+    kind = models.CharField(max_length=6, choices=KIND_CHOICES, default=TAG)
+    name = models.CharField(max_length=50)
+    note_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['kind', 'name']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind', 'name'], name='note_tag_user_kind_name_uniq'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class NoteTag(models.Model):
+    """Link of ``Note.tags``; filtering the notes of a tag joins on its (tag, note) index."""
+    note = models.ForeignKey(Note, on_delete=models.CASCADE, related_name='note_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='note_tags', db_index=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'note'], name='note_notetag_tag_note_uniq'),
+        ]
+
+
+class NoteStats(models.Model):
+    """
+    A user's note totals, updated in the transaction of every note write (see ``note.stats``)
+    so that showing them is a primary key lookup instead of COUNT/MAX over their notes.
+    ``content_bytes`` is the UTF-8 size of the contents, before compression.
+    """
+    user = models.OneToOneField(User, primary_key=True, on_delete=models.CASCADE, related_name='note_stats')
+    note_count = models.PositiveIntegerField(default=0)
+    content_bytes = models.PositiveBigIntegerField(default=0)
+    last_created = models.DateTimeField(null=True, blank=True)
+    last_updated = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'note stats'
+
+    def __str__(self):
+        return '{} notes of user {}'.format(self.note_count, self.user_id)
+
+
+class NoteRevision(models.Model):
+    """
+    One saved version of a note: a full snapshot of its content, or a delta against the
+    previous revision (see ``note.revisions``). ``snapshot_number`` is the revision the
+    delta chain starts from, so a revision equal to it is a snapshot.
+    """
+    # The (note, number) unique constraint indexes note lookups already.
+    note = models.ForeignKey(Note, on_delete=models.CASCADE, related_name='revisions', db_index=False)
+    number = models.PositiveIntegerField()
+    snapshot_number = models.PositiveIntegerField()
+    title = models.CharField(max_length=150)
+    data = CompressedTextField()
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-number']
+        constraints = [
+            models.UniqueConstraint(fields=['note', 'number'], name='note_revision_note_number_uniq'),
+        ]
+
+    @property
+    def is_snapshot(self):
+        return self.number == self.snapshot_number
+
+    def __str__(self):
+        return '{} #{}'.format(self.title, self.number)
+
+
+class NoteSearchEntry(models.Model):
+    """Row of the SQLite FTS5 index created by ``note.search.SqliteSearchBackend``."""
+    note = models.OneToOneField(
+        Note, primary_key=True, db_column='rowid', db_constraint=False,
+        on_delete=models.DO_NOTHING, related_name='search_entry',
+    )
+    document = FullTextDocumentField(db_column='note_note_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'note_note_fts'
+
+
+class Job(models.Model):
+    """A queued call of a ``note.tasks`` function, run by ``manage.py run_workers`` (see ``note.jobs``)."""
+    QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (SUCCEEDED, 'Succeeded'), (FAILED, 'Failed')]
+
+    task = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict)
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    worker = models.CharField(max_length=100, blank=True)
+    lease_expires = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(default=timezone.now)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            # The workers' claim query: due jobs in run_after order.
+            models.Index(fields=['status', 'run_after'], name='note_job_status_run_after_idx'),
+        ]
+
+    @property
+    def is_done(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+    def get_absolute_url(self):
+        return reverse('note:job', args=[self.pk])
+
+    def __str__(self):
+        return '{} #{} ({})'.format(self.task, self.pk, self.status)
@@ -0,0 +1,126 @@
+import datetime
+
+from django.core import signing
+from django.db.models import Q
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over the queryset's ordering with the primary key as tiebreaker.
+
+    Each page is fetched with a range condition on the ordering columns instead of
+    an OFFSET, so any page costs the same as the first one when an index covers the
+    ordering. Cursors are signed and opaque to clients.
+    """
+    salt = 'note.pagination'
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = self._get_ordering(queryset)
+
+    @staticmethod
+    def _get_ordering(queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        for field in ordering:
+            if not isinstance(field, str):
+                raise ValueError('KeysetPaginator only supports ordering by field names, got {!r}.'.format(field))
+        if not any(field.lstrip('-') in ('pk', 'id') for field in ordering):
+            descending = ordering[-1].startswith('-') if ordering else False
+            ordering.append('-pk' if descending else 'pk')
+        return ordering
+
+    def encode_cursor(self, obj, direction):
+        values = [self._serialize(getattr(obj, field.lstrip('-'))) for field in self.ordering]
+        return signing.dumps({'o': self.ordering, 'd': direction, 'v': values}, salt=self.salt, compress=True)
+
+    def decode_cursor(self, cursor):
+        try:
+            payload = signing.loads(cursor, salt=self.salt)
+        except signing.BadSignature:
+            return None, None
+        if payload.get('o') != self.ordering or payload.get('d') not in ('next', 'previous'):
+            return None, None
+        return payload['d'], payload['v']
+
+    @staticmethod
+    def _serialize(value):
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        return value
+
+    def _keyset_filter(self, ordering, values):
+        # (a, b, c) after (x, y, z)  <=>  a >= x AND (a > x OR (a = x AND (b > y OR (b = y AND c > z))))
+        # The leading non-strict bound keeps the condition usable as an index range.
+        condition = None
+        for field, value in reversed(list(zip(ordering, values))):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            strict = Q(**{'{}__{}'.format(name, lookup): value})
+            condition = strict if condition is None else strict | (Q(**{name: value}) & condition)
+        first = ordering[0]
+        first_bound = Q(**{'{}__{}e'.format(first.lstrip('-'), 'lt' if first.startswith('-') else 'gt'): values[0]})
+        return first_bound & condition
+
+    @staticmethod
+    def _reverse(ordering):
+        return [field[1:] if field.startswith('-') else '-' + field for field in ordering]
+
+    def _page_query(self, cursor):
+        direction, values = self.decode_cursor(cursor) if cursor else (None, None)
+        ordering = self.ordering
+        if direction == 'previous':
+            ordering = self._reverse(ordering)
+
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._keyset_filter(ordering, values))
+        return direction, queryset[:self.per_page + 1]
+
+    def _build_page(self, direction, items):
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+
+        if direction == 'previous':
+            items.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, direction == 'next'
+
+        if not items:
+            return KeysetPage(items)
+        return KeysetPage(
+            items,
+            next_cursor=self.encode_cursor(items[-1], 'next') if has_next else None,
+            previous_cursor=self.encode_cursor(items[0], 'previous') if has_previous else None,
+        )
+
+    def page(self, cursor=None):
+        direction, queryset = self._page_query(cursor)
+        return self._build_page(direction, list(queryset))
+
+    async def apage(self, cursor=None):
+        direction, queryset = self._page_query(cursor)
+        return self._build_page(direction, [item async for item in queryset])
@@ -0,0 +1,114 @@
+"""
+Revision history of notes stored as forward deltas.
+
+Every change of a note's title or content adds a ``NoteRevision``. Its content is a
+delta against the previous revision: a JSON list of ``[start, end]`` token ranges copied
+from the previous version and strings inserted between them, so its size follows the
+size of the edit. Every ``NOTE_REVISION_SNAPSHOT_EVERY`` revisions (or when a delta
+would not be smaller than the text) a full snapshot starts a new chain, which bounds the
+work to rebuild any revision. Revision 1 is written lazily, on the first edit.
+"""
+import difflib
+import json
+import re
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Max
+
+TOKEN_RE = re.compile(r'\S+\s*|\s+')
+
+
+def get_snapshot_interval():
+    return getattr(settings, 'NOTE_REVISION_SNAPSHOT_EVERY', 20)
+
+
+def tokenize(text):
+    # Words with their trailing whitespace; joining the tokens gives the text back.
+    return TOKEN_RE.findall(text)
+
+
+def make_delta(old, new):
+    old_tokens, new_tokens = tokenize(old), tokenize(new)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(''.join(new_tokens[j1:j2]))
+    return json.dumps(ops, ensure_ascii=False, separators=(',', ':'))
+
+
+def apply_delta(old, delta):
+    old_tokens = tokenize(old)
+    return ''.join(
+        op if isinstance(op, str) else ''.join(old_tokens[op[0]:op[1]])
+        for op in json.loads(delta)
+    )
+
+
+def rebuild(note, number, using=DEFAULT_DB_ALIAS):
+    """``(title, content)`` of revision ``number``, from its snapshot and the deltas after it."""
+    from .models import NoteRevision
+
+    revisions = NoteRevision.objects.using(using)
+    target = revisions.only('snapshot_number').get(note=note, number=number)
+    chain = revisions.filter(
+        note=note, number__gte=target.snapshot_number, number__lte=number,
+    ).order_by('number')
+    content = None
+    for revision in chain:
+        content = revision.data if revision.is_snapshot else apply_delta(content, revision.data)
+        title = revision.title
+    return title, content
+
+
+def record(notes, using=DEFAULT_DB_ALIAS):
+    """Add a revision for each note whose title or content changed since it was loaded."""
+    from .models import NoteRevision
+
+    notes = [note for note in notes if _current(note) != getattr(note, '_revision_base', None)]
+    if not notes:
+        return []
+    latest = {
+        row['note_id']: row for row in NoteRevision.objects.using(using).filter(
+            note__in=[note.pk for note in notes],
+        ).values('note_id').annotate(number=Max('number'), snapshot_number=Max('snapshot_number'))
+    }
+
+    interval = get_snapshot_interval()
+    revisions = []
+    for note in notes:
+        title, content = _current(note)
+        base = getattr(note, '_revision_base', None)
+        last = latest.get(note.pk)
+        if last is None and base is not None:
+            # First edit: the loaded version becomes revision 1.
+            revisions.append(NoteRevision(
+                note=note, number=1, snapshot_number=1, title=base[0], data=base[1], created=note.created,
+            ))
+            number, snapshot_number = 2, 1
+        elif last is None:
+            number = snapshot_number = 1
+        else:
+            number, snapshot_number = last['number'] + 1, last['snapshot_number']
+            if base is None:
+                base = rebuild(note, last['number'], using)
+
+        data = None
+        if number != snapshot_number and number - snapshot_number < interval:
+            delta = make_delta(base[1], content)
+            if len(delta) < len(content):
+                data = delta
+        if data is None:
+            data, snapshot_number = content, number
+        revisions.append(NoteRevision(
+            note=note, number=number, snapshot_number=snapshot_number, title=title, data=data,
+        ))
+        note._revision_base = (title, content)
+    return NoteRevision.objects.using(using).bulk_create(revisions)
+
+
+def _current(note):
+    return note.title, note.content or ''
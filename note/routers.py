@@ -0,0 +1,104 @@
+"""
+Primary/replica routing for the note models.
+
+Writes always go to ``default``. Reads of ``note`` models go to one of the aliases in
+``settings.NOTE_DATABASE_REPLICAS`` only inside a request that allowed it (the GET side
+of the read-only views, see ``ReMixinReplicaReads``) and only while the client is not
+pinned: any request with an unsafe method sets a short-lived cookie that keeps that
+client on the primary for ``NOTE_REPLICA_STICKY_SECONDS``, so users read their own
+writes. Auth and session tables are never routed.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+
+PRIMARY = 'default'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = contextvars.ContextVar('note_routing_state', default=None)
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.replica_reads = False
+        self.replica = None
+
+
+def get_replicas():
+    return list(getattr(settings, 'NOTE_DATABASE_REPLICAS', []))
+
+
+def get_sticky_cookie():
+    return getattr(settings, 'NOTE_REPLICA_STICKY_COOKIE', 'note_primary')
+
+
+def get_sticky_seconds():
+    return getattr(settings, 'NOTE_REPLICA_STICKY_SECONDS', 10)
+
+
+def pick_replica(replicas):
+    return random.choice(replicas)
+
+
+def begin_request(request):
+    return _state.set(RoutingState(pinned=get_sticky_cookie() in request.COOKIES))
+
+
+def end_request(token):
+    _state.reset(token)
+
+
+def pin_client(request, response):
+    if request.method not in SAFE_METHODS and get_replicas():
+        response.set_cookie(get_sticky_cookie(), '1', max_age=get_sticky_seconds(), httponly=True, samesite='Lax')
+    return response
+
+
+def allow_replica_reads(request):
+    """Let the rest of this request read note models from a replica, if it is a safe, unpinned one."""
+    state = _state.get()
+    if state is not None and request.method in SAFE_METHODS and not state.pinned:
+        state.replica_reads = True
+
+
+def read_from_replica():
+    """Whether this request read note models from a replica, which may lag behind the primary."""
+    state = _state.get()
+    return state is not None and state.replica is not None and state.replica in get_replicas()
+
+
+class PrimaryReplicaRouter:
+    app_labels = ('note',)
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if model._meta.app_label not in self.app_labels or state is None or not state.replica_reads:
+            return None
+        if state.pinned:
+            return PRIMARY
+        if state.replica is None:
+            # One replica per request, so all of its reads see the same snapshot
+            replicas = get_replicas()
+            state.replica = pick_replica(replicas) if replicas else PRIMARY
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # Read-your-writes inside the request as well
+            state.pinned = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {PRIMARY, *get_replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary, they are never migrated on their own.
+        if db in get_replicas():
+            return False
+        return None
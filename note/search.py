@@ -0,0 +1,266 @@
+import re
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def parse_terms(query):
+    """Split a user search string into plain word terms, dropping any query syntax."""
+    return TERM_RE.findall(query or '')
+
+
+class BaseSearchBackend:
+    """
+    Full-text index over ``Note.title`` and ``Note.content``.
+
+    The index is kept in sync by the ``Note`` signal handlers in ``note.signals``;
+    ``rebuild()`` repopulates it from scratch (see ``manage.py rebuild_search_index``).
+    """
+    rank_annotation = 'search_rank'
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def setup(self):
+        pass
+
+    def teardown(self):
+        pass
+
+    def index(self, notes):
+        pass
+
+    def remove(self, notes):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def rebuild(self, queryset=None, chunk_size=2000):
+        """
+        Index ``queryset`` (all live notes by default) from scratch, one chunk of notes per
+        transaction, so writers are never held up for the whole rebuild. Notes saved
+        meanwhile are reindexed by their signals; searches miss the notes whose chunk has
+        not been indexed yet until it finishes.
+        """
+        if queryset is None:
+            from .models import Note
+            queryset = Note.objects.all()
+        queryset = queryset.using(self.using).order_by('pk').only('pk', 'title', 'content')
+
+        with transaction.atomic(using=self.using):
+            self.clear()
+        count, last = 0, None
+        while True:
+            with transaction.atomic(using=self.using):
+                # Keyset over the primary key, like note.bulk; index() replaces any entry
+                # a concurrent save added since the clear.
+                chunk = list((queryset if last is None else queryset.filter(pk__gt=last))[:chunk_size])
+                self.index(chunk)
+            count += len(chunk)
+            if len(chunk) < chunk_size:
+                return count
+            last = chunk[-1].pk
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """
+    Unindexed matching, for databases without a full-text engine.
+
+    ``Note.content`` is stored compressed, so it is matched in Python over the
+    candidate rows; only their ids go back into the queryset.
+    """
+
+    def search(self, queryset, query):
+        terms = [term.lower() for term in parse_terms(query)]
+        if not terms:
+            return queryset.none()
+        matches = [
+            pk for pk, title, content in queryset.order_by().values_list('pk', 'title', 'content').iterator()
+            if all(term in title.lower() or term in (content or '').lower() for term in terms)
+        ]
+        return queryset.filter(pk__in=matches)
+
+
+class SqliteSearchBackend(BaseSearchBackend):
+    """
+    SQLite FTS5 virtual table keyed by the note id (see ``NoteSearchEntry``), ranked with bm25.
+
+    The table is contentless: it keeps the index but not a copy of the text, which would
+    be an uncompressed duplicate of every note (``Note.content`` is stored compressed). An
+    entry is removed with FTS5's ``'delete'`` command, given the exact text it was indexed
+    with: the title and content the note was loaded or last refreshed with
+    (``_revision_base``, see ``Note.from_db``), so notes being reindexed or removed must
+    have been loaded with both.
+    """
+    table = 'note_note_fts'
+    title_weight = 10.0
+    content_weight = 1.0
+
+    def setup(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS {} USING fts5("
+                "title, content, content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3')".format(self.table)
+            )
+            # Persist the bm25 column weights as the table's default ``rank`` function.
+            cursor.execute(
+                "INSERT INTO {0}({0}, rank) VALUES ('rank', %s)".format(self.table),
+                ['bm25({}, {})'.format(self.title_weight, self.content_weight)],
+            )
+
+    def teardown(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS {}'.format(self.table))
+
+    def index(self, notes):
+        notes = list(notes)
+        if not notes:
+            return
+        self.remove(notes)
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO {}(rowid, title, content) VALUES (%s, %s, %s)'.format(self.table),
+                [(note.pk, note.title, note.content or '') for note in notes],
+            )
+
+    def remove(self, notes):
+        notes = list(notes)
+        if not notes:
+            return
+        with self.connection.cursor() as cursor:
+            # Only entries that exist: FTS5 applies a 'delete' of anything, corrupting its counts.
+            cursor.execute(
+                'SELECT rowid FROM {} WHERE rowid IN ({})'.format(self.table, ', '.join(['%s'] * len(notes))),
+                [note.pk for note in notes],
+            )
+            indexed = {row[0] for row in cursor.fetchall()}
+            rows = [(note.pk, *self.indexed_text(note)) for note in notes if note.pk in indexed]
+            if rows:
+                cursor.executemany(
+                    "INSERT INTO {0}({0}, rowid, title, content) VALUES ('delete', %s, %s, %s)".format(self.table),
+                    rows,
+                )
+
+    @staticmethod
+    def indexed_text(note):
+        """``(title, content)`` ``note`` is indexed with: as loaded or refreshed, before any unsaved change."""
+        base = getattr(note, '_revision_base', None)
+        return base if base is not None else (note.title, note.content or '')
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("INSERT INTO {0}({0}) VALUES ('delete-all')".format(self.table))
+
+    def build_query(self, query):
+        # Every term is quoted (so user input is never parsed as FTS syntax) and prefix-matched.
+        return ' '.join('"{}"*'.format(term) for term in parse_terms(query))
+
+    def search(self, queryset, query):
+        match = self.build_query(query)
+        if not match:
+            return queryset.none()
+        # Joining the FTS table lets SQLite drive the query from the full-text index
+        # and read bm25 from its ``rank`` column in a single MATCH evaluation.
+        return queryset.filter(search_entry__document__match=match).annotate(
+            **{self.rank_annotation: F('search_entry__rank')}
+        ).order_by(self.rank_annotation, '-created')
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Side table of weighted ``tsvector`` documents with a GIN index, ranked with ``ts_rank``."""
+    table = 'note_note_search'
+    config = 'simple'
+
+    def setup(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE IF NOT EXISTS {} ('
+                'note_id bigint PRIMARY KEY REFERENCES note_note (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+                'document tsvector NOT NULL)'.format(self.table)
+            )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS {0}_document_idx ON {0} USING GIN (document)'.format(self.table)
+            )
+
+    def teardown(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS {}'.format(self.table))
+
+    def index(self, notes):
+        notes = list(notes)
+        if not notes:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO {} (note_id, document) VALUES '
+                "(%s, setweight(to_tsvector(%s::regconfig, %s), 'A') || setweight(to_tsvector(%s::regconfig, %s), 'B')) "
+                'ON CONFLICT (note_id) DO UPDATE SET document = EXCLUDED.document'.format(self.table),
+                [(note.pk, self.config, note.title, self.config, note.content or '') for note in notes],
+            )
+
+    def remove(self, notes):
+        pks = [note.pk for note in notes]
+        if not pks:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.execute('DELETE FROM {} WHERE note_id = ANY(%s)'.format(self.table), [pks])
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('TRUNCATE {}'.format(self.table))
+
+    def build_query(self, query):
+        return ' & '.join('{}:*'.format(term) for term in parse_terms(query))
+
+    def search(self, queryset, query):
+        tsquery = self.build_query(query)
+        if not tsquery:
+            return queryset.none()
+        note_table = queryset.model._meta.db_table
+        matches = RawSQL(
+            'SELECT note_id FROM {} WHERE document @@ to_tsquery(%s::regconfig, %s)'.format(self.table),
+            [self.config, tsquery],
+        )
+        rank = RawSQL(
+            'SELECT -ts_rank(document, to_tsquery(%s::regconfig, %s)) FROM {} WHERE note_id = {}.id'.format(
+                self.table, note_table,
+            ),
+            [self.config, tsquery],
+        )
+        return queryset.filter(pk__in=matches).annotate(**{self.rank_annotation: rank}).order_by(
+            self.rank_annotation, '-created'
+        )
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SqliteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(using=DEFAULT_DB_ALIAS):
+    """
+    Return the search backend for a database alias.
+
+    ``settings.NOTE_SEARCH_BACKEND`` may name a backend class by dotted path;
+    otherwise one is picked from the database vendor.
+    """
+    backend_path = getattr(settings, 'NOTE_SEARCH_BACKEND', None)
+    if backend_path:
+        backend_class = import_string(backend_path)
+    else:
+        backend_class = VENDOR_BACKENDS.get(connections[using].vendor, SimpleSearchBackend)
+    return backend_class(using=using)
@@ -0,0 +1,86 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import auth, cache, db, revisions, search, stats, tags
+from .models import Note
+
+
+@receiver(post_save, sender=Note)
+def index_note(sender, instance, using, **kwargs):
+    search.get_backend(using).index([instance])
+
+
+@receiver(post_save, sender=Note)
+def record_revision(sender, instance, created, using, **kwargs):
+    if created:
+        instance._revision_base = (instance.title, instance.content or '')
+    else:
+        revisions.record([instance], using)
+
+
+@receiver(post_delete, sender=Note)
+def unindex_note(sender, instance, using, **kwargs):
+    search.get_backend(using).remove([instance])
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+def invalidate_author_fragments(sender, instance, using, **kwargs):
+    cache.bump_user_version(instance.author_id, using)
+
+
+@receiver(m2m_changed, sender=Note.tags.through)
+def count_tagged_notes(sender, instance, action, reverse, pk_set, using, **kwargs):
+    tags.links_changed(instance, action, reverse, pk_set, using)
+    if action.startswith('post_'):
+        cache.bump_user_version(instance.user_id if reverse else instance.author_id, using)
+
+
+@receiver(pre_delete, sender=Note)
+def uncount_deleted_note(sender, instance, using, **kwargs):
+    # A note in the trash was uncounted when it was trashed (see note.bulk.trash_notes).
+    if instance.deleted is None:
+        tags.note_deleted(instance, using)
+
+
+@receiver(post_save, sender=Note)
+def update_author_stats(sender, instance, created, update_fields, using, **kwargs):
+    stats.note_saved(instance, created, update_fields, using)
+
+
+@receiver(post_delete, sender=Note)
+def update_author_stats_on_delete(sender, instance, using, **kwargs):
+    # After the DELETE, so a new latest timestamp is looked up among the remaining notes.
+    if instance.deleted is None:
+        stats.note_deleted(instance, using)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_cached_user(sender, instance, using, **kwargs):
+    # After the commit: a request in between would cache the old row again.
+    transaction.on_commit(partial(auth.invalidate_user, instance.pk), using=using)
+
+
+@receiver(user_logged_in)
+def cache_logged_in_user(sender, request, user, **kwargs):
+    # Runs after last_login is saved, so the first request of the session is a cache hit.
+    auth.cache_user(user)
+
+
+@receiver(user_logged_out)
+def invalidate_logged_out_user(sender, request, user, **kwargs):
+    if user is not None:
+        auth.invalidate_user(user.pk)
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        db.apply_sqlite_pragmas(connection.connection)
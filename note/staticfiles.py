@@ -0,0 +1,137 @@
+"""
+Static files with hashed names and pre-compressed variants, served by the app server.
+
+``CompressedManifestStaticFilesStorage`` is Django's manifest storage (content-hashed
+names, so a file's URL changes whenever it does) that also writes ``.gz`` and, with the
+optional ``brotli`` package installed, ``.br`` variants of text assets at collectstatic
+time. Before collectstatic has run, as in development and tests, ``{% static %}`` falls
+back to the unhashed names served by the staticfiles app.
+
+``StaticFilesServer`` answers requests under ``STATIC_URL`` from ``STATIC_ROOT``, with the
+brotli or gzip variant when the client accepts it. Hashed names are sent with a one-year immutable
+``Cache-Control``; other files are revalidated after ``NOTE_STATIC_MAX_AGE`` seconds.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # optional, only gzip variants are written without it
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.txt', '.html', '.json', '.xml')
+MIN_COMPRESS_SIZE = 512
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Preferred first; the variant's file suffix and Content-Encoding
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def compress(content):
+    """``{suffix: compressed bytes}`` of the variants worth keeping for ``content``."""
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content)
+    return {suffix: data for suffix, data in variants.items() if len(data) < len(content)}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def stored_name(self, name):
+        if not self.hashed_files:
+            # No manifest: collectstatic has not run, serve the source names.
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in list(paths) + list(self.hashed_files.values()):
+            self.write_compressed(name)
+
+    def write_compressed(self, name):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS) or not self.exists(name):
+            return
+        with self.open(name) as f:
+            content = f.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, data in compress(content).items():
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(data))
+
+
+class StaticFilesServer:
+    """Index of the files collected into ``STATIC_ROOT``, built once per process."""
+
+    def __init__(self, root=None, url=None):
+        self.root = str(root or settings.STATIC_ROOT)
+        self.prefix = '/' + (url or settings.STATIC_URL).lstrip('/')
+        self.max_age = getattr(settings, 'NOTE_STATIC_MAX_AGE', 60)
+        self.immutable = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        self.files = {}
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, '/')
+                self.files[name] = os.stat(path)
+
+    def match(self, path):
+        """The collected name for a request path, ``None`` if it is not a static file."""
+        if not path.startswith(self.prefix):
+            return None
+        name = posixpath.normpath(path[len(self.prefix):]).lstrip('/')
+        if name.startswith('..') or name.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+            return None
+        return name if name in self.files else None
+
+    def serve(self, request, name):
+        accepted = accepted_encodings(request)
+        encoding, filename = None, name
+        for candidate, suffix in ENCODINGS:
+            if candidate in accepted and name + suffix in self.files:
+                encoding, filename = candidate, name + suffix
+                break
+        stat = self.files[filename]
+
+        response = get_conditional_response(request, last_modified=int(stat.st_mtime))
+        if response is None:
+            content_type, _ = mimetypes.guess_type(name)
+            if content_type and content_type.startswith('text/'):
+                content_type += '; charset=utf-8'
+            content_type = content_type or 'application/octet-stream'
+            if request.method == 'HEAD':
+                response = HttpResponse(content_type=content_type)
+            else:
+                # Streamed from the open file in blocks (or with sendfile by the server).
+                response = FileResponse(open(os.path.join(self.root, filename), 'rb'), content_type=content_type)
+                # FileResponse names the file, here the compressed variant, as inline content.
+                del response.headers['Content-Disposition']
+            response.headers['Content-Length'] = str(stat.st_size)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.headers['Last-Modified'] = http_date(stat.st_mtime)
+        if name in self.immutable:
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response.headers['Cache-Control'] = 'public, max-age={}'.format(self.max_age)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+def accepted_encodings(request):
+    accepted = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(coding.strip().lower())
+    return accepted
@@ -0,0 +1,147 @@
+"""
+Per-user note totals: count, content bytes, last created and last updated.
+
+``NoteStats`` is changed by the same transaction as the notes: the ``Note`` signal
+receivers call ``note_saved``/``note_deleted`` (inside ``save_changes``, the add views'
+``atomic()`` and the deletion's transaction) and the bulk paths call ``notes_created``,
+``notes_updated`` and ``notes_deleted``. Each change is one UPDATE with F() expressions,
+so concurrent writes add up instead of overwriting each other. Deleting the newest or last updated note reads
+the author's remaining notes for the new timestamp; a CASE keeps that to those deletes.
+
+``reconcile`` recomputes the totals of a batch of users and fixes the rows that drifted,
+e.g. after rows were changed with raw SQL (``manage.py reconcile_note_stats``).
+"""
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Case, F, Max, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Note, NoteStats, content_bytes
+
+FIELDS = ('note_count', 'content_bytes', 'last_created', 'last_updated')
+# Stats timestamp and the note field it is the latest of
+LATEST_FIELDS = (('last_created', 'created'), ('last_updated', 'updated'))
+
+
+def for_user(user, using=None):
+    """The user's totals; an unsaved zero row if they never had a note."""
+    try:
+        return NoteStats.objects.using(using).get(user=user)
+    except NoteStats.DoesNotExist:
+        return NoteStats(user=user)
+
+
+def change(user_id, using=DEFAULT_DB_ALIAS, notes=0, size=0, created=None, updated=None, removed=None):
+    """
+    Add ``notes`` and ``size`` to a user's totals and move the timestamps forward to
+    ``created``/``updated``. ``removed`` is a deleted note's ``(created, updated)``: a
+    timestamp it was equal to is looked up again among the remaining notes.
+    """
+    values = {'note_count': F('note_count') + notes, 'content_bytes': F('content_bytes') + size}
+    for field, value in (('last_created', created), ('last_updated', updated)):
+        if value is not None:
+            values[field] = Greatest(Coalesce(field, Value(value)), Value(value))
+    if removed is not None:
+        for (field, note_field), value in zip(LATEST_FIELDS, removed):
+            latest = Note.objects.filter(author=OuterRef('user')).order_by().values('author')
+            latest = latest.annotate(latest=Max(note_field)).values('latest')
+            values[field] = Case(When(**{field + '__lte': value}, then=Subquery(latest)), default=F(field))
+
+    rows = NoteStats.objects.using(using).filter(user_id=user_id)
+    if rows.update(**values) or notes < 0:
+        # No row on a delete: the user's own deletion cascaded to it first.
+        return
+    # No row yet: count it from the notes, which already include this change.
+    row = compute([user_id], using)[user_id]
+    _, created = NoteStats.objects.using(using).get_or_create(
+        user_id=user_id, defaults={field: getattr(row, field) for field in FIELDS},
+    )
+    if not created:
+        rows.update(**values)
+
+
+def note_saved(note, created, update_fields, using):
+    size = content_bytes(note.content) if update_fields is None or 'content' in update_fields else None
+    base = getattr(note, '_content_bytes', None)
+    if created:
+        change(note.author_id, using, notes=1, size=size or 0, created=note.created, updated=note.updated)
+    else:
+        change(note.author_id, using, size=size - base if None not in (size, base) else 0, updated=note.updated)
+    if size is not None:
+        note._content_bytes = size
+
+
+def note_deleted(note, using):
+    change(note.author_id, using, notes=-1, size=-getattr(note, '_content_bytes', 0),
+           removed=(note.created, note.updated))
+
+
+def notes_created(notes, using=DEFAULT_DB_ALIAS):
+    """Add notes inserted with ``bulk_create`` to their authors' totals."""
+    for author_id, group in _by_author(notes).items():
+        sizes = [content_bytes(note.content) for note in group]
+        change(author_id, using, notes=len(group), size=sum(sizes),
+               created=max(note.created for note in group), updated=max(note.updated for note in group))
+        for note, size in zip(group, sizes):
+            note._content_bytes = size
+
+
+def notes_updated(notes, using=DEFAULT_DB_ALIAS):
+    """Apply the content size changes of notes written with ``bulk_update``."""
+    for author_id, group in _by_author(notes).items():
+        size = 0
+        for note in group:
+            new = content_bytes(note.content)
+            size += new - getattr(note, '_content_bytes', new)
+            note._content_bytes = new
+        change(author_id, using, size=size, updated=max(note.updated for note in group))
+
+
+def notes_deleted(notes, using=DEFAULT_DB_ALIAS):
+    """Subtract notes deleted (or given to another author) in bulk, after the UPDATE/DELETE."""
+    for author_id, group in _by_author(notes).items():
+        change(author_id, using, notes=-len(group), size=-sum(getattr(note, '_content_bytes', 0) for note in group),
+               removed=(max(note.created for note in group), max(note.updated for note in group)))
+
+
+def _by_author(notes):
+    groups = {}
+    for note in notes:
+        groups.setdefault(note.author_id, []).append(note)
+    return groups
+
+
+def compute(user_ids, using=DEFAULT_DB_ALIAS, chunk_size=2000):
+    """Totals of these users from their notes, ``{user_id: NoteStats}`` (unsaved)."""
+    totals = {user_id: NoteStats(user_id=user_id) for user_id in user_ids}
+    rows = Note.objects.using(using).filter(author_id__in=user_ids).order_by().values_list(
+        'author_id', 'content', 'created', 'updated',
+    )
+    for author_id, content, created, updated in rows.iterator(chunk_size=chunk_size):
+        row = totals[author_id]
+        row.note_count += 1
+        row.content_bytes += content_bytes(content)
+        row.last_created = max(filter(None, (row.last_created, created)))
+        row.last_updated = max(filter(None, (row.last_updated, updated)))
+    return totals
+
+
+def reconcile(user_ids, using=DEFAULT_DB_ALIAS, dry_run=False):
+    """Fix the stored totals of these users that differ from their notes; returns the fixed rows."""
+    with transaction.atomic(using):
+        # A no-op write first: it takes the write lock (SQLite) or locks the rows, so note
+        # writes of these users wait instead of changing the totals while they are counted.
+        NoteStats.objects.using(using).filter(user_id__in=user_ids).update(note_count=F('note_count'))
+        stored = NoteStats.objects.using(using).in_bulk(user_ids)
+        drifted = [
+            row for user_id, row in compute(user_ids, using).items()
+            if _values(stored.get(user_id, NoteStats(user_id=user_id))) != _values(row)
+        ]
+        if drifted and not dry_run:
+            NoteStats.objects.using(using).bulk_create(
+                drifted, update_conflicts=True, unique_fields=['user'], update_fields=FIELDS,
+            )
+    return drifted
+
+
+def _values(row):
+    return tuple(getattr(row, field) for field in FIELDS)
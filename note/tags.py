@@ -0,0 +1,150 @@
+"""
+Tags and folders of notes.
+
+Both are ``Tag`` rows of the note's author linked through ``NoteTag``; a note has any
+number of tags and at most one folder. ``IndexView`` filters on them with a join on the
+(user, kind, name) and (tag, note) unique indexes.
+
+``Tag.note_count`` is maintained incrementally: the ``m2m_changed`` receiver adds or
+subtracts the number of links each change made, and deleting a note decrements the
+counts of its tags, so the tag list is a plain read instead of a GROUP BY per page.
+The ``notes_*`` functions do the same set-based for ``note.bulk``; the links of notes in
+the trash are kept, but not counted, until they are restored or purged.
+"""
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, F, OuterRef, Subquery
+
+from .models import NoteTag, Tag
+
+MAX_TAGS = 20
+
+
+def parse_names(value):
+    """Distinct non-empty names of a comma separated string, in order."""
+    names = []
+    for name in value.split(','):
+        name = ' '.join(name.split())
+        if name and name.lower() not in (existing.lower() for existing in names):
+            names.append(name)
+    return names
+
+
+def get_tags(user, kind, names):
+    """The user's tags of ``kind`` with these names, created if missing."""
+    if not names:
+        return []
+    Tag.objects.bulk_create([Tag(user=user, kind=kind, name=name) for name in names], ignore_conflicts=True)
+    return list(Tag.objects.filter(user=user, kind=kind, name__in=names))
+
+
+def get_labels(note):
+    """``(folder name, comma separated tag names)`` of a note, for its edit form."""
+    folder, names = '', []
+    for tag in note.tags.order_by('name'):
+        if tag.kind == Tag.FOLDER:
+            folder = tag.name
+        else:
+            names.append(tag.name)
+    return folder, ', '.join(names)
+
+
+def set_labels(note, folder, names):
+    """Put the note in ``folder`` ('' for none) and give it exactly the tags ``names``."""
+    tags = get_tags(note.author, Tag.TAG, names) + get_tags(note.author, Tag.FOLDER, [folder] if folder else [])
+    note.tags.set(tags)
+
+
+def notes_labelled(labels, user, using=DEFAULT_DB_ALIAS):
+    """
+    Link notes inserted with ``bulk_create`` to ``user``'s folders and tags, with one INSERT
+    of the links: ``labels`` are ``(note, folder, names)`` as for ``set_labels``.
+    """
+    wanted = [
+        (note, [(Tag.TAG, name) for name in names] + ([(Tag.FOLDER, folder)] if folder else []))
+        for note, folder, names in labels
+    ]
+    tag_ids = {}
+    for kind in (Tag.TAG, Tag.FOLDER):
+        names = sorted({name for _, pairs in wanted for pair_kind, name in pairs if pair_kind == kind})
+        tag_ids.update(((kind, tag.name), tag.pk) for tag in get_tags(user, kind, names))
+    links = [NoteTag(note=note, tag_id=tag_ids[pair]) for note, pairs in wanted for pair in pairs]
+    if links:
+        NoteTag.objects.using(using).bulk_create(links)
+        add_counts(Counter(link.tag_id for link in links), 1, using)
+
+
+def filter_notes(queryset, user, kind, name):
+    """The notes of ``queryset`` in the user's folder or with the user's tag ``name``."""
+    return queryset.filter(note_tags__tag__user=user, note_tags__tag__kind=kind, note_tags__tag__name=name)
+
+
+def links_changed(instance, action, reverse, pk_set, using):
+    """Adjust ``Tag.note_count`` for an ``m2m_changed`` of ``Note.tags``."""
+    if action in ('pre_remove', 'pre_clear'):
+        # Only links that exist are removed; remember which before they are gone.
+        links = NoteTag.objects.using(using).filter(**{'tag' if reverse else 'note': instance})
+        if pk_set is not None:
+            links = links.filter(**{'note__in' if reverse else 'tag__in': pk_set})
+        instance._removed_tag_links = list(links.values_list('tag_id', flat=True))
+        return
+    if action == 'post_add':
+        add_counts(Counter([instance.pk] * len(pk_set) if reverse else pk_set), 1, using)
+    elif action in ('post_remove', 'post_clear'):
+        add_counts(Counter(instance.__dict__.pop('_removed_tag_links', [])), -1, using)
+
+
+def add_counts(counts, sign, using):
+    """Add ``sign * count`` to the ``note_count`` of each tag id of the ``counts`` Counter."""
+    by_amount = {}
+    for tag_id, count in counts.items():
+        by_amount.setdefault(count, []).append(tag_id)
+    for count, tag_ids in by_amount.items():
+        Tag.objects.using(using).filter(pk__in=tag_ids).update(note_count=F('note_count') + sign * count)
+
+
+def note_deleted(note, using):
+    """Decrement the counts of the tags of a live note about to be deleted."""
+    Tag.objects.using(using).filter(note_tags__note=note).update(note_count=F('note_count') - 1)
+
+
+def notes_trashed(note_ids, using):
+    """Uncount the links of notes moved to the trash; they stay for a restore."""
+    _count_links(note_ids, -1, using)
+
+
+def notes_restored(note_ids, using):
+    _count_links(note_ids, 1, using)
+
+
+def notes_deleted(note_ids, using):
+    """Remove the links of notes about to be deleted in bulk (uncounted first, if live)."""
+    NoteTag.objects.using(using).filter(note__in=note_ids).delete()
+
+
+def notes_moved(note_ids, user, using):
+    """Relink notes given to ``user`` to the user's tags and folder of the same names."""
+    _count_links(note_ids, -1, using)
+    links = NoteTag.objects.using(using).filter(note__in=note_ids)
+    moved = list(links.order_by().values_list('tag_id', 'tag__kind', 'tag__name').annotate(count=Count('pk')))
+    new_tags = {}
+    for kind in {kind for _, kind, _, _ in moved}:
+        for tag in get_tags(user, kind, [name for _, tag_kind, name, _ in moved if tag_kind == kind]):
+            new_tags[kind, tag.name] = tag.pk
+    counts = Counter()
+    for tag_id, kind, name, count in moved:
+        links.filter(tag_id=tag_id).update(tag_id=new_tags[kind, name])
+        counts[new_tags[kind, name]] += count
+    add_counts(counts, 1, using)
+
+
+def _count_links(note_ids, sign, using):
+    # One UPDATE: each linked tag changes by its number of links to these notes.
+    if not note_ids:
+        return
+    links = NoteTag.objects.using(using).filter(note__in=note_ids)
+    per_tag = links.filter(tag=OuterRef('pk')).order_by().values('tag').annotate(count=Count('pk')).values('count')
+    Tag.objects.using(using).filter(pk__in=links.values('tag')).update(
+        note_count=F('note_count') + sign * Subquery(per_tag),
+    )
@@ -0,0 +1,102 @@
+"""Note operations too heavy for a request thread, run by the background workers (see ``note.jobs``)."""
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from . import bulk, jobs, search, transfer
+from .models import Job, Note
+
+EXPORT_FORMATS = ('jsonl', 'csv', 'md')
+
+
+def get_chunk_size():
+    return getattr(settings, 'NOTE_JOB_CHUNK_SIZE', 500)
+
+
+def get_chunk_pause():
+    return getattr(settings, 'NOTE_PURGE_PAUSE', 0.1)
+
+
+def get_export_expiry():
+    return timedelta(hours=getattr(settings, 'NOTE_EXPORT_EXPIRY_HOURS', 24))
+
+
+@jobs.task(concurrency=2)
+def export_notes(user_id, format='jsonl'):
+    """Write the user's notes to a file in the default storage, served by ``JobDownloadView``."""
+    if format not in EXPORT_FORMATS:
+        raise ValueError('Unknown format {!r}.'.format(format))
+    count = 0
+
+    def counted(records):
+        nonlocal count
+        for record in records:
+            count += 1
+            yield record
+
+    records = counted(transfer.iter_records(Note.objects.filter(author_id=user_id), chunk_size=get_chunk_size()))
+    if format == 'md':
+        chunks = transfer.markdown_zip_chunks(records)
+    else:
+        chunks = (line.encode('utf-8') for line in transfer.encode(records, format))
+
+    with tempfile.TemporaryFile() as f:
+        for chunk in chunks:
+            f.write(chunk)
+        name = default_storage.save(
+            'exports/{}/{}.{}'.format(user_id, uuid.uuid4().hex, 'zip' if format == 'md' else format), File(f),
+        )
+    return {'file': name, 'format': format, 'count': count}
+
+
+@jobs.task()
+def delete_notes(user_id):
+    """
+    Move all of the user's notes to the trash, one chunk per transaction: the UPDATE never
+    holds the database for long, and a retry carries on where a failed attempt stopped.
+    """
+    return {'deleted': bulk.trash_notes(Note.objects.filter(author_id=user_id), chunk_size=get_chunk_size())}
+
+
+@jobs.task()
+def delete_user(user_id):
+    """
+    Delete a user: their notes, trashed or not, first in chunks with pauses in between,
+    so the final cascading delete of the user only has a few rows left to remove.
+    """
+    deleted = bulk.delete_notes(
+        Note.all_objects.filter(author_id=user_id), chunk_size=get_chunk_size(), pause=get_chunk_pause(),
+    )
+    get_user_model().objects.filter(pk=user_id).delete()
+    return {'deleted': deleted}
+
+
+def delete_expired_exports(now=None):
+    """
+    Delete the export jobs that finished more than ``NOTE_EXPORT_EXPIRY_HOURS`` ago and
+    their files under ``exports/``; returns how many. Run by ``manage.py run_workers``.
+    """
+    now = now or timezone.now()
+    expired = Job.objects.filter(task='export_notes', finished__lt=now - get_export_expiry())
+    deleted = []
+    for job in expired.only('status', 'result').iterator():
+        if job.status == Job.SUCCEEDED:
+            default_storage.delete(job.result['file'])
+        deleted.append(job.pk)
+    Job.objects.filter(pk__in=deleted).delete()
+    return len(deleted)
+
+
+@jobs.task(max_attempts=1, concurrency=1)
+def rebuild_search_index(database=DEFAULT_DB_ALIAS, chunk_size=None):
+    """Rebuild the full-text index (see ``BaseSearchBackend.rebuild``); ``manage.py rebuild_search_index``."""
+    backend = search.get_backend(database)
+    backend.setup()
+    return {'indexed': backend.rebuild(chunk_size=chunk_size or get_chunk_size())}
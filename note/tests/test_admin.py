@@ -0,0 +1,125 @@
+from datetime import datetime, timezone
+
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from note import bulk, stats, tags
+from note.models import Note, NoteRevision, Tag
+from note.search import get_backend
+
+
+class NoteAdminTestCase(TestCase):
+    def setUp(self):
+        # Arrange: an admin, two authors with notes, some tagged and revised
+        User.objects.create_superuser(username='admin', password='admin_password')
+        self.client.login(username='admin', password='admin_password')
+        self.url = reverse('admin:note_note_changelist')
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.other = User.objects.create_user(username='other_user', password='test_password')
+        self.notes = [
+            Note.objects.create(title='Note {}'.format(i), content='content {}'.format(i), author=self.user)
+            for i in range(4)
+        ]
+        self.other_note = Note.objects.create(title='Other note', content='other', author=self.other)
+        tags.set_labels(self.notes[0], 'Projects', ['work'])
+        tags.set_labels(self.notes[1], '', ['work'])
+        tags.set_labels(self.other_note, '', ['work'])
+        self.notes[0].content = 'edited'
+        self.notes[0].save()
+
+    def _counts(self, user):
+        return {(tag.kind, tag.name): tag.note_count for tag in Tag.objects.filter(user=user)}
+
+    def test_changelist_without_full_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 5)
+        # Assert: the total comes from NoteStats, not a COUNT(*) over the notes
+        counts = [query['sql'] for query in queries if 'COUNT(' in query['sql'] and 'note_note' in query['sql']]
+        self.assertEqual(counts, [])
+        self.assertContains(response, '<a href="?author={}">test_user</a>'.format(self.user.pk), html=True)
+
+    def test_ordering_uses_index(self):
+        queryset = self.client.get(self.url).context['cl'].queryset
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('note_created_id_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_created_filter(self):
+        Note.objects.filter(pk=self.other_note.pk).update(created=datetime(2024, 3, 5, tzinfo=timezone.utc))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'created': '2024'})
+        # Assert: only that year's note, the month links of the year, no scan for the dates
+        self.assertEqual(list(response.context['cl'].result_list), [self.other_note])
+        self.assertContains(response, '?created=2024-03')
+        self.assertNotContains(response, '?created=2024-02')
+        self.assertFalse([query['sql'] for query in queries if 'DISTINCT' in query['sql']])
+        response = self.client.get(self.url, {'created': '2024-04'})
+        self.assertEqual(list(response.context['cl'].result_list), [])
+        response = self.client.get(self.url, {'created': 'nonsense'})
+        self.assertEqual(list(response.context['cl'].result_list), [])
+
+    def test_changelist_does_not_load_content(self):
+        queryset = self.client.get(self.url).context['cl'].queryset
+        self.assertNotIn('"content"', str(queryset.query))
+
+    def test_author_filter_and_search(self):
+        response = self.client.get(self.url, {'author': self.other.pk})
+        self.assertEqual(list(response.context['cl'].result_list), [self.other_note])
+        self.assertContains(response, 'other_user')
+        response = self.client.get(self.url, {'q': 'edited'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.notes[0]])
+
+    def test_change_form_has_raw_author_field(self):
+        response = self.client.get(reverse('admin:note_note_change', args=[self.notes[0].pk]))
+        self.assertContains(response, 'class="vForeignKeyRawIdAdminField"')
+        self.assertNotContains(response, '<option value="{}">'.format(self.other.pk))
+
+    def test_reassign_author(self):
+        response = self.client.post(self.url, {
+            'action': 'reassign_author', 'author': 'other_user',
+            ACTION_CHECKBOX_NAME: [self.notes[0].pk, self.notes[2].pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        # Assert: one UPDATE moved them, tags and stats followed
+        self.assertEqual(Note.objects.filter(author=self.other).count(), 3)
+        self.assertEqual(self._counts(self.user), {('folder', 'Projects'): 0, ('tag', 'work'): 1})
+        self.assertEqual(self._counts(self.other), {('folder', 'Projects'): 1, ('tag', 'work'): 2})
+        self.assertEqual(tags.get_labels(self.notes[0]), ('Projects', 'work'))
+        self.assertEqual(stats.reconcile([self.user.pk, self.other.pk]), [])
+        self.assertEqual(stats.for_user(self.other).note_count, 3)
+
+    def test_reassign_to_unknown_user(self):
+        self.client.post(self.url, {'action': 'reassign_author', 'author': 'nobody',
+                                    ACTION_CHECKBOX_NAME: [self.notes[0].pk]})
+        self.assertEqual(Note.objects.filter(author=self.user).count(), 4)
+
+    def test_delete_notes_asks_for_confirmation(self):
+        data = {'action': 'delete_notes', 'select_across': '1', ACTION_CHECKBOX_NAME: [self.notes[0].pk]}
+        response = self.client.post(self.url + '?author={}'.format(self.user.pk), data)
+        self.assertContains(response, 'delete 4 notes')
+        self.assertEqual(Note.objects.count(), 5)
+        # Act: confirm, across every note of the filtered changelist
+        response = self.client.post(self.url + '?author={}'.format(self.user.pk), {**data, 'post': 'yes'})
+        # Assert
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(Note.objects.all()), [self.other_note])
+        self.assertFalse(NoteRevision.objects.filter(note__author=self.user).exists())
+        self.assertEqual(self._counts(self.user), {('folder', 'Projects'): 0, ('tag', 'work'): 0})
+        self.assertEqual(self._counts(self.other), {('tag', 'work'): 1})
+        self.assertEqual(list(get_backend().search(Note.objects.all(), 'content')), [])
+        self.assertEqual(stats.reconcile([self.user.pk, self.other.pk]), [])
+
+    def test_bulk_delete_queries_do_not_grow_with_notes(self):
+        # Assert: chunk pks, savepoint, revisions delete, notes, tag counts, tag links delete,
+        # notes delete, search entries lookup, one executemany deleting them, stats update, release
+        with self.assertNumQueries(11):
+            self.assertEqual(bulk.delete_notes(Note.objects.filter(author=self.user)), 4)
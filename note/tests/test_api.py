@@ -0,0 +1,204 @@
+import json
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from note import tags, updates
+from note.models import Note, Tag
+from note.search import get_backend
+
+
+class NoteApiTestCase(TestCase):
+    def setUp(self):
+        # Arrange: 2 users, user 1 logged in with 3 notes
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.other_user = User.objects.create_user(username='other_user', password='test_password')
+        self.notes = [
+            Note.objects.create(title='Test Note {}'.format(i), content='Content {}'.format(i), author=self.user)
+            for i in range(3)
+        ]
+        self.other_note = Note.objects.create(title='Other Note', content='Private', author=self.other_user)
+        self.client.login(username='test_user', password='test_password')
+
+    def _post(self, name, payload):
+        return self.client.post(reverse(name), data=json.dumps(payload), content_type='application/json')
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('noteapp:api-list'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_list_with_field_selection(self):
+        response = self.client.get(reverse('noteapp:api-list'), {'fields': 'id,title'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['results'][0], {'id': self.notes[-1].pk, 'title': 'Test Note 2'})
+        self.assertEqual(len(data['results']), 3)
+        self.assertIsNone(data['next'])
+
+    def test_list_pagination(self):
+        response = self.client.get(reverse('noteapp:api-list'), {'limit': 2})
+        data = response.json()
+        self.assertEqual(len(data['results']), 2)
+        response = self.client.get(reverse('noteapp:api-list'), {'limit': 2, 'cursor': data['next']})
+        self.assertEqual([note['title'] for note in response.json()['results']], ['Test Note 0'])
+
+    def test_unknown_field(self):
+        response = self.client.get(reverse('noteapp:api-list'), {'fields': 'id,author'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_detail(self):
+        response = self.client.get(reverse('noteapp:api-detail', kwargs={'pk': self.notes[0].pk}))
+        self.assertEqual(response.json()['content'], 'Content 0')
+        response = self.client.get(reverse('noteapp:api-detail', kwargs={'pk': self.other_note.pk}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_batch_create(self):
+        payload = {'notes': [{'title': 'Batch note {}'.format(i), 'content': 'x'} for i in range(20)]}
+        # Assert: savepoint, one INSERT, one executemany each to reindex, author stats update, release
+        with self.assertNumQueries(6):
+            response = self._post('noteapp:api-batch-create', payload)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['results']), 20)
+        self.assertEqual(Note.objects.filter(author=self.user).count(), 23)
+        self.assertEqual(get_backend().search(Note.objects.all(), 'batch').count(), 20)
+
+    def test_batch_create_with_labels(self):
+        payload = {'notes': [
+            {'title': 'Tagged note', 'content': 'x', 'folder': 'Projects', 'tags': 'work, urgent'},
+            {'title': 'Other tagged', 'content': 'x', 'tags': 'work'},
+            {'title': 'Not tagged', 'content': 'x'},
+        ]}
+        # Act
+        response = self._post('noteapp:api-batch-create', payload)
+        # Assert: the labels are linked and counted, not dropped
+        self.assertEqual(response.status_code, 201)
+        ids = [result['id'] for result in response.json()['results']]
+        self.assertEqual([tags.get_labels(note) for note in Note.objects.filter(pk__in=ids).order_by('pk')],
+                         [('Projects', 'urgent, work'), ('', 'work'), ('', '')])
+        counts = dict(Tag.objects.filter(user=self.user).values_list('name', 'note_count'))
+        self.assertEqual(counts, {'Projects': 1, 'urgent': 1, 'work': 2})
+
+    def test_batch_create_validates_with_form_rules(self):
+        payload = {'notes': [{'title': 'Valid title'}, {'title': 'No'}]}
+        response = self._post('noteapp:api-batch-create', payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1', response.json()['errors'])
+        self.assertEqual(Note.objects.filter(author=self.user).count(), 3)
+
+    @override_settings(NOTE_API_MAX_BATCH=2)
+    def test_batch_limit(self):
+        payload = {'notes': [{'title': 'Batch note'}] * 3}
+        response = self._post('noteapp:api-batch-create', payload)
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_update_partial(self):
+        payload = {'notes': [
+            {'id': self.notes[0].pk, 'title': 'Renamed note'},
+            {'id': self.notes[1].pk, 'content': 'New content'},
+        ]}
+        response = self._post('noteapp:api-batch-update', payload)
+        self.assertEqual(response.status_code, 200)
+        self.notes[0].refresh_from_db()
+        self.notes[1].refresh_from_db()
+        self.assertEqual((self.notes[0].title, self.notes[0].content), ('Renamed note', 'Content 0'))
+        self.assertEqual((self.notes[1].title, self.notes[1].content), ('Test Note 1', 'New content'))
+        self.assertEqual(list(get_backend().search(Note.objects.all(), 'renamed')), [self.notes[0]])
+
+    def test_batch_update_other_users_note(self):
+        payload = {'notes': [{'id': self.notes[0].pk, 'title': 'Renamed'}, {'id': self.other_note.pk, 'title': 'Mine'}]}
+        response = self._post('noteapp:api-batch-update', payload)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['missing'], [self.other_note.pk])
+        self.notes[0].refresh_from_db()
+        self.assertEqual(self.notes[0].title, 'Test Note 0')
+
+    def test_batch_update_duplicate_ids(self):
+        payload = {'notes': [{'id': self.notes[0].pk, 'title': 'A'}, {'id': self.notes[0].pk, 'title': 'B'}]}
+        response = self._post('noteapp:api-batch-update', payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['duplicates'], [self.notes[0].pk])
+
+    def test_batch_update_with_versions(self):
+        version = updates.get_version(self.notes[0])
+        stale = updates.get_version(self.notes[1])
+        self.notes[1].title = 'Changed elsewhere'
+        self.notes[1].save()
+        payload = {'notes': [
+            {'id': self.notes[0].pk, 'title': 'Renamed', 'version': version},
+            {'id': self.notes[1].pk, 'title': 'Mine', 'version': stale},
+        ]}
+        # Act
+        response = self._post('noteapp:api-batch-update', payload)
+        # Assert: nothing written, the conflicting note's current version is returned
+        self.assertEqual(response.status_code, 409)
+        self.notes[1].refresh_from_db()
+        self.assertEqual(response.json()['versions'], {str(self.notes[1].pk): updates.get_version(self.notes[1])})
+        self.assertEqual(Note.objects.get(pk=self.notes[0].pk).title, 'Test Note 0')
+
+        payload['notes'][1]['version'] = updates.get_version(self.notes[1])
+        response = self._post('noteapp:api-batch-update', payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Note.objects.get(pk=self.notes[1].pk).title, 'Mine')
+        self.assertEqual(response.json()['results'][0]['version'], updates.get_version(Note.objects.get(pk=self.notes[0].pk)))
+
+    def test_batch_delete(self):
+        response = self._post('noteapp:api-batch-delete', {'ids': [self.notes[0].pk, self.notes[1].pk]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(Note.objects.filter(author=self.user)), [self.notes[2]])
+
+    def test_batch_delete_is_all_or_nothing(self):
+        response = self._post('noteapp:api-batch-delete', {'ids': [self.notes[0].pk, self.other_note.pk]})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Note.objects.count(), 4)
+
+    def test_invalid_json(self):
+        response = self.client.post(reverse('noteapp:api-batch-delete'), data='{', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def _patch(self, note, payload):
+        return self.client.patch(reverse('noteapp:api-detail', kwargs={'pk': note.pk}),
+                                 data=json.dumps(payload), content_type='application/json')
+
+    def test_patch_fields(self):
+        version = self.client.get(reverse('noteapp:api-detail', kwargs={'pk': self.notes[0].pk})).json()['version']
+        with CaptureQueriesContext(connection) as queries:
+            response = self._patch(self.notes[0], {'version': version, 'title': 'Renamed note'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.json()['version'], version)
+        # Assert: the UPDATE writes the title and version only, and checks the version
+        update = next(query['sql'] for query in queries if query['sql'].startswith('UPDATE "note_note"'))
+        self.assertNotIn('"content"', update)
+        self.assertIn('"updated" =', update.split('WHERE')[1])
+        self.notes[0].refresh_from_db()
+        self.assertEqual((self.notes[0].title, self.notes[0].content), ('Renamed note', 'Content 0'))
+
+    def test_patch_text(self):
+        note = self.notes[0]
+        patch = [{'start': 0, 'end': 7, 'text': 'Body'}, {'start': 9, 'end': 9, 'text': '0 and more'}]
+        response = self._patch(note, {'version': note.updated.isoformat(), 'patch': patch})
+        self.assertEqual(response.status_code, 200)
+        note.refresh_from_db()
+        self.assertEqual(note.content, 'Body 00 and more')
+
+    def test_patch_conflict(self):
+        note = self.notes[0]
+        stale = note.updated.isoformat()
+        self._patch(note, {'version': stale, 'content': 'First edit'})
+        response = self._patch(note, {'version': stale, 'content': 'Second edit'})
+        self.assertEqual(response.status_code, 409)
+        note.refresh_from_db()
+        self.assertEqual(note.content, 'First edit')
+        self.assertEqual(response.json()['version'], note.updated.isoformat())
+
+    def test_patch_validation(self):
+        note = self.notes[0]
+        version = note.updated.isoformat()
+        self.assertEqual(self._patch(note, {'content': 'No version'}).status_code, 400)
+        self.assertEqual(self._patch(note, {'version': version, 'patch': [{'start': 5, 'end': 2, 'text': ''}]})
+                         .status_code, 400)
+        self.assertEqual(self._patch(note, {'version': version, 'title': ''}).status_code, 400)
+        self.assertEqual(self._patch(self.other_note, {'version': version, 'title': 'Mine'}).status_code, 404)
@@ -0,0 +1,105 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from note import cache as note_cache
+from note.models import Note
+
+
+@override_settings(ROOT_URLCONF='django_notes.async_urls')
+class AsyncNoteViewsTestCase(TestCase):
+    def setUp(self):
+        # Arrange: 2 users with a note each, user 1 logged in on the async client
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.other_user = User.objects.create_user(username='other_user', password='test_password')
+        self.note = Note.objects.create(title='Test Note', content='This is a test note', author=self.user)
+        self.other_note = Note.objects.create(title='Other Note', content='Private', author=self.other_user)
+        self.async_client.force_login(self.user)
+
+    async def test_index_view(self):
+        response = await self.async_client.get(reverse('noteapp:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Test Note')
+        self.assertNotContains(response, 'Other Note')
+
+    async def test_index_search(self):
+        response = await self.async_client.get(reverse('noteapp:index'), {'search': 'missing'})
+        self.assertContains(response, 'Nothing Found')
+
+    async def test_tags(self):
+        response = await self.async_client.post(reverse('noteapp:add'), {
+            'title': 'Tagged Note', 'content': 'New', 'folder': 'Projects', 'tags': 'work',
+        })
+        self.assertEqual(response.status_code, 302)
+        response = await self.async_client.get(reverse('noteapp:index'), {'folder': 'Projects'})
+        self.assertContains(response, 'Tagged Note')
+        self.assertNotContains(response, 'Test Note')
+        self.assertContains(response, '>work</a> (1)')
+        url = reverse('noteapp:edit', kwargs={'pk': self.note.pk})
+        self.assertContains(await self.async_client.get(url), 'name="folder"')
+        await self.async_client.post(url, {'title': 'Test Note', 'content': 'x', 'folder': '', 'tags': 'work'})
+        response = await self.async_client.get(reverse('noteapp:index'), {'tag': 'work'})
+        self.assertContains(response, '>work</a> (2)')
+
+    async def test_single_view(self):
+        response = await self.async_client.get(reverse('noteapp:single', kwargs={'pk': self.note.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Author: test_user')
+
+    async def test_conditional_get_and_fragment_cache(self):
+        caches['default'].clear()
+        for url in (reverse('noteapp:index'), reverse('noteapp:single', kwargs={'pk': self.note.pk})):
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('private', response['Cache-Control'])
+            # Act: revalidate, then load again without the validator
+            not_modified = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+            cached = await self.async_client.get(url)
+            # Assert
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(not_modified.content, b'')
+            self.assertContains(cached, 'Test Note')
+            self.assertEqual(cached['ETag'], response['ETag'])
+        self.assertEqual(note_cache.get_stats()['hits'], 2)
+
+    async def test_single_view_other_users_note(self):
+        response = await self.async_client.get(reverse('noteapp:single', kwargs={'pk': self.other_note.pk}))
+        self.assertEqual(response.status_code, 400)
+        self.assertTemplateUsed(response, 'note/custom_error.html')
+
+    async def test_add_view(self):
+        response = await self.async_client.post(reverse('noteapp:add'), {'title': 'New Note', 'content': 'New'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(await Note.objects.filter(author=self.user).acount(), 2)
+        response = await self.async_client.post(reverse('noteapp:add'), {'title': 'No', 'content': ''})
+        self.assertEqual(response.status_code, 200)
+
+    async def test_edit_view(self):
+        url = reverse('noteapp:edit', kwargs={'pk': self.note.pk})
+        response = await self.async_client.get(url)
+        self.assertTemplateUsed(response, 'note/edit.html')
+        response = await self.async_client.post(url, {'title': 'Updated Note', 'content': 'Updated'})
+        self.assertEqual(response.status_code, 302)
+        note = await Note.objects.aget(pk=self.note.pk)
+        self.assertEqual(note.title, 'Updated Note')
+
+    async def test_delete_view(self):
+        url = reverse('noteapp:delete', kwargs={'pk': self.note.pk})
+        response = await self.async_client.get(url)
+        self.assertContains(response, 'Are you sure you want to delete')
+        response = await self.async_client.post(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(await Note.objects.filter(pk=self.note.pk).aexists())
+
+    async def test_cannot_delete_other_users_note(self):
+        response = await self.async_client.post(reverse('noteapp:delete', kwargs={'pk': self.other_note.pk}))
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(await Note.objects.filter(pk=self.other_note.pk).aexists())
+
+    async def test_must_login(self):
+        self.async_client.cookies.clear()
+        url = reverse('noteapp:single', kwargs={'pk': self.note.pk})
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, reverse('noteapp:login') + '?next=' + url)
@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from note import auth
+from note.cache import get_cache
+from note.models import Note
+
+
+class CachedSessionAndUserTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.note = Note.objects.create(title='Test Note', content='This is a test note', author=self.user)
+        self.single_url = reverse('noteapp:single', kwargs={'pk': self.note.pk})
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db', NOTE_USER_CACHE_TIMEOUT=0)
+    def test_database_session_and_user_cost_two_queries(self):
+        self.client.login(username='test_user', password='test_password')
+        # Assert: session, user, note
+        with self.assertNumQueries(3):
+            self.client.get(self.single_url)
+
+    def test_cached_session_and_user_cost_no_query(self):
+        self.client.login(username='test_user', password='test_password')
+        # Assert: only the note; the session and the user come from the cache
+        with self.assertNumQueries(1):
+            self.client.get(self.single_url)
+        with self.assertNumQueries(1):
+            self.client.get(self.single_url)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_session(self):
+        self.client.login(username='test_user', password='test_password')
+        with self.assertNumQueries(1):
+            response = self.client.get(self.single_url)
+        self.assertContains(response, 'Author: test_user')
+
+    def test_user_miss_is_cached(self):
+        self.client.login(username='test_user', password='test_password')
+        auth.invalidate_user(self.user.pk)
+        # Assert: user, note; then the user is cached again
+        with self.assertNumQueries(2):
+            self.client.get(self.single_url)
+        with self.assertNumQueries(1):
+            self.client.get(self.single_url)
+
+    def test_password_change_invalidates_cached_user(self):
+        self.client.login(username='test_user', password='test_password')
+        self.client.get(self.single_url)
+        # Act
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('new_password')
+            self.user.save()
+        # Assert: the session's auth hash no longer matches, the user is logged out
+        response = self.client.get(self.single_url)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith(reverse('noteapp:login')))
+
+    def test_cached_user_invalidated_on_commit(self):
+        self.client.login(username='test_user', password='test_password')
+        active = User.objects.get(pk=self.user.pk)
+        # Act: deactivated in a transaction, with a request caching the old row before it commits
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.user.is_active = False
+                self.user.save(update_fields=['is_active'])
+                auth.cache_user(active)
+        # Assert: the entry cached in between is gone, the user is logged out
+        self.assertIsNone(get_cache().get(auth.USER_KEY.format(self.user.pk)))
+        self.assertEqual(self.client.get(self.single_url).status_code, 302)
+
+    def test_logout_invalidates_cached_user(self):
+        self.client.login(username='test_user', password='test_password')
+        self.assertIsNotNone(get_cache().get(auth.USER_KEY.format(self.user.pk)))
+        self.client.get(reverse('noteapp:logout'))
+        self.assertIsNone(get_cache().get(auth.USER_KEY.format(self.user.pk)))
+
+    def test_login_and_signup_pages_do_not_touch_anonymous_sessions(self):
+        for name in ('noteapp:login', 'noteapp:signup'):
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    def test_login_page_logs_out_signed_in_user(self):
+        self.client.login(username='test_user', password='test_password')
+        self.client.get(reverse('noteapp:login'))
+        response = self.client.get(self.single_url)
+        self.assertEqual(response.status_code, 302)
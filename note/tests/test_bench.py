@@ -0,0 +1,55 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from note.models import Note
+
+
+class BenchCommandsTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        call_command('seed_notes', '--users', '2', '--notes-per-user', '5', '--seed', '1',
+                     stdout=StringIO(), stderr=StringIO())
+
+    def test_seed_notes(self):
+        # Assert
+        users = User.objects.filter(username__startswith='seed_user_')
+        self.assertEqual(users.count(), 2)
+        self.assertTrue(self.client.login(username='seed_user_0', password='seed-password'))
+        for user in users:
+            self.assertTrue(Note.objects.filter(author=user).exists())
+
+    def test_bench_writes_results_and_compares(self):
+        # Arrange
+        path = os.path.join(self.tmpdir.name, 'results.json')
+        notes_before = Note.objects.count()
+
+        # Act
+        call_command('bench', '--requests', '3', '--output', path, stdout=StringIO())
+        out = StringIO()
+        call_command('bench', '--requests', '3', '--compare', path, stdout=out)
+
+        # Assert
+        with open(path, encoding='utf-8') as f:
+            report = json.load(f)
+        self.assertEqual(set(report['endpoints']), {'index', 'index_search', 'single', 'add', 'edit', 'delete'})
+        for stats in report['endpoints'].values():
+            self.assertEqual(stats['count'], 3)
+            self.assertEqual(stats['errors'], 0)
+            self.assertGreater(stats['queries'], 0)
+            self.assertIn('p99_ms', stats)
+        self.assertIn('Change against', out.getvalue())
+        self.assertEqual(Note.objects.count(), notes_before)
+
+    def test_bench_render(self):
+        out = StringIO()
+        call_command('bench_render', '--sizes', '10', '--repeat', '1', stdout=out)
+        self.assertIn('10 notes, before', out.getvalue())
+        self.assertIn('10 notes, after', out.getvalue())
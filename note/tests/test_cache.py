@@ -0,0 +1,135 @@
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from note import cache as note_cache
+from note.models import Note
+
+
+class FragmentCacheTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        caches['default'].clear()
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.other_user = User.objects.create_user(username='other_user', password='test_password')
+        self.note = Note.objects.create(title='Cached Note', content='Cached content', author=self.user)
+        self.client.login(username='test_user', password='test_password')
+
+    def test_index_hit_skips_note_queries(self):
+        url = reverse('noteapp:index')
+        self.client.get(url)
+        # Act: second request is served from the cached fragment (conditional GET aggregate only;
+        # session and user come from the cache)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        # Assert
+        self.assertContains(response, 'Cached Note')
+        self.assertEqual(note_cache.get_stats()['hits'], 1)
+
+    def test_single_hit_skips_note_queries(self):
+        url = reverse('noteapp:single', kwargs={'pk': self.note.pk})
+        self.client.get(url)
+        # Assert: only the owned note for the conditional GET validators
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertContains(response, 'Cached content')
+
+    def test_search_results_cached_per_query(self):
+        url = reverse('noteapp:index')
+        self.client.get(url, {'search': 'cached'})
+        response = self.client.get(url, {'search': 'missing'})
+        self.assertContains(response, 'Nothing Found')
+
+    def test_edit_invalidates(self):
+        url = reverse('noteapp:single', kwargs={'pk': self.note.pk})
+        self.client.get(reverse('noteapp:index'))
+        self.client.get(url)
+        # Act
+        with self.captureOnCommitCallbacks(execute=True):
+            self.note.title = 'Renamed Note'
+            self.note.save()
+        # Assert
+        self.assertContains(self.client.get(reverse('noteapp:index')), 'Renamed Note')
+        self.assertContains(self.client.get(url), 'Renamed Note')
+
+    def test_delete_invalidates(self):
+        self.client.get(reverse('noteapp:index'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.note.delete()
+        self.assertNotContains(self.client.get(reverse('noteapp:index')), 'Cached Note')
+
+    def test_other_users_writes_keep_version(self):
+        version = note_cache.get_user_version(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Note.objects.create(title='Other Note', content='', author=self.other_user)
+        self.assertEqual(note_cache.get_user_version(self.user.pk), version)
+        with self.captureOnCommitCallbacks(execute=True):
+            note_cache.bump_user_version(self.user.pk)
+        self.assertGreater(note_cache.get_user_version(self.user.pk), version)
+
+    def test_version_bumped_on_commit(self):
+        url = reverse('noteapp:index')
+        self.client.get(url)
+        version = note_cache.get_user_version(self.user.pk)
+        # Act: a write in a transaction, with a request rendering the list before it commits
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Note.objects.create(title='Committed Note', content='', author=self.user)
+                self.assertEqual(note_cache.get_user_version(self.user.pk), version)
+                note_cache.set_fragment(note_cache.fragment_key(self.user.pk, 'stale'), 'stale')
+        # Assert: what was cached before the commit is out of reach after it
+        self.assertGreater(note_cache.get_user_version(self.user.pk), version)
+        self.assertIsNone(note_cache.get_fragment(note_cache.fragment_key(self.user.pk, 'stale')))
+        self.assertContains(self.client.get(url), 'Committed Note')
+
+    def test_evicted_version_restarts_above_old_versions(self):
+        version = note_cache.get_user_version(self.user.pk)
+        caches['default'].delete(note_cache.VERSION_KEY.format(self.user.pk))
+        self.assertGreaterEqual(note_cache.get_user_version(self.user.pk), version)
+
+    def test_stats(self):
+        note_cache.reset_stats()
+        url = reverse('noteapp:index')
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(note_cache.get_stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    @override_settings(NOTE_FRAGMENT_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        url = reverse('noteapp:index')
+        self.client.get(url)
+        # Assert: conditional GET aggregate, the page of notes, the user's tags and note stats
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+
+class FileBasedFragmentCacheTestCase(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        self.settings_override = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'notes': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': self.cache_dir.name,
+            },
+        }, NOTE_CACHE_ALIAS='notes')
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        Note.objects.create(title='File Cached Note', content='content', author=self.user)
+        self.client.login(username='test_user', password='test_password')
+
+    def test_hit_and_invalidation(self):
+        url = reverse('noteapp:index')
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertContains(response, 'File Cached Note')
+        with self.captureOnCommitCallbacks(execute=True):
+            Note.objects.create(title='Second File Note', content='content', author=self.user)
+        self.assertContains(self.client.get(url), 'Second File Note')
@@ -0,0 +1,92 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from note.models import Note
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        caches['default'].clear()
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.note = Note.objects.create(title='Test Note', content='This is a test note', author=self.user)
+        self.client.login(username='test_user', password='test_password')
+        self.single_url = reverse('noteapp:single', kwargs={'pk': self.note.pk})
+        self.index_url = reverse('noteapp:index')
+
+    def test_single_not_modified(self):
+        response = self.client.get(self.single_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('private', response['Cache-Control'])
+        # Act: revalidate; only the note row, and no template is rendered
+        with self.assertNumQueries(1), self.assertTemplateNotUsed('note/single.html'):
+            response = self.client.get(self.single_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        # Assert
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_single_if_modified_since(self):
+        last_modified = self.client.get(self.single_url)['Last-Modified']
+        response = self.client.get(self.single_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_single_modified_after_edit(self):
+        etag = self.client.get(self.single_url)['ETag']
+        self.note.content = 'Changed'
+        self.note.save()
+        response = self.client.get(self.single_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_index_not_modified(self):
+        etag = self.client.get(self.index_url)['ETag']
+        with self.assertTemplateNotUsed('note/index.html'):
+            response = self.client.get(self.index_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_index_modified_after_add_and_delete(self):
+        etag = self.client.get(self.index_url)['ETag']
+        other = Note.objects.create(title='Another Note', content='', author=self.user)
+        response = self.client.get(self.index_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        # Act: deleting does not move Max(updated) but changes the count
+        etag = response['ETag']
+        other.delete()
+        response = self.client.get(self.index_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_index_modified_after_labels_only_edit(self):
+        etag = self.client.get(self.index_url)['ETag']
+        edit_url = reverse('noteapp:edit', kwargs={'pk': self.note.pk})
+        version = self.client.get(edit_url).context['form']['version'].value()
+        # Act: same title and content, new folder
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(edit_url, {
+                'title': self.note.title, 'content': self.note.content, 'folder': 'Projects', 'version': version,
+            })
+        # Assert
+        response = self.client.get(self.index_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Projects')
+
+    def test_index_ignores_if_modified_since_alone(self):
+        future = (datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1))
+        response = self.client.get(self.index_url, HTTP_IF_MODIFIED_SINCE=future.strftime('%a, %d %b %Y %H:%M:%S GMT'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_search_has_own_etag(self):
+        etag = self.client.get(self.index_url)['ETag']
+        response = self.client.get(self.index_url, {'search': 'test'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_missing_note_not_conditional(self):
+        url = reverse('noteapp:single', kwargs={'pk': self.note.pk + 1})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,58 @@
+import sqlite3
+from io import StringIO
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from note import db
+
+
+class SqliteTuningTestCase(TestCase):
+    def _pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA {}'.format(name))
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_connection(self):
+        self.assertEqual(self._pragma('busy_timeout'), 5000)
+        self.assertEqual(self._pragma('cache_size'), -64000)
+        self.assertEqual(self._pragma('synchronous'), 1)  # NORMAL
+
+    def test_apply_explicit_pragmas(self):
+        # Arrange
+        conn = sqlite3.connect(':memory:')
+        self.addCleanup(conn.close)
+
+        # Act
+        db.apply_sqlite_pragmas(conn, {'busy_timeout': 1234, 'temp_store': 'memory'})
+
+        # Assert
+        self.assertEqual(conn.execute('PRAGMA busy_timeout').fetchone()[0], 1234)
+        self.assertEqual(conn.execute('PRAGMA temp_store').fetchone()[0], 2)  # MEMORY
+
+    @override_settings(NOTE_SQLITE_PRAGMAS={'busy_timeout': 10000, 'mmap_size': None})
+    def test_settings_override_defaults(self):
+        pragmas = db.get_sqlite_pragmas()
+        self.assertEqual(pragmas['busy_timeout'], 10000)
+        self.assertNotIn('mmap_size', pragmas)
+        self.assertEqual(pragmas['journal_mode'], db.DEFAULT_SQLITE_PRAGMAS['journal_mode'])
+        with self.settings(NOTE_SQLITE_PRAGMAS=None):
+            self.assertEqual(db.get_sqlite_pragmas(), {})
+
+    @override_settings(NOTE_SQLITE_PRAGMAS={'writable_schema': 'on'})
+    def test_unknown_pragma_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            db.get_sqlite_pragmas()
+
+    @override_settings(NOTE_SQLITE_PRAGMAS={'busy_timeout': '1; DROP TABLE note_note'})
+    def test_invalid_value_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            db.get_sqlite_pragmas()
+
+    def test_bench_sqlite_command(self):
+        out = StringIO()
+        call_command('bench_sqlite', '--duration', '0.2', '--threads', '2', '--rows', '100', stdout=out)
+        self.assertIn('before (defaults)', out.getvalue())
+        self.assertIn('after (tuned)', out.getvalue())
@@ -0,0 +1,61 @@
+import csv
+import gzip
+import io
+import json
+import zipfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from note.models import Note
+
+
+class DownloadViewTestCase(TestCase):
+    def setUp(self):
+        # Arrange: 2 users, the logged-in one with 3 notes
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.other_user = User.objects.create_user(username='other_user', password='test_password')
+        for i in range(3):
+            Note.objects.create(title='Note {}'.format(i), content='Content {}'.format(i), author=self.user)
+        Note.objects.create(title='Private note', content='Hidden', author=self.other_user)
+        self.client.login(username='test_user', password='test_password')
+        self.url = reverse('noteapp:download')
+
+    def _get(self, fmt, **headers):
+        response = self.client.get(self.url, {'format': fmt}, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_jsonl(self):
+        response, body = self._get('jsonl')
+        records = [json.loads(line) for line in body.decode('utf-8').splitlines()]
+        self.assertEqual([record['title'] for record in records], ['Note 0', 'Note 1', 'Note 2'])
+        self.assertIn('notes.jsonl', response['Content-Disposition'])
+
+    def test_csv_gzip(self):
+        response, body = self._get('csv', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(body).decode('utf-8'))))
+        self.assertEqual(len(rows), 3)
+        self.assertNotIn('Private note', [row['title'] for row in rows])
+
+    def test_markdown_zip(self):
+        response, body = self._get('md')
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            self.assertIsNone(archive.testzip())
+            names = archive.namelist()
+            self.assertEqual(len(names), 3)
+            self.assertEqual(archive.read(names[0]).decode('utf-8'), '# Note 0\n\nContent 0\n')
+
+    def test_unknown_format(self):
+        response = self.client.get(self.url, {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+        self.assertTemplateUsed(response, 'note/custom_error.html')
+
+    def test_must_login(self):
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,268 @@
+import json
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import Permission, User
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from note import bulk, jobs, tasks
+from note.models import Job, Note
+from note.search import get_backend
+
+
+class JobQueueTestCase(TestCase):
+    def setUp(self):
+        # Arrange: a task failing on its first two calls
+        self.calls = []
+
+        @jobs.task(name='test_flaky', max_attempts=3)
+        def flaky(value):
+            self.calls.append(value)
+            if len(self.calls) < 3:
+                raise RuntimeError('failure {}'.format(len(self.calls)))
+            return {'value': value}
+
+        self.addCleanup(jobs.TASKS.pop, 'test_flaky')
+
+    def test_enqueue_unknown_task(self):
+        with self.assertRaises(LookupError):
+            jobs.enqueue('no_such_task')
+        self.assertFalse(Job.objects.exists())
+
+    def test_claim_is_exclusive(self):
+        job = jobs.enqueue('test_flaky', value=1)
+        claimed = jobs.claim('worker-a')
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (job.pk, Job.RUNNING, 1))
+        self.assertIsNone(jobs.claim('worker-b'))
+
+    def test_claim_excludes_saturated_tasks(self):
+        jobs.enqueue('test_flaky', value=1)
+        self.assertIsNone(jobs.claim('worker-a', exclude=['test_flaky']))
+
+    @override_settings(NOTE_JOB_RETRY_DELAY=10)
+    def test_retry_with_backoff(self):
+        job = jobs.enqueue('test_flaky', value=1)
+        now = timezone.now()
+        # Act: the first failure is retried 10s later, the second 20s later
+        self.assertEqual(jobs.run(jobs.claim('w', now=now).pk), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertIn('RuntimeError: failure 1', job.error)
+        self.assertGreaterEqual(job.run_after, now + timedelta(seconds=10))
+        self.assertIsNone(jobs.claim('w', now=now))
+        self.assertEqual(jobs.run(jobs.claim('w', now=job.run_after).pk), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=19))
+        self.assertEqual(jobs.run(jobs.claim('w', now=job.run_after).pk), Job.SUCCEEDED)
+        # Assert
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.result, job.error), (Job.SUCCEEDED, 3, {'value': 1}, ''))
+        self.assertIsNotNone(job.finished)
+
+    def test_fails_after_max_attempts(self):
+        job = jobs.enqueue('test_flaky', value=1)
+        Job.objects.filter(pk=job.pk).update(max_attempts=1)
+        self.assertEqual(jobs.run(jobs.claim('w').pk), Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+
+    def test_expired_lease(self):
+        job = jobs.enqueue('test_flaky', value=1)
+        jobs.claim('dead-worker')
+        later = timezone.now() + timedelta(seconds=120)
+        self.assertEqual(jobs.renew('other-worker', [job.pk]), 0)
+        # Act
+        self.assertEqual(jobs.release_expired(now=later), 1)
+        # Assert: claimed again; the dead worker's late outcome is ignored
+        self.assertEqual(jobs.claim('w', now=later).attempts, 2)
+        stale = Job(pk=job.pk, worker='dead-worker', attempts=1, max_attempts=3)
+        self.assertIsNone(jobs.finish(stale, result={}))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (Job.RUNNING, 'w'))
+
+    def test_inline_worker_renews_lease(self):
+        renewed = threading.Event()
+
+        @jobs.task(name='test_slow')
+        def slow():
+            # Outlives several poll intervals, returns once the lease was renewed meanwhile
+            return {'renewed': renewed.wait(5)}
+
+        self.addCleanup(jobs.TASKS.pop, 'test_slow')
+        job = jobs.enqueue('test_slow')
+
+        def renew(worker, pks, now=None):
+            if job.pk in pks:
+                renewed.set()
+            return len(pks)
+        # Act
+        with mock.patch('note.jobs.renew', side_effect=renew):
+            call_command('run_workers', '--processes', '0', '--burst', '--poll-interval', '0.01', stdout=StringIO())
+        # Assert
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (Job.SUCCEEDED, {'renewed': True}))
+
+    def test_expired_lease_out_of_attempts(self):
+        job = jobs.enqueue('test_flaky', value=1)
+        Job.objects.filter(pk=job.pk).update(max_attempts=1)
+        jobs.claim('dead-worker')
+        jobs.release_expired(now=timezone.now() + timedelta(seconds=120))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+
+class NoteTasksTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.other = User.objects.create_user(username='other_user', password='test_password')
+        for i in range(5):
+            Note.objects.create(title='Note {}'.format(i), content='content', author=self.user)
+        Note.objects.create(title='Other', content='content', author=self.other)
+
+    @override_settings(NOTE_JOB_CHUNK_SIZE=2)
+    def test_delete_notes_in_chunks(self):
+        self.assertEqual(tasks.delete_notes(self.user.pk), {'deleted': 5})
+        self.assertFalse(Note.objects.filter(author=self.user).exists())
+        self.assertTrue(Note.objects.filter(author=self.other).exists())
+
+    def test_delete_user(self):
+        self.assertEqual(tasks.delete_user(self.user.pk), {'deleted': 5})
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+
+    def test_admin_deletes_users_in_background(self):
+        User.objects.create_superuser(username='admin', password='admin_password')
+        self.client.login(username='admin', password='admin_password')
+        response = self.client.post(reverse('admin:auth_user_changelist'), {
+            'action': 'delete_in_background', '_selected_action': [self.user.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        job = Job.objects.get()
+        self.assertEqual((job.task, job.kwargs), ('delete_user', {'user_id': self.user.pk}))
+
+    def test_admin_delete_confirmation_counts_notes(self):
+        User.objects.create_superuser(username='admin', password='admin_password')
+        self.client.login(username='admin', password='admin_password')
+        bulk.trash_notes(Note.objects.filter(author=self.user, title='Note 0'))
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:auth_user_delete', args=[self.user.pk]))
+        # Assert: 4 notes from NoteStats and 1 in the trash, none of them loaded
+        self.assertEqual(dict(response.context['model_count']), {'users': 1, 'notes': 5})
+        self.assertContains(response, 'test_user')
+        self.assertFalse([query['sql'] for query in queries if 'note_noterevision' in query['sql']])
+        self.assertFalse([query['sql'] for query in queries if 'FROM "note_note"' in query['sql'] and 'COUNT' not in query['sql']])
+
+    def test_admin_delete_view_deletes_in_background(self):
+        User.objects.create_superuser(username='admin', password='admin_password')
+        self.client.login(username='admin', password='admin_password')
+        response = self.client.post(reverse('admin:auth_user_delete', args=[self.user.pk]), {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Note.objects.filter(author=self.user).count(), 5)
+        self.assertEqual(Job.objects.get().task, 'delete_user')
+
+    def test_admin_delete_needs_note_delete_permission(self):
+        staff = User.objects.create_user(username='staff', password='staff_password', is_staff=True)
+        staff.user_permissions.set(Permission.objects.filter(codename__in=['view_user', 'delete_user']))
+        self.client.login(username='staff', password='staff_password')
+        url = reverse('admin:auth_user_delete', args=[self.user.pk])
+        # Act
+        response = self.client.get(url)
+        # Assert: the notes would go with the user, so neither delete goes through
+        self.assertEqual(response.context['perms_lacking'], {'notes'})
+        self.assertEqual(self.client.post(url, {'post': 'yes'}).status_code, 403)
+        self.client.post(reverse('admin:auth_user_changelist'), {
+            'action': 'delete_in_background', '_selected_action': [self.user.pk],
+        })
+        self.assertFalse(Job.objects.exists())
+        self.assertTrue(User.objects.get(pk=self.user.pk).is_active)
+
+
+class JobViewsTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media.name)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.client.login(username='test_user', password='test_password')
+        for i in range(3):
+            Note.objects.create(title='Note {}'.format(i), content='content {}'.format(i), author=self.user)
+
+    def _run_workers(self):
+        out = StringIO()
+        call_command('run_workers', '--processes', '0', '--burst', stdout=out)
+        return out.getvalue()
+
+    def test_export_job(self):
+        # Act: queueing answers straight away with the status page
+        response = self.client.post(reverse('noteapp:export-job'), {'format': 'jsonl'})
+        job = Job.objects.get()
+        self.assertRedirects(response, reverse('noteapp:job', kwargs={'pk': job.pk}))
+        response = self.client.get(job.get_absolute_url())
+        self.assertContains(response, 'http-equiv="refresh"')
+        response = self.client.get(reverse('noteapp:api-job', kwargs={'pk': job.pk}))
+        self.assertEqual(json.loads(response.content)['status'], Job.QUEUED)
+
+        self.assertIn('export_notes #{} succeeded.'.format(job.pk), self._run_workers())
+
+        # Assert
+        response = self.client.get(job.get_absolute_url())
+        self.assertContains(response, 'Exported 3 notes.')
+        self.assertNotContains(response, 'http-equiv="refresh"')
+        response = self.client.get(reverse('noteapp:job-download', kwargs={'pk': job.pk}))
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="notes.jsonl"')
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(sorted(json.loads(line)['title'] for line in lines), ['Note 0', 'Note 1', 'Note 2'])
+
+    def test_expired_exports_are_deleted(self):
+        self.client.post(reverse('noteapp:export-job'), {'format': 'csv'})
+        self._run_workers()
+        job = Job.objects.get()
+        self.assertTrue(default_storage.exists(job.result['file']))
+        self.assertEqual(tasks.delete_expired_exports(), 0)
+        # Act: a worker starting after the expiry
+        Job.objects.filter(pk=job.pk).update(finished=timezone.now() - timedelta(hours=25))
+        self._run_workers()
+        # Assert
+        self.assertFalse(default_storage.exists(job.result['file']))
+        self.assertFalse(Job.objects.exists())
+
+    def test_rebuild_search_index_job(self):
+        Note.objects.create(title='Findable', content='', author=self.user)
+        call_command('rebuild_search_index', '--background', stdout=StringIO())
+        get_backend().clear()
+        self.assertIn('rebuild_search_index #', self._run_workers())
+        self.assertEqual(Job.objects.get().result, {'indexed': 4})
+        self.assertEqual(list(get_backend().search(Note.objects.all(), 'findable')), [Note.objects.get(title='Findable')])
+
+    def test_delete_all_job(self):
+        self.assertEqual(self.client.get(reverse('noteapp:delete-all')).status_code, 200)
+        self.client.post(reverse('noteapp:delete-all'))
+        self.assertEqual(Note.objects.count(), 3)
+        self._run_workers()
+        self.assertFalse(Note.objects.exists())
+        self.assertContains(self.client.get(Job.objects.get().get_absolute_url()), 'Deleted 3 notes.')
+
+    def test_other_users_jobs(self):
+        other = User.objects.create_user(username='other_user', password='test_password')
+        job = jobs.enqueue('delete_notes', user=other, user_id=other.pk)
+        self.assertEqual(self.client.get(job.get_absolute_url()).status_code, 400)
+        self.assertEqual(self.client.get(reverse('noteapp:job-download', kwargs={'pk': job.pk})).status_code, 400)
+        self.assertEqual(self.client.get(reverse('noteapp:api-job', kwargs={'pk': job.pk})).status_code, 404)
+
+    def test_unknown_export_format(self):
+        self.assertEqual(self.client.post(reverse('noteapp:export-job'), {'format': 'pdf'}).status_code, 400)
+        self.assertFalse(Job.objects.exists())
@@ -0,0 +1,84 @@
+import re
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from note import metrics
+from note.models import Note
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        metrics.registry.reset()
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.staff = User.objects.create_user(username='staff_user', password='test_password', is_staff=True)
+        Note.objects.create(title='Test Note', content='This is a test note', author=self.user)
+
+    def _scrape(self, **headers):
+        return self.client.get(reverse('metrics'), **headers)
+
+    def _value(self, body, line_prefix):
+        match = re.search('^' + re.escape(line_prefix) + r' (\S+)$', body, re.M)
+        return float(match.group(1)) if match else None
+
+    def test_records_per_view_metrics(self):
+        # Arrange
+        self.client.force_login(self.user)
+
+        # Act
+        self.client.get(reverse('noteapp:index'))
+        self.client.get(reverse('noteapp:index'))
+        self.client.force_login(self.staff)
+        body = self._scrape().content.decode()
+
+        # Assert
+        labels = '{view="noteapp:index",method="GET"}'
+        self.assertEqual(self._value(body, 'note_http_request_duration_seconds_count' + labels), 2)
+        self.assertEqual(self._value(body, 'note_http_requests_total{view="noteapp:index",method="GET",status="200"}'), 2)
+        self.assertGreater(self._value(body, 'note_db_queries_per_request_sum' + labels), 0)
+        self.assertGreater(self._value(body, 'note_db_query_duration_seconds_total' + labels), 0)
+        self.assertGreater(self._value(body, 'note_template_render_seconds_total' + labels), 0)
+        self.assertGreater(self._value(body, 'note_http_response_size_bytes_total' + labels), 0)
+
+    def test_metrics_forbidden_for_regular_users(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(NOTE_METRICS_TOKEN='scrape-token')
+    def test_metrics_with_token(self):
+        self.assertEqual(self._scrape(HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self._scrape(HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '# TYPE note_http_request_duration_seconds histogram')
+
+    @override_settings(NOTE_METRICS_SAMPLE_RATE=0)
+    def test_sampling_disabled(self):
+        # Act
+        self.client.force_login(self.user)
+        self.client.get(reverse('noteapp:index'))
+        self.client.force_login(self.staff)
+        body = self._scrape().content.decode()
+
+        # Assert
+        self.assertNotIn('noteapp:index', body)
+        self.assertIn('note_metrics_sample_rate 0', body)
+
+
+@override_settings(ROOT_URLCONF='django_notes.async_urls')
+class AsyncMetricsTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        metrics.registry.reset()
+        self.async_client.force_login(User.objects.create_user(username='test_user', password='test_password'))
+
+    async def test_records_async_views(self):
+        # Act
+        await self.async_client.get(reverse('noteapp:index'))
+
+        # Assert
+        body = metrics.registry.render()
+        self.assertIn('note_http_requests_total{view="noteapp:index",method="GET",status="200"} 1', body)
+        self.assertNotIn('note_db_queries_per_request_sum{view="noteapp:index",method="GET"} 0', body)
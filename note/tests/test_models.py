@@ -1,6 +1,11 @@
+from importlib import import_module
+
+from django.apps import apps
 from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
 
+from note.fields import CompressedTextField
 from note.models import Note
 
 
@@ -24,3 +29,58 @@ class NoteModelTestCase(TestCase):
                 author="non_existent_user",
             )
 
+
+
+class CompressedContentTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+
+    def _stored(self, note):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT content FROM note_note WHERE id = %s', [note.pk])
+            return cursor.fetchone()[0]
+
+    def _store_legacy(self, note, content):
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE note_note SET content = %s WHERE id = %s', [content, note.pk])
+
+    def test_long_content_is_compressed(self):
+        # Act
+        content = 'A long and repetitive note body. ' * 100
+        note = Note.objects.create(title='Long', content=content, author=self.user)
+
+        # Assert
+        stored = bytes(self._stored(note))
+        self.assertEqual(stored[:1], CompressedTextField.ZLIB)
+        self.assertLess(len(stored), len(content) // 5)
+        self.assertEqual(Note.objects.get(pk=note.pk).content, content)
+
+    def test_short_content_is_stored_raw(self):
+        note = Note.objects.create(title='Short', content='Short note, ünïcode', author=self.user)
+        self.assertEqual(bytes(self._stored(note)), CompressedTextField.RAW + 'Short note, ünïcode'.encode('utf-8'))
+        self.assertEqual(Note.objects.get(pk=note.pk).content, 'Short note, ünïcode')
+
+    def test_null_content(self):
+        note = Note.objects.create(title='Empty', content=None, author=self.user)
+        self.assertIsNone(Note.objects.get(pk=note.pk).content)
+
+    def test_legacy_text_rows_are_read_and_converted(self):
+        # Arrange: a row as written by the old TextField column
+        note = Note.objects.create(title='Old', content='placeholder', author=self.user)
+        legacy = 'Plain legacy text ' * 50
+        self._store_legacy(note, legacy)
+        self.assertEqual(Note.objects.get(pk=note.pk).content, legacy)
+
+        # Act
+        migration = import_module('note.migrations.0004_compress_note_content')
+        migration.compress_contents(apps, connection.schema_editor())
+
+        # Assert
+        self.assertEqual(bytes(self._stored(note))[:1], CompressedTextField.ZLIB)
+        self.assertEqual(Note.objects.get(pk=note.pk).content, legacy)
+
+    def test_values_list_decompresses(self):
+        content = 'Exported body ' * 40
+        Note.objects.create(title='Export', content=content, author=self.user)
+        self.assertEqual(list(Note.objects.values_list('content', flat=True)), [content])
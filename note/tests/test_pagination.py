@@ -0,0 +1,103 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from note import bulk
+from note.models import Note
+from note.pagination import KeysetPaginator
+from note.search import get_backend
+
+
+class KeysetPaginatorTestCase(TestCase):
+    def setUp(self):
+        # Arrange: 7 notes, two of them sharing a creation time
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        start = timezone.now()
+        self.notes = [
+            Note.objects.create(
+                title='Note {}'.format(i), content='content', author=self.user,
+                created=start - datetime.timedelta(minutes=min(i, 5)),
+            )
+            for i in range(7)
+        ]
+        self.queryset = Note.objects.filter(author=self.user)
+        # Expected display order: newest first, ties broken by the highest pk
+        self.expected = sorted(self.notes, key=lambda note: (note.created, note.pk), reverse=True)
+
+    def test_walk_forward_and_back(self):
+        paginator = KeysetPaginator(self.queryset, 3)
+        # Act: walk forward through all pages
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        # Assert
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual([note for page in pages for note in page], self.expected)
+        self.assertFalse(pages[0].has_previous())
+        # Act: step back from the last page
+        previous = paginator.page(pages[-1].previous_cursor)
+        # Assert
+        self.assertEqual(previous.object_list, pages[1].object_list)
+        self.assertTrue(previous.has_next())
+        self.assertTrue(previous.has_previous())
+
+    def test_deep_page_uses_range_not_offset(self):
+        paginator = KeysetPaginator(self.queryset, 3)
+        cursor = paginator.page().next_cursor
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            paginator.page(cursor)
+        # Assert: a single query with no OFFSET
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        paginator = KeysetPaginator(self.queryset, 3)
+        page = paginator.page('not-a-cursor')
+        self.assertEqual(page.object_list, self.expected[:3])
+
+    def test_cursor_from_other_ordering_is_ignored(self):
+        cursor = KeysetPaginator(self.queryset.order_by('title'), 3).page().next_cursor
+        page = KeysetPaginator(self.queryset, 3).page(cursor)
+        self.assertEqual(page.object_list, self.expected[:3])
+
+    def test_paginates_ranked_search_results(self):
+        queryset = get_backend().search(self.queryset, 'note')
+        paginator = KeysetPaginator(queryset, 3)
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertCountEqual([note for page in pages for note in page], self.notes)
+
+
+class IndexViewPaginationTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        caches['default'].clear()
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.client.login(username='test_user', password='test_password')
+        bulk.notes_created(Note.objects.bulk_create([
+            Note(title='Note {}'.format(i), content='content', author=self.user) for i in range(30)
+        ]))
+
+    def test_next_and_previous_links(self):
+        # Act
+        response = self.client.get(reverse('noteapp:index'))
+        # Assert: first page is full and links forward only
+        page = response.context['page_obj']
+        self.assertEqual(len(response.context['note_list']), 25)
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+        self.assertContains(response, 'Next &raquo;')
+        # Act
+        response = self.client.get(reverse('noteapp:index'), {'cursor': page.next_cursor})
+        # Assert
+        self.assertEqual(len(response.context['note_list']), 5)
+        self.assertContains(response, '&laquo; Previous')
+        self.assertNotContains(response, 'Next &raquo;')
@@ -0,0 +1,146 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from note import revisions, updates
+from note.models import Note, NoteRevision
+
+
+class RevisionDeltaTestCase(TestCase):
+    def test_delta_round_trip(self):
+        old = 'First line of the note\n\nSecond   paragraph, with  spacing.\n'
+        new = 'First line of this note\n\nSecond paragraph, with  spacing and more.\nThird.'
+        self.assertEqual(revisions.apply_delta(old, revisions.make_delta(old, new)), new)
+
+    def test_delta_size_follows_edit(self):
+        old = ' '.join('word{}'.format(i) for i in range(5000))
+        new = old.replace('word2500', 'changed')
+        delta = revisions.make_delta(old, new)
+        self.assertLess(len(delta), 100)
+        self.assertEqual(revisions.apply_delta(old, delta), new)
+
+
+@override_settings(NOTE_REVISION_SNAPSHOT_EVERY=3)
+class NoteRevisionTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.client.login(username='test_user', password='test_password')
+        self.body = ' '.join('word{}'.format(i) for i in range(500))
+        self.note = Note.objects.create(title='Note v1', content=self.body, author=self.user)
+
+    def _edit(self, title, content):
+        response = self.client.post(reverse('noteapp:edit', kwargs={'pk': self.note.pk}),
+                                    {'title': title, 'content': content})
+        self.assertEqual(response.status_code, 302)
+
+    def _versions(self, count):
+        versions = [('Note v1', self.body)]
+        for i in range(2, count + 1):
+            versions.append(('Note v{}'.format(i), self.body.replace(' word{} '.format(i), ' edit{} '.format(i))))
+            self._edit(*versions[-1])
+        return versions
+
+    def test_create_has_no_revision(self):
+        self.assertFalse(NoteRevision.objects.exists())
+
+    def test_unchanged_save_has_no_revision(self):
+        Note.objects.get(pk=self.note.pk).save()
+        self.assertFalse(NoteRevision.objects.exists())
+
+    def test_edits_store_deltas_and_snapshots(self):
+        # Act
+        versions = self._versions(7)
+
+        # Assert
+        stored = list(NoteRevision.objects.filter(note=self.note).order_by('number'))
+        self.assertEqual([revision.number for revision in stored], list(range(1, 8)))
+        self.assertEqual([revision.is_snapshot for revision in stored],
+                         [True, False, False, True, False, False, True])
+        for revision in stored:
+            if not revision.is_snapshot:
+                self.assertIsInstance(json.loads(revision.data), list)
+                self.assertLess(len(revision.data), len(self.body) // 10)
+        for number, version in enumerate(versions, 1):
+            self.assertEqual(revisions.rebuild(self.note, number), version)
+
+    def test_refresh_then_save(self):
+        # Arrange: another writer edits the note after it was loaded here
+        note = Note.objects.get(pk=self.note.pk)
+        other = Note.objects.get(pk=self.note.pk)
+        other.content = 'x y ' + self.body
+        other.save()
+        # Act
+        note.refresh_from_db()
+        note.content = 'x y ' + self.body + ' end'
+        note.save()
+        # Assert: the delta is against the refreshed content, not the one first loaded
+        self.assertEqual(revisions.rebuild(self.note, 2), ('Note v1', 'x y ' + self.body))
+        self.assertEqual(revisions.rebuild(self.note, 3), ('Note v1', 'x y ' + self.body + ' end'))
+
+    def test_bulk_update_records_revisions(self):
+        response = self.client.post(
+            reverse('noteapp:api-batch-update'),
+            data=json.dumps({'notes': [{'id': self.note.pk, 'content': 'Rewritten'}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(revisions.rebuild(self.note, 1), ('Note v1', self.body))
+        self.assertEqual(revisions.rebuild(self.note, 2), ('Note v1', 'Rewritten'))
+
+    def test_list_and_diff_views(self):
+        # Arrange
+        self._versions(3)
+
+        # Act
+        list_response = self.client.get(reverse('noteapp:revisions', kwargs={'pk': self.note.pk}))
+        diff_response = self.client.get(reverse('noteapp:revision', kwargs={'pk': self.note.pk, 'number': 3}))
+
+        # Assert
+        self.assertContains(list_response, 'Note v3')
+        self.assertContains(list_response, reverse('noteapp:revision', kwargs={'pk': self.note.pk, 'number': 1}))
+        self.assertContains(diff_response, 'edit3')
+        self.assertEqual(diff_response.context['against'], 2)
+
+    def test_restore(self):
+        # Arrange
+        self._versions(3)
+
+        # Act
+        response = self.client.post(reverse('noteapp:revision-restore', kwargs={'pk': self.note.pk, 'number': 1}))
+
+        # Assert
+        self.assertRedirects(response, reverse('noteapp:single', kwargs={'pk': self.note.pk}))
+        self.note.refresh_from_db()
+        self.assertEqual((self.note.title, self.note.content), ('Note v1', self.body))
+        self.assertEqual(self.note.revisions.count(), 4)
+
+    def test_restore_checks_version(self):
+        self._versions(2)
+        url = reverse('noteapp:revision-restore', kwargs={'pk': self.note.pk, 'number': 1})
+        version = self.client.get(reverse('noteapp:revision', kwargs={'pk': self.note.pk, 'number': 1})).context['version']
+        self.note.refresh_from_db()
+        self.note.title = 'Changed meanwhile'
+        self.note.save()
+        # Act
+        response = self.client.post(url, {'version': version})
+        # Assert: the concurrent edit is kept, no revision added
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Note.objects.get(pk=self.note.pk).title, 'Changed meanwhile')
+        self.assertEqual(self.note.revisions.count(), 3)
+        response = self.client.post(url, {'version': updates.get_version(self.note)})
+        self.assertRedirects(response, reverse('noteapp:single', kwargs={'pk': self.note.pk}))
+        self.assertEqual(Note.objects.get(pk=self.note.pk).title, 'Note v1')
+
+    def test_missing_revision_and_other_users_note(self):
+        self._versions(2)
+        response = self.client.get(reverse('noteapp:revision', kwargs={'pk': self.note.pk, 'number': 9}))
+        self.assertEqual(response.status_code, 400)
+
+        other = User.objects.create_user(username='other_user', password='test_password')
+        self.client.force_login(other)
+        response = self.client.post(reverse('noteapp:revision-restore', kwargs={'pk': self.note.pk, 'number': 1}))
+        self.assertEqual(response.status_code, 400)
+        self.assertTemplateUsed(response, 'note/custom_error.html')
@@ -0,0 +1,97 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from note import cache as note_cache
+from note.models import Note
+from note.routers import PrimaryReplicaRouter
+
+
+# The test database has no second alias, 'default' stands in for the replica and
+# pick_replica tells whether a request was routed to it.
+@override_settings(NOTE_DATABASE_REPLICAS=['default'])
+class ReplicaRoutingTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        caches['default'].clear()
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.note = Note.objects.create(title='Test Note', content='This is a test note', author=self.user)
+        self.client.force_login(self.user)
+        patcher = mock.patch('note.routers.pick_replica', return_value='default')
+        self.pick_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_read_views_use_replica(self):
+        for url in (
+            reverse('noteapp:index'),
+            reverse('noteapp:single', kwargs={'pk': self.note.pk}),
+            reverse('noteapp:edit', kwargs={'pk': self.note.pk}),
+            reverse('noteapp:delete', kwargs={'pk': self.note.pk}),
+        ):
+            self.pick_replica.reset_mock()
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.pick_replica.call_count, 1, url)
+            self.assertNotIn('note_primary', response.cookies)
+
+    def test_writes_use_primary(self):
+        # Act
+        response = self.client.post(reverse('noteapp:edit', kwargs={'pk': self.note.pk}),
+                                    {'title': 'Edited', 'content': 'Edited'})
+
+        # Assert
+        self.assertEqual(response.status_code, 302)
+        self.pick_replica.assert_not_called()
+        self.assertEqual(response.cookies['note_primary']['max-age'], 10)
+
+    def test_reads_stick_to_primary_after_write(self):
+        # Act
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('noteapp:add'), {'title': 'New Note', 'content': 'New'})
+        response = self.client.get(reverse('noteapp:index'))
+
+        # Assert
+        self.assertContains(response, 'New Note')
+        self.pick_replica.assert_not_called()
+
+    def test_other_views_use_primary(self):
+        self.client.get(reverse('noteapp:api-list'))
+        self.pick_replica.assert_not_called()
+
+    def test_replica_reads_are_not_cached(self):
+        for urlconf in ('django_notes.urls', 'django_notes.async_urls'):
+            with self.subTest(urlconf), override_settings(ROOT_URLCONF=urlconf):
+                caches['default'].clear()
+                self.client.cookies.pop('note_primary', None)
+                # Act: two replica reads, then two after a write pinned the client
+                self.client.get(reverse('noteapp:index'))
+                self.client.get(reverse('noteapp:index'))
+                self.assertEqual(note_cache.get_stats()['hits'], 0)
+                self.client.post(reverse('noteapp:add'), {'title': 'New Note {}'.format(urlconf), 'content': 'New'})
+                self.client.get(reverse('noteapp:index'))
+                response = self.client.get(reverse('noteapp:index'))
+                # Assert: only the primary's fragment was stored
+                self.assertEqual(note_cache.get_stats()['hits'], 1)
+                self.assertContains(response, 'New Note {}'.format(urlconf))
+
+    @override_settings(ROOT_URLCONF='django_notes.async_urls')
+    def test_async_read_view_uses_replica(self):
+        response = self.client.get(reverse('noteapp:index'))
+        self.assertEqual(response.status_code, 200)
+        self.pick_replica.assert_called_once()
+
+
+class PrimaryReplicaRouterTestCase(SimpleTestCase):
+    def test_outside_request(self):
+        router = PrimaryReplicaRouter()
+        self.assertIsNone(router.db_for_read(Note))
+        self.assertEqual(router.db_for_write(Note), 'default')
+
+    @override_settings(NOTE_DATABASE_REPLICAS=['replica_1'])
+    def test_replicas_are_not_migrated(self):
+        router = PrimaryReplicaRouter()
+        self.assertFalse(router.allow_migrate('replica_1', 'note'))
+        self.assertIsNone(router.allow_migrate('default', 'note'))
@@ -0,0 +1,127 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from note import bulk
+from note.models import Note
+from note.search import SimpleSearchBackend, get_backend, parse_terms
+
+
+class SearchBackendTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.other_user = User.objects.create_user(username='other_user', password='test_password')
+        self.backend = get_backend()
+        self.note_title = Note.objects.create(title='Budget planning', content='Numbers', author=self.user)
+        self.note_content = Note.objects.create(title='Weekly sync', content='Talk about budget', author=self.user)
+        self.note_other = Note.objects.create(title='Budget', content='Budget budget', author=self.other_user)
+
+    def _search(self, query):
+        return list(self.backend.search(Note.objects.filter(author=self.user), query))
+
+    def test_parse_terms_drops_query_syntax(self):
+        self.assertEqual(parse_terms('"budget" OR* (plan)'), ['budget', 'OR', 'plan'])
+
+    def test_title_match_ranks_first(self):
+        # Act
+        results = self._search('budget')
+        # Assert: both own notes found, title match ranked above content match
+        self.assertEqual(results, [self.note_title, self.note_content])
+
+    def test_prefix_terms(self):
+        self.assertEqual(self._search('budg'), [self.note_title, self.note_content])
+        self.assertEqual(self._search('budg plan'), [self.note_title])
+
+    def test_empty_query_matches_nothing(self):
+        self.assertEqual(self._search('""'), [])
+
+    def test_index_follows_update_and_delete(self):
+        # Act: change the title, then delete the note
+        self.note_title.title = 'Holiday planning'
+        self.note_title.save()
+        # Assert
+        self.assertEqual(self._search('holiday'), [self.note_title])
+        self.assertEqual(self._search('budget'), [self.note_content])
+        # Act
+        self.note_title.delete()
+        # Assert
+        self.assertEqual(self._search('holiday'), [])
+
+    def test_index_follows_refresh_then_save(self):
+        # Arrange: another writer retitles the note after it was loaded here
+        note = Note.objects.get(pk=self.note_title.pk)
+        self.note_title.title = 'Beta planning'
+        self.note_title.save()
+        # Act
+        note.refresh_from_db()
+        note.title = 'Gamma planning'
+        note.save()
+        # Assert: the entry was deleted with the text it was indexed with
+        self.assertEqual(self._search('gamma'), [self.note_title])
+        self.assertEqual(self._search('beta'), [])
+        self.assertEqual(self._search('budget'), [self.note_content])
+
+    def test_index_keeps_no_copy_of_the_text(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('FTS5 is SQLite specific')
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE name LIKE 'note_note_fts%%'")
+            tables = {row[0] for row in cursor.fetchall()}
+            self.assertNotIn('note_note_fts_content', tables)
+            # Act: edit, trash, restore and delete
+            self.note_content.content = 'Talk about holidays'
+            self.note_content.save()
+            bulk.trash_notes(Note.objects.filter(pk=self.note_title.pk))
+            bulk.restore_notes(Note.all_objects.filter(pk=self.note_title.pk))
+            self.note_other.delete()
+            # Assert: no entry kept a term it was deleted with
+            cursor.execute("SELECT rowid FROM note_note_fts WHERE note_note_fts MATCH 'budget'")
+            self.assertEqual([row[0] for row in cursor.fetchall()], [self.note_title.pk])
+        self.assertEqual(self._search('holidays'), [self.note_content])
+
+    def test_rebuild_command(self):
+        # Arrange: drop every index row behind the backend's back
+        self.backend.clear()
+        self.assertEqual(self._search('budget'), [])
+        # Act
+        out = StringIO()
+        call_command('rebuild_search_index', '--chunk-size', '2', stdout=out)
+        # Assert
+        self.assertIn('Indexed 3 notes', out.getvalue())
+        self.assertEqual(self._search('budget'), [self.note_title, self.note_content])
+
+
+    def test_simple_backend_matches_compressed_content(self):
+        # Arrange
+        Note.objects.filter(pk=self.note_content.pk).update(content='Talk about the budget ' + 'x' * 500)
+
+        # Act
+        results = SimpleSearchBackend().search(Note.objects.filter(author=self.user), 'BUDGET')
+
+        # Assert
+        self.assertEqual(set(results), {self.note_title, self.note_content})
+
+
+class IndexViewFullTextSearchTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.client.login(username='test_user', password='test_password')
+        self.note_content = Note.objects.create(title='Groceries', content='Buy apples', author=self.user)
+        self.note_title = Note.objects.create(title='Apples harvest', content='Orchard', author=self.user)
+
+    def test_results_ordered_by_relevance(self):
+        response = self.client.get(reverse('noteapp:index'), {'search': 'apple'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['note_list']), [self.note_title, self.note_content])
+
+    def test_search_uses_fts_join(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('FTS5 is SQLite specific')
+        queryset = get_backend().search(Note.objects.all(), 'apple')
+        self.assertIn('MATCH', str(queryset.query))
@@ -0,0 +1,73 @@
+import gzip
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import RequestFactory, TestCase, override_settings
+
+from note.staticfiles import IMMUTABLE_CACHE_CONTROL, StaticFilesServer
+
+CSS = 'note/bootstrap/css/bootstrap.min.css'
+
+
+class StaticFilesTestCase(TestCase):
+    def setUp(self):
+        # Arrange: collect the static files into a temporary STATIC_ROOT
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.settings_override = override_settings(STATIC_ROOT=self.root.name)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        call_command('collectstatic', '--noinput', stdout=StringIO())
+        self.hashed_url = static(CSS)
+
+    def test_before_collectstatic_source_names_are_used(self):
+        with override_settings(STATIC_ROOT=os.path.join(self.root.name, 'missing')):
+            self.assertEqual(static(CSS), '/static/' + CSS)
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        # Assert
+        self.assertRegex(self.hashed_url, r'^/static/note/bootstrap/css/bootstrap\.min\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.root.name, self.hashed_url[len('/static/'):])
+        with open(path, 'rb') as f, open(path + '.gz', 'rb') as gz:
+            content, compressed = f.read(), gz.read()
+        self.assertEqual(gzip.decompress(compressed), content)
+        self.assertLess(len(compressed), len(content) // 4)
+
+    def test_serves_compressed_immutable_files(self):
+        # Act
+        response = self.client.get(self.hashed_url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css; charset=utf-8')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response.streaming)
+        self.assertTrue(gzip.decompress(b''.join(response.streaming_content)).startswith(b'@charset'))
+        self.assertNotIn('Content-Disposition', response)
+
+    def test_identity_and_unhashed_names(self):
+        response = self.client.get(self.hashed_url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'@charset'))
+        response = self.client.get('/static/' + CSS)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        response.close()
+        response = self.client.head(self.hashed_url)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(int(response['Content-Length']), os.path.getsize(
+            os.path.join(self.root.name, self.hashed_url[len('/static/'):])
+        ))
+
+    def test_not_modified_and_missing_files(self):
+        server = StaticFilesServer(root=self.root.name, url='/static/')
+        name = server.match(self.hashed_url)
+        response = server.serve(RequestFactory().get(self.hashed_url), name)
+        request = RequestFactory().get(self.hashed_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(server.serve(request, name).status_code, 304)
+        self.assertIsNone(server.match('/static/../manage.py'))
+        self.assertIsNone(server.match(self.hashed_url + '.gz'))
+        self.assertEqual(self.client.get('/static/note/missing.css').status_code, 404)
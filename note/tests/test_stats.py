@@ -0,0 +1,106 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from note import bulk, stats
+from note.models import Note, NoteStats
+
+
+class NoteStatsTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        caches['default'].clear()
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.client.login(username='test_user', password='test_password')
+        self.other = User.objects.create_user(username='other_user', password='test_password')
+        Note.objects.create(title='Other', content='other', author=self.other)
+
+    def _totals(self, user=None):
+        row = stats.for_user(user or self.user)
+        return row.note_count, row.content_bytes
+
+    def test_views_keep_totals(self):
+        self.client.post(reverse('noteapp:add'), {'title': 'First', 'content': 'héllo'})
+        self.client.post(reverse('noteapp:add'), {'title': 'Second', 'content': 'abc'})
+        self.assertEqual(self._totals(), (2, 9))
+        first = Note.objects.get(title='First')
+        # Act
+        self.client.post(reverse('noteapp:edit', kwargs={'pk': first.pk}), {'title': 'First', 'content': 'hi'})
+        self.assertEqual(self._totals(), (2, 5))
+        self.client.post(reverse('noteapp:delete', kwargs={'pk': first.pk}))
+        # Assert
+        self.assertEqual(self._totals(), (1, 3))
+        self.assertEqual(self._totals(self.other), (1, 5))
+        self.assertContains(self.client.get(reverse('noteapp:index')), 'You have 1 note,')
+
+    def _post(self, name, payload):
+        return self.client.post(reverse(name), data=json.dumps(payload), content_type='application/json')
+
+    def test_batch_api_keeps_totals(self):
+        self._post('noteapp:api-batch-create', {
+            'notes': [{'title': 'Batch {}'.format(i), 'content': 'xx'} for i in range(3)],
+        })
+        self.assertEqual(self._totals(), (3, 6))
+        ids = sorted(Note.objects.filter(author=self.user).values_list('pk', flat=True))
+        self._post('noteapp:api-batch-update', {'notes': [{'id': ids[0], 'content': 'xxxxx'}]})
+        self.assertEqual(self._totals(), (3, 9))
+        self._post('noteapp:api-batch-delete', {'ids': ids[1:]})
+        self.assertEqual(self._totals(), (1, 5))
+
+    def test_refresh_then_save_keeps_totals(self):
+        note = Note.objects.create(title='Note', content='abc', author=self.user)
+        loaded = Note.objects.get(pk=note.pk)
+        # Arrange: another writer grows the note after it was loaded here
+        note.content = 'abcdefgh'
+        note.save()
+        # Act
+        loaded.refresh_from_db()
+        loaded.content = 'ab'
+        loaded.save()
+        # Assert: the change is against the refreshed size
+        self.assertEqual(self._totals(), (1, 2))
+        self.assertEqual(stats.reconcile([self.user.pk]), [])
+
+    def test_deleting_latest_note_moves_timestamps_back(self):
+        old = Note.objects.create(title='Old', content='', author=self.user)
+        Note.objects.filter(pk=old.pk).update(created=timezone.now() - timedelta(days=1),
+                                              updated=timezone.now() - timedelta(days=1))
+        old.refresh_from_db()
+        stats.reconcile([self.user.pk])
+        latest = Note.objects.create(title='Latest', content='', author=self.user)
+        self.assertEqual(stats.for_user(self.user).last_created, latest.created)
+        # Act
+        latest.delete()
+        # Assert
+        row = stats.for_user(self.user)
+        self.assertEqual((row.last_created, row.last_updated), (old.created, old.updated))
+        old.delete()
+        row = stats.for_user(self.user)
+        self.assertEqual((row.note_count, row.last_created, row.last_updated), (0, None, None))
+
+    def test_deleting_user(self):
+        Note.objects.create(title='Note', content='content', author=self.user)
+        self.user.delete()
+        self.assertFalse(NoteStats.objects.filter(user_id=self.user.pk).exists())
+
+    def test_reconcile_fixes_drift(self):
+        notes = Note.objects.bulk_create([Note(title='Raw', content='abcd', author=self.user)])
+        bulk.notes_created(notes)
+        NoteStats.objects.filter(user=self.user).update(note_count=7, content_bytes=1)
+        out = StringIO()
+        # Act: a dry run only reports
+        call_command('reconcile_note_stats', '--dry-run', stdout=out)
+        self.assertIn('Checked 2 users, 1 drifted.', out.getvalue())
+        self.assertEqual(self._totals(), (7, 1))
+        call_command('reconcile_note_stats', '--batch-size', '1', stdout=out)
+        # Assert
+        self.assertIn('Checked 2 users, 1 fixed.', out.getvalue())
+        self.assertEqual(self._totals(), (1, 4))
+        self.assertEqual(stats.reconcile([self.user.pk, self.other.pk]), [])
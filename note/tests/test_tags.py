@@ -0,0 +1,124 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from note import tags
+from note.models import Note, Tag
+
+
+class TagCountTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.notes = [Note.objects.create(title='Note {}'.format(i), content='', author=self.user) for i in range(3)]
+
+    def _counts(self):
+        return {(tag.kind, tag.name): tag.note_count for tag in Tag.objects.filter(user=self.user)}
+
+    def test_parse_names(self):
+        self.assertEqual(tags.parse_names(' work, home ,,Work,  to   do '), ['work', 'home', 'to do'])
+
+    def test_set_labels(self):
+        tags.set_labels(self.notes[0], 'Projects', ['work', 'home'])
+        tags.set_labels(self.notes[1], 'Projects', ['work'])
+        self.assertEqual(self._counts(), {('folder', 'Projects'): 2, ('tag', 'work'): 2, ('tag', 'home'): 1})
+        # Act
+        tags.set_labels(self.notes[0], '', ['home', 'ideas'])
+        # Assert
+        self.assertEqual(self._counts(), {
+            ('folder', 'Projects'): 1, ('tag', 'work'): 1, ('tag', 'home'): 1, ('tag', 'ideas'): 1,
+        })
+
+    def test_relation_methods(self):
+        work = tags.get_tags(self.user, Tag.TAG, ['work'])[0]
+        work.notes.add(*self.notes)
+        self.notes[0].tags.add(work)
+        self.assertEqual(self._counts(), {('tag', 'work'): 3})
+        # Removing a tag the note does not have changes nothing
+        home = tags.get_tags(self.user, Tag.TAG, ['home'])[0]
+        self.notes[0].tags.remove(home)
+        work.notes.remove(self.notes[1])
+        self.assertEqual(self._counts(), {('tag', 'work'): 2, ('tag', 'home'): 0})
+        work.notes.clear()
+        self.assertEqual(self._counts(), {('tag', 'work'): 0, ('tag', 'home'): 0})
+
+    def test_delete_note(self):
+        tags.set_labels(self.notes[0], 'Projects', ['work'])
+        tags.set_labels(self.notes[1], '', ['work'])
+        self.notes[0].delete()
+        Note.objects.filter(pk=self.notes[1].pk).delete()
+        self.assertEqual(self._counts(), {('folder', 'Projects'): 0, ('tag', 'work'): 0})
+
+    def test_filter_uses_indexes(self):
+        queryset = tags.filter_notes(Note.objects.filter(author=self.user), self.user, Tag.TAG, 'work')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        # Assert: the unique constraints' indexes, no table scan
+        self.assertIn('note_tag USING COVERING INDEX', plan)
+        self.assertIn('note_notetag USING COVERING INDEX', plan)
+        self.assertIn('(tag_id=? AND note_id=?)', plan)
+        self.assertNotIn('SCAN', plan)
+
+
+class TagViewsTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        caches['default'].clear()
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.client.login(username='test_user', password='test_password')
+        self.other = User.objects.create_user(username='other_user', password='test_password')
+        other_note = Note.objects.create(title='Other work', content='', author=self.other)
+        tags.set_labels(other_note, 'Projects', ['work'])
+
+    def _add(self, title, folder='', tag_names=''):
+        response = self.client.post(reverse('noteapp:add'), {
+            'title': title, 'content': 'content', 'folder': folder, 'tags': tag_names,
+        })
+        self.assertEqual(response.status_code, 302)
+        return Note.objects.get(title=title)
+
+    def test_add_edit_and_filter(self):
+        first = self._add('First note', 'Projects', 'work, urgent')
+        self._add('Second note', '', 'work')
+        self._add('Third note')
+        # Act
+        response = self.client.get(reverse('noteapp:index'), {'tag': 'work'})
+        # Assert: only this user's notes; the sidebar reads the maintained counts
+        self.assertContains(response, 'First note')
+        self.assertContains(response, 'Second note')
+        self.assertNotContains(response, 'Third note')
+        self.assertNotContains(response, 'Other work')
+        self.assertContains(response, '<a href="?tag=work" class="ml-2">work</a> (2)')
+        response = self.client.get(reverse('noteapp:index'), {'folder': 'Projects'})
+        self.assertEqual([note.title for note in response.context['note_list']], ['First note'])
+
+        url = reverse('noteapp:edit', kwargs={'pk': first.pk})
+        form = self.client.get(url).context['form']
+        self.assertEqual((form['folder'].value(), form['tags'].value()), ('Projects', 'urgent, work'))
+        self.client.post(url, {'title': first.title, 'content': 'content', 'folder': '', 'tags': 'urgent'})
+        self.assertEqual(list(Tag.objects.filter(user=self.user).values_list('name', 'note_count')),
+                         [('Projects', 0), ('urgent', 1), ('work', 1)])
+        self.assertNotContains(self.client.get(reverse('noteapp:index')), '?folder=Projects')
+
+    def test_edit_without_label_changes_keeps_tags(self):
+        note = self._add('First note', 'Projects', 'work')
+        url = reverse('noteapp:edit', kwargs={'pk': note.pk})
+        self.client.post(url, {'title': 'Renamed note', 'content': 'content', 'folder': 'Projects', 'tags': 'work'})
+        self.assertEqual(Note.objects.get(pk=note.pk).tags.count(), 2)
+
+    def test_pages_keep_filter(self):
+        for i in range(26):
+            self._add('Tagged note {}'.format(i), '', 'work')
+        response = self.client.get(reverse('noteapp:index'), {'tag': 'work'})
+        self.assertContains(response, '?tag=work&amp;cursor=')
+
+    def test_too_many_tags(self):
+        response = self.client.post(reverse('noteapp:add'), {
+            'title': 'First note', 'content': '', 'tags': ','.join('t{}'.format(i) for i in range(tags.MAX_TAGS + 1)),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Note.objects.filter(title='First note').exists())
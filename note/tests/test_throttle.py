@@ -0,0 +1,94 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from note import throttle
+
+
+class TokenBucketTestCase(TestCase):
+    def test_take_and_refill(self):
+        state = None
+        for _ in range(3):
+            state, retry_after = throttle.take(state, 100.0, 3, 0.5)
+            self.assertEqual(retry_after, 0.0)
+        state, retry_after = throttle.take(state, 100.0, 3, 0.5)
+        self.assertEqual(retry_after, 2.0)
+        # Assert: one token is back after 1 / per_second seconds, never more than capacity
+        state, retry_after = throttle.take(state, 102.0, 3, 0.5)
+        self.assertEqual(retry_after, 0.0)
+        self.assertEqual(throttle.take(state, 1000.0, 3, 0.5)[0], (2, 1000.0))
+
+    @override_settings(NOTE_THROTTLE_STORE='note.throttle.CacheBucketStore')
+    def test_cache_store(self):
+        caches['default'].clear()
+        store = throttle.get_store()
+        self.assertIsInstance(store, throttle.CacheBucketStore)
+        self.assertEqual(store.take('key', 1, 1 / 60.0), 0.0)
+        self.assertGreater(store.take('key', 1, 1 / 60.0), 59)
+
+
+@override_settings(NOTE_THROTTLE_RATES={'ip': (3, 1), 'username': (2, 1)})
+class LoginThrottleTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        throttle.get_store().clear()
+        self.addCleanup(throttle.get_store().clear)
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.login_url = reverse('noteapp:login')
+
+    def _login(self, username, ip='198.51.100.1'):
+        return self.client.post(self.login_url, {'username': username, 'password': 'wrong'}, REMOTE_ADDR=ip)
+
+    @mock.patch('note.throttle.time')
+    def test_per_ip_bucket(self, clock):
+        # Frozen clock: slow password hashing must not refill the bucket during the test
+        clock.monotonic.return_value = clock.time.return_value = 1000.0
+        for i in range(3):
+            self.assertEqual(self._login('user_{}'.format(i)).status_code, 200)
+        # Act
+        with mock.patch('django.contrib.auth.forms.authenticate') as authenticate:
+            response = self._login('user_3')
+        # Assert: rejected before the credentials are checked
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertTemplateUsed(response, 'note/custom_error.html')
+        authenticate.assert_not_called()
+        self.assertEqual(self._login('user_3', ip='198.51.100.2').status_code, 200)
+
+    def test_per_username_bucket(self):
+        self._login('Test_User', ip='198.51.100.1')
+        self._login('test_user', ip='198.51.100.2')
+        self.assertEqual(self._login('test_user ', ip='198.51.100.3').status_code, 429)
+        self.assertEqual(self._login('other_user', ip='198.51.100.3').status_code, 200)
+
+    def test_get_is_not_throttled(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get(self.login_url, REMOTE_ADDR='198.51.100.1').status_code, 200)
+
+    def test_signup_has_its_own_buckets(self):
+        for i in range(3):
+            self._login('user_{}'.format(i))
+        response = self.client.post(reverse('noteapp:signup'), {
+            'username': 'new_user', 'password1': 'complex-pass-123', 'password2': 'complex-pass-123',
+        }, REMOTE_ADDR='198.51.100.1')
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(NOTE_THROTTLE_RATES={})
+    def test_disabled(self):
+        for i in range(5):
+            self.assertEqual(self._login('test_user').status_code, 200)
+
+
+class BenchThrottleCommandTestCase(TransactionTestCase):
+    # The command's threads use their own connections, which must see committed rows.
+    def test_bench_throttle(self):
+        out = StringIO()
+        call_command('bench_throttle', '--duration', '0.2', '--readers', '1', '--attackers', '1',
+                     '--notes', '3', stdout=out)
+        self.assertIn('attack, throttled', out.getvalue())
+        self.assertFalse(User.objects.filter(username='__bench_throttle__').exists())
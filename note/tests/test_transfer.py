@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from note.models import Note
+from note.search import get_backend
+
+
+class TransferCommandsTestCase(TestCase):
+    def setUp(self):
+        # Arrange
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.target = User.objects.create_user(username='target_user', password='test_password')
+        self.notes = [
+            Note.objects.create(title='Note {}'.format(i), content='Line one\nline "two", {}'.format(i), author=self.user)
+            for i in range(5)
+        ]
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def _export(self, name, *args):
+        call_command('export_notes', self._path(name), *args, stdout=StringIO(), stderr=StringIO())
+        return self._path(name)
+
+    def _import(self, path, *args):
+        out = StringIO()
+        call_command('import_notes', path, *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_export_jsonl(self):
+        path = self._export('notes.jsonl', '--chunk-size', '2')
+        with open(path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([record['title'] for record in records], ['Note {}'.format(i) for i in range(5)])
+        self.assertEqual(records[0]['author'], 'test_user')
+
+    def test_round_trip_csv_with_author_map(self):
+        path = self._export('notes.csv')
+        # Act
+        output = self._import(path, '--author-map', 'test_user:target_user', '--batch-size', '2')
+        # Assert
+        self.assertIn('Imported 5 notes', output)
+        imported = Note.objects.filter(author=self.target).order_by('pk')
+        self.assertEqual(
+            [(note.title, note.content) for note in imported],
+            [(note.title, note.content) for note in self.notes],
+        )
+
+    def test_import_jsonl_parallel_and_indexed(self):
+        path = self._export('notes.jsonl')
+        self._import(path, '--author', 'target_user', '--workers', '2', '--batch-size', '2')
+        results = get_backend().search(Note.objects.filter(author=self.target), 'note')
+        self.assertEqual(results.count(), 5)
+
+    def test_resume_from_offset(self):
+        path = self._export('notes.jsonl')
+        self._import(path, '--author', 'target_user', '--offset', '3')
+        self.assertEqual(
+            list(Note.objects.filter(author=self.target).order_by('pk').values_list('title', flat=True)),
+            ['Note 3', 'Note 4'],
+        )
+
+    def test_invalid_record_stops_with_offset(self):
+        path = self._path('bad.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'author': 'test_user', 'title': 'Good'}) + '\n')
+            f.write(json.dumps({'author': 'test_user', 'title': ''}) + '\n')
+        with self.assertRaisesMessage(CommandError, 'Record 2: missing title'):
+            self._import(path, '--batch-size', '1')
+        # Assert: the first batch was committed before the failure
+        self.assertTrue(Note.objects.filter(title='Good').exists())
+
+    def test_skip_invalid_and_unknown_author(self):
+        path = self._path('bad.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'author': 'nobody', 'title': 'Orphan'}) + '\n')
+            f.write(json.dumps({'author': 'test_user', 'title': 'Kept'}) + '\n')
+        output = self._import(path, '--skip-invalid')
+        self.assertIn('Imported 1 notes, skipped 1', output)
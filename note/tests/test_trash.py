@@ -0,0 +1,115 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from note import bulk, stats, tags, tasks
+from note.models import Note, NoteRevision, NoteTag, Tag
+from note.search import get_backend
+
+
+class TrashTestCase(TestCase):
+    def setUp(self):
+        # Arrange: a tagged and edited note, and a second one
+        caches['default'].clear()
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.client.login(username='test_user', password='test_password')
+        self.note = Note.objects.create(title='Trashed note', content='some content', author=self.user)
+        tags.set_labels(self.note, 'Projects', ['work'])
+        self.note.content = 'edited content'
+        self.note.save()
+        self.kept = Note.objects.create(title='Kept note', content='other', author=self.user)
+
+    def _counts(self):
+        return dict(Tag.objects.filter(user=self.user).values_list('name', 'note_count'))
+
+    def _plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' '.join(row[-1] for row in cursor.fetchall())
+
+    def test_delete_moves_to_trash_and_restore(self):
+        # Act
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('noteapp:delete', kwargs={'pk': self.note.pk}))
+        self.assertRedirects(response, reverse('noteapp:index'))
+        # Assert: gone from the list, search, counts and stats, but kept in the trash
+        self.assertNotContains(self.client.get(reverse('noteapp:index')), 'Trashed note')
+        self.assertEqual(list(get_backend().search(Note.objects.all(), 'edited')), [])
+        self.assertEqual(self._counts(), {'Projects': 0, 'work': 0})
+        self.assertEqual(stats.for_user(self.user).note_count, 1)
+        self.assertEqual(stats.reconcile([self.user.pk]), [])
+        self.assertContains(self.client.get(reverse('noteapp:trash')), 'Trashed note')
+        self.assertEqual(self.client.get(reverse('noteapp:single', kwargs={'pk': self.note.pk})).status_code, 400)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('noteapp:restore', kwargs={'pk': self.note.pk}))
+        self.assertRedirects(response, reverse('noteapp:trash'))
+        self.assertContains(self.client.get(reverse('noteapp:index')), 'Trashed note')
+        self.assertEqual(list(get_backend().search(Note.objects.all(), 'edited')), [self.note])
+        self.assertEqual(self._counts(), {'Projects': 1, 'work': 1})
+        self.assertEqual(stats.reconcile([self.user.pk]), [])
+        self.assertEqual(self.note.revisions.count(), 2)
+
+    def test_restore_others_or_live_notes(self):
+        other = User.objects.create_user(username='other_user', password='test_password')
+        other_note = Note.objects.create(title='Other', content='', author=other)
+        bulk.trash_notes(Note.objects.filter(pk=other_note.pk))
+        self.assertEqual(self.client.post(reverse('noteapp:restore', kwargs={'pk': other_note.pk})).status_code, 400)
+        self.assertEqual(self.client.post(reverse('noteapp:restore', kwargs={'pk': self.kept.pk})).status_code, 400)
+        self.assertFalse(Note.objects.filter(pk=other_note.pk).exists())
+
+    def test_editing_a_trashed_note(self):
+        url = reverse('noteapp:edit', kwargs={'pk': self.note.pk})
+        version = self.client.get(url).context['form']['version'].value()
+        bulk.trash_notes(Note.objects.filter(pk=self.note.pk))
+        response = self.client.post(url, {'title': 'Renamed', 'content': 'x', 'version': version})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Note.all_objects.get(pk=self.note.pk).title, 'Trashed note')
+
+    def test_purge_expired(self):
+        bulk.trash_notes(Note.objects.all())
+        Note.all_objects.filter(pk=self.note.pk).update(deleted=timezone.now() - timedelta(days=31))
+        out = StringIO()
+        # Act
+        with mock.patch('note.bulk.time.sleep') as sleep:
+            call_command('purge_trash', '--batch-size', '1', stdout=out)
+        # Assert: only the expired note and its revisions and links are gone
+        self.assertIn('Purged 1 notes', out.getvalue())
+        self.assertEqual(list(Note.all_objects.all()), [self.kept])
+        self.assertFalse(NoteRevision.objects.filter(note_id=self.note.pk).exists())
+        self.assertFalse(NoteTag.objects.exists())
+        self.assertEqual(self._counts(), {'Projects': 0, 'work': 0})
+        self.assertEqual(stats.reconcile([self.user.pk]), [])
+        sleep.assert_not_called()
+
+    def test_purge_pauses_between_batches(self):
+        bulk.trash_notes(Note.objects.all())
+        with mock.patch('note.bulk.time.sleep') as sleep:
+            call_command('purge_trash', '--days', '0', '--batch-size', '1', '--pause', '0.5', stdout=StringIO())
+        self.assertFalse(Note.all_objects.exists())
+        sleep.assert_called_once_with(0.5)
+
+    def test_delete_user_purges_trash_in_chunks(self):
+        bulk.trash_notes(Note.objects.filter(pk=self.note.pk))
+        with self.settings(NOTE_JOB_CHUNK_SIZE=1, NOTE_PURGE_PAUSE=0):
+            self.assertEqual(tasks.delete_user(self.user.pk), {'deleted': 2})
+        self.assertFalse(Note.all_objects.exists())
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+
+    def test_partial_indexes(self):
+        live = Note.objects.filter(author=self.user).order_by('created', 'id')
+        self.assertIn('note_author_created_id_idx', self._plan(live))
+        trash = self.client.get(reverse('noteapp:trash')).context['view'].get_queryset()
+        self.assertIn('note_trash_idx', self._plan(trash))
+        self.assertNotIn('TEMP B-TREE', self._plan(trash))
+        expired = Note.all_objects.filter(deleted__lt=timezone.now()).order_by().values('pk')
+        self.assertIn('note_deleted_idx', self._plan(expired))
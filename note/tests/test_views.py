@@ -1,5 +1,8 @@
 from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from note.models import Note
@@ -8,6 +11,7 @@ from note.models import Note
 class NoteViewsCRUDTestCase(TestCase):
     def setUp(self):
         # Arrange
+        caches['default'].clear()
         self.user = User.objects.create_user(username='test_user', password='test_password')
         self.client.login(username='test_user', password='test_password')
         self.note = Note.objects.create(title='Test Note', content='This is a test note', author=self.user)
@@ -20,6 +24,13 @@ class NoteViewsCRUDTestCase(TestCase):
         self.assertTemplateUsed(response, 'note/index.html')
         self.assertContains(response, self.note.title)
 
+    def test_index_row_links(self):
+        # Act
+        response = self.client.get(reverse('noteapp:index'))
+        # Assert: the row links are built from one reversed prefix per URL name
+        for name in ('single', 'edit', 'delete'):
+            self.assertContains(response, 'href="{}"'.format(reverse('noteapp:' + name, kwargs={'pk': self.note.pk})))
+
     def test_single_view(self):
         # Act
         url = reverse('noteapp:single', kwargs={'pk': self.note.pk})
@@ -66,6 +77,35 @@ class NoteViewsCRUDTestCase(TestCase):
         self.assertEqual(self.note.title, 'Updated Note')
         self.assertEqual(self.note.content, 'This note has been updated')
 
+    def test_edit_view_conflict(self):
+        # Arrange: the form is opened, then the note is saved elsewhere
+        url = reverse('noteapp:edit', kwargs={'pk': self.note.pk})
+        version = self.client.get(url).context['form']['version'].value()
+        self.client.post(url, data={'title': 'Other edit', 'content': self.note.content, 'version': version})
+        # Act
+        response = self.client.post(url, data={'title': 'Stale edit', 'content': 'Stale', 'version': version})
+        # Assert: nothing is overwritten, and the form now carries the current version
+        self.assertEqual(response.status_code, 409)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.title, 'Other edit')
+        self.assertEqual(response.context['form']['version'].value(), self.note.updated.isoformat())
+        response = self.client.post(url, data=response.context['form'].data)
+        self.assertEqual(response.status_code, 302)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.title, 'Stale edit')
+
+    def test_edit_view_writes_changed_fields_only(self):
+        url = reverse('noteapp:edit', kwargs={'pk': self.note.pk})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url, data={'title': 'Renamed', 'content': self.note.content})
+        update = next(query['sql'] for query in queries if query['sql'].startswith('UPDATE "note_note"'))
+        self.assertNotIn('"content"', update)
+        # Act: nothing changed
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data={'title': 'Renamed', 'content': self.note.content})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+
     def test_delete_view(self):
         # Act
         url = reverse('noteapp:delete', kwargs={'pk': self.note.pk})
@@ -84,6 +124,7 @@ class NoteViewsCRUDTestCase(TestCase):
 class NoteViewsAuthTestCase(TestCase):
     def setUp(self):
         # Arrange
+        caches['default'].clear()
         self.user_original_password = 'test_password'
         self.user = User.objects.create_user(username='test_user', password=self.user_original_password)
         self.note = Note.objects.create(title='Test Note', content='This is a test note', author=self.user)
@@ -143,6 +184,7 @@ class NoteViewsAuthTestCase(TestCase):
 class IndexViewSearchTestCase(TestCase):
     def setUp(self):
         # Arrange
+        caches['default'].clear()
         self.user = User.objects.create_user(username='test_user', password='test_password')
         self.client.login(username='test_user', password='test_password')
         self.note1 = Note.objects.create(title='Test Note1', content='This is a test note', author=self.user)
@@ -157,10 +199,23 @@ class IndexViewSearchTestCase(TestCase):
         self.assertContains(response, self.note2.title)
         self.assertNotContains(response, self.note3.title)
 
+    def test_list_and_search_do_not_read_content(self):
+        for params in ({}, {'search': 'test'}):
+            # Act
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('noteapp:index'), params)
+            # Assert
+            self.assertEqual(response.status_code, 200)
+            list_queries = [q['sql'] for q in queries if 'FROM "note_note"' in q['sql'] and 'LIMIT' in q['sql']]
+            self.assertTrue(list_queries)
+            for sql in list_queries:
+                self.assertNotIn('"note_note"."content"', sql)
+
 
 class NoteViewsAuthorizationTestCase(TestCase):
     def setUp(self):
         # Arrange: 2 user and 2 notes each
+        caches['default'].clear()
         self.user_1 = User.objects.create_user(username='test_user_1', password='test_password')
         self.note_1_1 = Note.objects.create(
             title='Test Note 1: user 1', content='This is a test note', author=self.user_1
@@ -262,6 +317,7 @@ class NoteViewsAuthorizationTestCase(TestCase):
 class AccessingNonExistentNoteTestCases(TestCase):
     def setUp(self):
         # Arrange: 1 user, 1 note and user logged in
+        caches['default'].clear()
         self.user_1 = User.objects.create_user(username='test_user_1', password='test_password')
         self.note_1_1 = Note.objects.create(
             title='Test Note 1: user 1', content='This is a test note', author=self.user_1
@@ -289,3 +345,53 @@ class AccessingNonExistentNoteTestCases(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertTemplateUsed(response, 'note/custom_error.html')
 
+
+
+class SingleObjectQueryCountTestCase(TestCase):
+    def setUp(self):
+        # Arrange: 1 user, 1 note and user logged in
+        caches['default'].clear()
+        self.user = User.objects.create_user(username='test_user', password='test_password')
+        self.note = Note.objects.create(title='Test Note', content='This is a test note', author=self.user)
+        self.client.login(username='test_user', password='test_password')
+
+    def test_single_view_query_count(self):
+        url = reverse('noteapp:single', kwargs={'pk': self.note.pk})
+        # Assert: session and user come from the cache, then one owner-filtered note select
+        # with its author joined
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Author: test_user')
+
+    def test_edit_view_query_count(self):
+        url = reverse('noteapp:edit', kwargs={'pk': self.note.pk})
+        # Assert: note, its tags and folder
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        # Assert: note, tags, savepoint, update, search entry lookup, delete + insert,
+        # latest revision lookup, one insert of revisions 1 and 2, author stats update, release
+        with self.assertNumQueries(11):
+            response = self.client.post(url, data={'title': 'Updated Note', 'content': 'Updated'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_delete_view_query_count(self):
+        url = reverse('noteapp:delete', kwargs={'pk': self.note.pk})
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        # Assert: note, its pk as a chunk, savepoint, trash update, trashed note, tag counts update,
+        # search entry lookup and delete, author stats update, release
+        with self.assertNumQueries(10):
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_other_users_note_costs_one_query(self):
+        other = User.objects.create_user(username='other_user', password='test_password')
+        note = Note.objects.create(title='Other Note', content='Private', author=other)
+        url = reverse('noteapp:single', kwargs={'pk': note.pk})
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertTemplateUsed(response, 'note/custom_error.html')
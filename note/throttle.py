@@ -0,0 +1,123 @@
+"""
+Token-bucket throttling of the login and signup POSTs.
+
+Both run the password hasher (PBKDF2 by default), so a burst of credential stuffing or
+signups could keep every worker CPU busy. ``ReMixinThrottle`` takes a token from the
+client IP's bucket and from the submitted username's bucket before the form is
+processed, and answers 429 with ``Retry-After`` when either is empty.
+
+``settings.NOTE_THROTTLE_RATES`` maps a bucket kind (``ip``, ``username``) to
+``(capacity, tokens refilled per minute)``; a kind that is missing is not throttled.
+``settings.NOTE_THROTTLE_STORE`` names the bucket store class by dotted path:
+``LocalBucketStore`` keeps buckets in the process, ``CacheBucketStore`` shares them
+between processes through the ``NOTE_THROTTLE_CACHE_ALIAS`` cache.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+DEFAULT_STORE = 'note.throttle.LocalBucketStore'
+KEY = 'note:throttle:{}:{}:{}'
+
+
+def get_rates():
+    return getattr(settings, 'NOTE_THROTTLE_RATES', {})
+
+
+def refill(tokens, stamp, now, capacity, per_second):
+    return min(capacity, tokens + (now - stamp) * per_second)
+
+
+def take(state, now, capacity, per_second):
+    """
+    Take a token from a bucket ``state`` of ``(tokens, stamp)``, ``None`` for a full one.
+
+    Returns the new state and the seconds to wait before a token is available (0 if one
+    was taken).
+    """
+    tokens = capacity if state is None else refill(state[0], state[1], now, capacity, per_second)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    return (tokens, now), (1 - tokens) / per_second
+
+
+class LocalBucketStore:
+    """Buckets in a dict of this process; every worker process throttles on its own."""
+    max_entries = 10000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, per_second):
+        now = time.monotonic()
+        with self._lock:
+            state, retry_after = take(self._buckets.get(key), now, capacity, per_second)
+            self._buckets[key] = state
+            if len(self._buckets) > self.max_entries:
+                self._prune()
+        return retry_after
+
+    def _prune(self):
+        # Drop the least recently used half, to bound memory under a spray of IPs or
+        # usernames; a missing bucket is a full one.
+        oldest = sorted(self._buckets, key=lambda key: self._buckets[key][1])
+        for key in oldest[:len(oldest) // 2]:
+            del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Buckets in a Django cache shared by all processes. The read and write of a bucket are
+    not atomic, so concurrent requests may occasionally both get the last token.
+    """
+
+    def __init__(self):
+        alias = getattr(settings, 'NOTE_THROTTLE_CACHE_ALIAS', None) or getattr(settings, 'NOTE_CACHE_ALIAS', 'default')
+        self.cache = caches[alias]
+
+    def take(self, key, capacity, per_second):
+        now = time.time()
+        state, retry_after = take(self.cache.get(key), now, capacity, per_second)
+        # Once refilled the entry is not needed any more.
+        self.cache.set(key, state, timeout=int(capacity / per_second) + 1)
+        return retry_after
+
+
+_stores = {}
+
+
+def get_store():
+    path = getattr(settings, 'NOTE_THROTTLE_STORE', DEFAULT_STORE)
+    if path not in _stores:
+        _stores[path] = import_string(path)()
+    return _stores[path]
+
+
+def get_client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def check(request, scope, username=''):
+    """Take a token from each bucket of the request; the seconds to wait if one is empty."""
+    rates = get_rates()
+    identities = (('ip', get_client_ip(request)), ('username', username.strip().lower()))
+    store = get_store()
+    for kind, identity in identities:
+        if kind not in rates or not identity:
+            continue
+        capacity, per_minute = rates[kind]
+        # Hashed, so any username makes a valid cache key.
+        digest = hashlib.md5(identity.encode('utf-8')).hexdigest()
+        retry_after = store.take(KEY.format(scope, kind, digest), capacity, per_minute / 60.0)
+        if retry_after:
+            return retry_after
+    return 0.0
@@ -0,0 +1,133 @@
+import csv
+import io
+import json
+import zipfile
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+
+FIELDS = ['id', 'author', 'title', 'content', 'created', 'updated']
+FORMATS = ('jsonl', 'csv')
+
+
+def iter_records(queryset, chunk_size=2000):
+    """Yield notes as plain dicts, fetched ``chunk_size`` rows at a time."""
+    rows = queryset.order_by('pk').values_list(
+        'pk', 'author__username', 'title', 'content', 'created', 'updated'
+    ).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield dict(zip(FIELDS, row))
+
+
+def jsonl_lines(records):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for record in records:
+        yield encoder.encode(record) + '\n'
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_lines(records):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS)
+    for record in records:
+        yield writer.writerow([
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in (record[field] for field in FIELDS)
+        ])
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Unseekable sink that hands back whatever was written since the last ``drain()``."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def markdown_zip_chunks(records):
+    """
+    Yield a zip archive of one Markdown file per note, one note at a time.
+
+    Only the current note and the archive's central directory (a few dozen bytes per
+    entry) are held in memory.
+    """
+    sink = _StreamBuffer()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for record in records:
+            name = '{}-{}.md'.format(record['id'], slugify(record['title'])[:60] or 'note')
+            info = zipfile.ZipInfo(name, date_time=record['updated'].timetuple()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            body = '# {}\n\n{}\n'.format(record['title'], record['content'] or '')
+            archive.writestr(info, body.encode('utf-8'))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def encode(records, fmt):
+    if fmt == 'jsonl':
+        return jsonl_lines(records)
+    if fmt == 'csv':
+        return csv_lines(records)
+    raise ValueError('Unknown format {!r}.'.format(fmt))
+
+
+class RecordError(ValueError):
+    pass
+
+
+def clean_record(record, title_max_length=150):
+    """Validate one decoded record and return ``(author, title, content, created)``."""
+    if not isinstance(record, dict):
+        raise RecordError('expected an object')
+    title = record.get('title')
+    if not title or not isinstance(title, str):
+        raise RecordError('missing title')
+    if len(title) > title_max_length:
+        raise RecordError('title longer than {} characters'.format(title_max_length))
+    author = record.get('author') or None
+    content = record.get('content')
+    created = record.get('created') or None
+    if created is not None:
+        parsed = parse_datetime(created)
+        if parsed is None:
+            raise RecordError('invalid created timestamp {!r}'.format(created))
+        created = parsed
+    return author, title, content, created
+
+
+def parse_jsonl_chunk(lines):
+    """Decode and clean a chunk of JSON lines; errors are returned in place of records."""
+    results = []
+    for line in lines:
+        try:
+            results.append(clean_record(json.loads(line)))
+        except (ValueError, RecordError) as e:
+            results.append(RecordError(str(e)))
+    return results
+
+
+def parse_csv_chunk(rows):
+    results = []
+    for row in rows:
+        try:
+            results.append(clean_record(row))
+        except RecordError as e:
+            results.append(e)
+    return results
@@ -0,0 +1,94 @@
+"""
+Partial note updates guarded by the note's version.
+
+A note's version is its ``updated`` timestamp, in full precision. ``save_changes``
+writes only the changed columns with a queryset ``update()`` whose WHERE clause also
+matches the version the editor started from: if the note was saved in between, no row
+matches and ``Conflict`` is raised instead of overwriting the other edit.
+
+A text patch is a list of ``{"start", "end", "text"}`` splices in ascending order, with
+offsets counted in characters (code points) of the version being patched. It lets an
+autosaving client send the edit instead of the whole body.
+"""
+from datetime import timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.db import router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+class Conflict(Exception):
+    """The note was changed or deleted since the version the update was based on."""
+
+
+class PatchError(ValueError):
+    pass
+
+
+def get_version(note):
+    return note.updated.isoformat()
+
+
+def parse_version(value):
+    version = parse_datetime(value) if isinstance(value, str) else None
+    if version is None:
+        raise ValueError('Invalid version: {!r}'.format(value))
+    if timezone.is_naive(version):
+        version = timezone.make_aware(version, dt_timezone.utc)
+    return version
+
+
+def apply_patch(text, patch):
+    if not isinstance(patch, list):
+        raise PatchError('A patch is a list of splices')
+    parts, position = [], 0
+    for splice in patch:
+        try:
+            start, end, insert = splice['start'], splice['end'], splice['text']
+        except (KeyError, TypeError):
+            raise PatchError('Every splice needs "start", "end" and "text"')
+        if not (isinstance(start, int) and isinstance(end, int) and isinstance(insert, str)):
+            raise PatchError('"start" and "end" must be integers and "text" a string')
+        if not position <= start <= end <= len(text):
+            raise PatchError('Splices must be in order, not overlap and stay within the text')
+        parts += [text[position:start], insert]
+        position = end
+    parts.append(text[position:])
+    return ''.join(parts)
+
+
+def save_changes(note, fields, version=None, using=None, touch=False):
+    """
+    Save ``fields`` of ``note``, already set on the instance, and bump its version.
+
+    With a ``version`` the write only happens if the stored note still has it, otherwise
+    ``Conflict`` is raised and the instance should be discarded. With ``touch`` the
+    version is bumped even if no field changed, e.g. when only the note's labels did, so
+    the validators of its pages move too. Returns whether anything was written.
+    """
+    from . import bulk
+
+    fields = list(fields)
+    if not fields and not touch:
+        return False
+    model = type(note)
+    using = using or router.db_for_write(model, instance=note)
+    # The live manager: a note moved to the trash is gone for its editor too.
+    queryset = model.objects.using(using).filter(pk=note.pk)
+    if version is not None:
+        queryset = queryset.filter(updated=version)
+    note.updated = timezone.now()
+    attnames = [model._meta.get_field(field).attname for field in fields]
+    values = {attname: getattr(note, attname) for attname in attnames}
+    # Conflict leaves this block, not an enclosing one, rolled back.
+    with transaction.atomic(using=using):
+        if not queryset.update(updated=note.updated, **values):
+            raise Conflict('Note {} was changed or trashed since version {}'.format(note.pk, version))
+        # UPDATE sends no post_save: index, revision, stats and cache, as for bulk_update.
+        bulk.notes_updated([note], using)
+    return True
+
+
+async def asave_changes(note, fields, version=None, using=None, touch=False):
+    return await sync_to_async(save_changes)(note, fields, version, using, touch)
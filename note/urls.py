@@ -1,16 +1,39 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 
 app_name = 'noteapp'
 
-urlpatterns = [
-    path('', views.IndexView.as_view(), name='index'),
-    path('add/', views.AddView.as_view(), name='add'),
-    path('note/<int:pk>/', views.SingleView.as_view(), name='single'),
-    path('note/edit/<int:pk>/', views.EditView.as_view(), name='edit'),
-    path('note/delete/<int:pk>/', views.Delete.as_view(), name='delete'),
-    path('user/login/', views.UserLogin.as_view(), name='login'),
-    path('user/logout/', views.UserLogout.as_view(), name='logout'),
-    path('user/signup/', views.UserSignup.as_view(), name='signup'),
-]
+
+def build_urlpatterns(note_views):
+    """Note routes, with the list/detail/add/edit/delete views taken from ``note_views``."""
+    return [
+        path('', note_views.IndexView.as_view(), name='index'),
+        path('add/', note_views.AddView.as_view(), name='add'),
+        path('note/<int:pk>/', note_views.SingleView.as_view(), name='single'),
+        path('note/edit/<int:pk>/', note_views.EditView.as_view(), name='edit'),
+        path('note/delete/<int:pk>/', note_views.Delete.as_view(), name='delete'),
+        path('note/<int:pk>/revisions/', views.RevisionListView.as_view(), name='revisions'),
+        path('note/<int:pk>/revisions/<int:number>/', views.RevisionDiffView.as_view(), name='revision'),
+        path('note/<int:pk>/revisions/<int:number>/restore/', views.RevisionRestoreView.as_view(),
+             name='revision-restore'),
+        path('download/', views.DownloadView.as_view(), name='download'),
+        path('download/jobs/', views.ExportJobView.as_view(), name='export-job'),
+        path('note/delete-all/', views.DeleteAllView.as_view(), name='delete-all'),
+        path('trash/', views.TrashView.as_view(), name='trash'),
+        path('trash/<int:pk>/restore/', views.RestoreView.as_view(), name='restore'),
+        path('jobs/<int:pk>/', views.JobView.as_view(), name='job'),
+        path('jobs/<int:pk>/download/', views.JobDownloadView.as_view(), name='job-download'),
+        path('user/login/', views.UserLogin.as_view(), name='login'),
+        path('user/logout/', views.UserLogout.as_view(), name='logout'),
+        path('user/signup/', views.UserSignup.as_view(), name='signup'),
+        path('api/notes/', api.NoteListApiView.as_view(), name='api-list'),
+        path('api/notes/<int:pk>/', api.NoteDetailApiView.as_view(), name='api-detail'),
+        path('api/notes/batch/create/', api.NoteBatchCreateApiView.as_view(), name='api-batch-create'),
+        path('api/notes/batch/update/', api.NoteBatchUpdateApiView.as_view(), name='api-batch-update'),
+        path('api/notes/batch/delete/', api.NoteBatchDeleteApiView.as_view(), name='api-batch-delete'),
+        path('api/jobs/<int:pk>/', api.JobApiView.as_view(), name='api-job'),
+    ]
+
+
+urlpatterns = build_urlpatterns(views)
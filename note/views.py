@@ -1,43 +1,81 @@
+import difflib
+
+from django.conf import settings
 from django.contrib.auth import logout
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.views import LoginView, LogoutView
-from django.db.models import Q
+from django.db import transaction
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.shortcuts import redirect, render
 from django.urls import reverse_lazy
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+from django.views import View
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, FormView
+from django.views.generic.detail import SingleObjectMixin
 
+from . import bulk, jobs, listing, revisions, search, stats, tags, tasks, transfer, updates
 from .forms import NoteAddForm, NoteEditForm
-from .mixins import ReMixinLoginRequired, ReMixinGuardDispatchSingleObject
-from .models import Note
+from .mixins import (
+    ReMixinLoginRequired, ReMixinGuardDispatchSingleObject, ReMixinKeysetPagination, ReMixinFragmentCache,
+    ReMixinConditionalGet, ReMixinReplicaReads, ReMixinThrottle,
+)
+from .models import Job, Note, NoteRevision, Tag
 
 
 # Create your views here.
-class IndexView(ReMixinLoginRequired, ListView):
+class IndexView(ReMixinLoginRequired, ReMixinReplicaReads, ReMixinConditionalGet, ReMixinFragmentCache,
+                ReMixinKeysetPagination, ListView):
     model = Note
     template_name = 'note/index.html'
+    fragment_template_name = 'note/fragments/note_list.html'
+    fragment_cache_name = 'list'
     context_object_name = 'note_list'
+    # Max(updated) does not move when a note is deleted; only the count-bearing ETag is trusted.
+    trust_last_modified = False
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        queryset = queryset.filter(author=self.request.user)
+        # The list only shows titles, note bodies are never read for it.
+        queryset = queryset.filter(author=self.request.user).defer('content')
 
         search_query = self.request.GET.get('search', '')
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(content__icontains=search_query)
-            )
+            queryset = search.get_backend(queryset.db).search(queryset, search_query)
+        for kind in (Tag.FOLDER, Tag.TAG):
+            if self.request.GET.get(kind):
+                queryset = tags.filter_notes(queryset, self.request.user, kind, self.request.GET[kind])
 
         return queryset
 
+    def get_context_data(self, **kwargs):
+        kwargs.update(listing.list_filters(self.request), note_stats=stats.for_user(self.request.user))
+        return super().get_context_data(**kwargs)
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+        listing.add_row_urls(object_list)
+        return paginator, page, object_list, is_paginated
+
+    def get_validators(self):
+        return listing.list_validators(self.request, self.get_queryset())
+
 
-class SingleView(ReMixinLoginRequired, ReMixinGuardDispatchSingleObject, DetailView):
+class SingleView(ReMixinLoginRequired, ReMixinReplicaReads, ReMixinConditionalGet, ReMixinFragmentCache,
+                 ReMixinGuardDispatchSingleObject, DetailView):
     model = Note
     template_name = 'note/single.html'
+    fragment_template_name = 'note/fragments/note_detail.html'
+    fragment_cache_name = 'detail'
     context_object_name = 'note'
 
-    def test_func(self):
-        item = self.get_object()
-        return item.author == self.request.user
+    def get_validators(self):
+        try:
+            note = self.get_object()
+        except Http404:
+            return None, None
+        return listing.note_validators(self.request, note)
 
 
 class AddView(ReMixinLoginRequired, CreateView):
@@ -48,38 +86,270 @@ class AddView(ReMixinLoginRequired, CreateView):
 
     def form_valid(self, form):
         form.instance.author = self.request.user
-        return super().form_valid(form)
+        # The note, its tags and the author's stats are written together or not at all.
+        with transaction.atomic():
+            response = super().form_valid(form)
+            if form.labels_changed():
+                form.save_labels(self.object)
+        return response
 
 
-class EditView(ReMixinLoginRequired, ReMixinGuardDispatchSingleObject, UpdateView):
+class EditView(ReMixinLoginRequired, ReMixinReplicaReads, ReMixinGuardDispatchSingleObject, UpdateView):
     model = Note
     form_class = NoteEditForm
     template_name = 'note/edit.html'
     pk_url_kwarg = 'pk'
     success_url = reverse_lazy('noteapp:index')
 
-    def test_func(self):
-        item = self.get_object()
-        return item.author == self.request.user
+    def get_initial(self):
+        folder, tag_names = tags.get_labels(self.object)
+        return dict(super().get_initial(), folder=folder, tags=tag_names)
+
+    def form_valid(self, form):
+        try:
+            form.save_changes()
+        except updates.Conflict:
+            return self.form_conflict(form)
+        return redirect(self.get_success_url())
+
+    def form_conflict(self, form):
+        current = Note.objects.filter(pk=form.instance.pk).first()
+        if current is None:
+            return render(self.request, 'note/custom_error.html', context={
+                'error_message': 'Bad Request: The note was deleted while you were editing it'
+            }, status=400)
+        # Keep the user's text; submitting again is based on the current version and overwrites it.
+        form.data = form.data.copy()
+        form.data['version'] = updates.get_version(current)
+        form.add_error(None, 'This note was changed since you opened it. Submit again to overwrite those changes.')
+        return self.render_to_response(self.get_context_data(form=form), status=409)
 
 
-class Delete(ReMixinLoginRequired, ReMixinGuardDispatchSingleObject, DeleteView):
+class Delete(ReMixinLoginRequired, ReMixinReplicaReads, ReMixinGuardDispatchSingleObject, DeleteView):
     model = Note
     template_name = 'note/delete.html'
     pk_url_kwarg = 'pk'
     success_url = reverse_lazy('noteapp:index')
 
-    def test_func(self):
-        item = self.get_object()
-        return item.author == self.request.user
+    def form_valid(self, form):
+        # To the trash; purge_trash deletes it for good after NOTE_TRASH_DAYS.
+        bulk.trash_notes(Note.objects.filter(pk=self.object.pk))
+        return redirect(self.get_success_url())
+
+
+class TrashView(ReMixinLoginRequired, ListView):
+    """The user's notes in the trash, last deleted first (note_trash_idx)."""
+    template_name = 'note/trash.html'
+    context_object_name = 'note_list'
+    paginate_by = 25
+
+    def get_queryset(self):
+        return Note.all_objects.filter(author=self.request.user, deleted__isnull=False).defer('content').order_by(
+            '-deleted', '-pk',
+        )
+
+    def get_context_data(self, **kwargs):
+        kwargs['trash_days'] = getattr(settings, 'NOTE_TRASH_DAYS', 30)
+        return super().get_context_data(**kwargs)
+
+
+class RestoreView(ReMixinLoginRequired, ReMixinGuardDispatchSingleObject, SingleObjectMixin, View):
+    queryset = Note.all_objects.filter(deleted__isnull=False)
+
+    def post(self, request, *args, **kwargs):
+        bulk.restore_notes(Note.all_objects.filter(pk=self.get_object().pk))
+        return redirect('noteapp:trash')
+
+
+class RevisionListView(ReMixinLoginRequired, ReMixinGuardDispatchSingleObject, DetailView):
+    model = Note
+    template_name = 'note/revisions.html'
+    context_object_name = 'note'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['revisions'] = self.object.revisions.only('number', 'title', 'created')
+        return context
+
+
+class ReMixinRevision(ReMixinGuardDispatchSingleObject):
+    def get_revision(self, number):
+        try:
+            return revisions.rebuild(self.get_object(), number)
+        except NoteRevision.DoesNotExist:
+            return None
+
+    def revision_not_found(self):
+        return render(self.request, 'note/custom_error.html', context={
+            'error_message': 'Bad Request: No revision found matching the query'
+        }, status=400)
+
+
+class RevisionDiffView(ReMixinLoginRequired, ReMixinRevision, DetailView):
+    model = Note
+    template_name = 'note/revision_diff.html'
+    context_object_name = 'note'
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        number = kwargs['number']
+        revision = self.get_revision(number)
+        try:
+            against = int(request.GET.get('against', number - 1))
+        except ValueError:
+            against = number - 1
+        previous = self.get_revision(against) if against > 0 else None
+        if revision is None or (against > 0 and previous is None):
+            return self.revision_not_found()
+
+        diff = difflib.unified_diff(
+            (previous[1] if previous else '').splitlines(), revision[1].splitlines(), lineterm='', n=3,
+        )
+        context = self.get_context_data(
+            number=number, against=against if previous else None,
+            revision_title=revision[0], revision_content=revision[1], version=updates.get_version(self.object),
+            diff=[(line[:1], line) for line in list(diff)[2:]],
+        )
+        return self.render_to_response(context)
+
+
+class RevisionRestoreView(ReMixinLoginRequired, ReMixinRevision, SingleObjectMixin, View):
+    model = Note
+
+    def post(self, request, *args, **kwargs):
+        note = self.get_object()
+        try:
+            # The version of the note the user was looking at when choosing to restore.
+            version = updates.parse_version(request.POST['version']) if request.POST.get('version') else None
+        except ValueError:
+            return self.restore_error('Bad Request: Invalid version', status=400)
+        try:
+            with transaction.atomic():
+                revision = self.get_revision(kwargs['number'])
+                if revision is None:
+                    return self.revision_not_found()
+                # Restoring is an edit too, so it adds a new revision instead of dropping the later ones.
+                note.title, note.content = revision
+                updates.save_changes(note, ['title', 'content'], version)
+        except updates.Conflict:
+            return self.restore_error('Conflict: The note was changed since you opened this revision', status=409)
+        return redirect(note)
+
+    def restore_error(self, message, status):
+        return render(self.request, 'note/custom_error.html', context={'error_message': message}, status=status)
+
+
+class DownloadView(ReMixinLoginRequired, View):
+    """Stream all of the user's notes as JSON Lines, CSV or a zip of Markdown files."""
+    formats = {
+        'jsonl': ('application/jsonl; charset=utf-8', 'notes.jsonl'),
+        'csv': ('text/csv; charset=utf-8', 'notes.csv'),
+        'md': ('application/zip', 'notes.zip'),
+    }
+    chunk_size = 500
+    # Text formats are buffered into blocks of roughly this many bytes before being sent.
+    block_size = 64 * 1024
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.GET.get('format', 'jsonl')
+        if fmt not in self.formats:
+            return render(request, 'note/custom_error.html', context={
+                'error_message': 'Bad Request: unknown format {}'.format(fmt)
+            }, status=400)
+
+        content_type, filename = self.formats[fmt]
+        records = transfer.iter_records(Note.objects.filter(author=request.user), chunk_size=self.chunk_size)
+        gzipped = False
+        if fmt == 'md':
+            content = transfer.markdown_zip_chunks(records)
+        else:
+            content = self._blocks(transfer.encode(records, fmt))
+            gzipped = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+            if gzipped:
+                content = compress_sequence(content)
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
+        if gzipped:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    def _blocks(self, lines):
+        block, size = [], 0
+        for line in lines:
+            encoded = line.encode('utf-8')
+            block.append(encoded)
+            size += len(encoded)
+            if size >= self.block_size:
+                yield b''.join(block)
+                block, size = [], 0
+        if block:
+            yield b''.join(block)
+
+
+class ExportJobView(ReMixinLoginRequired, View):
+    """Queue an export of all of the user's notes to a file, see ``note.tasks.export_notes``."""
+
+    def post(self, request, *args, **kwargs):
+        fmt = request.POST.get('format', 'jsonl')
+        if fmt not in tasks.EXPORT_FORMATS:
+            return render(request, 'note/custom_error.html', context={
+                'error_message': 'Bad Request: unknown format {}'.format(fmt)
+            }, status=400)
+        job = jobs.enqueue('export_notes', user=request.user, user_id=request.user.pk, format=fmt)
+        return redirect(job)
+
+
+class DeleteAllView(ReMixinLoginRequired, View):
+    """Queue the deletion of all of the user's notes, which may be thousands of rows."""
+    template_name = 'note/delete_all.html'
+
+    def get(self, request, *args, **kwargs):
+        return render(request, self.template_name)
+
+    def post(self, request, *args, **kwargs):
+        job = jobs.enqueue('delete_notes', user=request.user, user_id=request.user.pk)
+        return redirect(job)
+
+
+class JobView(ReMixinLoginRequired, ReMixinGuardDispatchSingleObject, DetailView):
+    """Status of one of the user's background jobs; the page reloads itself until the job is done."""
+    model = Job
+    owner_field = 'user'
+    template_name = 'note/job.html'
+    context_object_name = 'job'
+
+
+class JobDownloadView(ReMixinLoginRequired, ReMixinGuardDispatchSingleObject, SingleObjectMixin, View):
+    model = Job
+    owner_field = 'user'
+
+    def get(self, request, *args, **kwargs):
+        job = self.get_object()
+        if job.task != 'export_notes' or job.status != Job.SUCCEEDED:
+            return render(request, 'note/custom_error.html', context={
+                'error_message': 'Bad Request: The job has no file to download'
+            }, status=400)
+        content_type, filename = DownloadView.formats[job.result['format']]
+        return FileResponse(
+            default_storage.open(job.result['file']), as_attachment=True, filename=filename, content_type=content_type,
+        )
+
+
+def logout_signed_in_user(request):
+    # Logout the user before; an anonymous visitor has no session to flush or write.
+    if request.user.is_authenticated:
+        logout(request)
 
 
-class UserLogin(LoginView):
+class UserLogin(ReMixinThrottle, LoginView):
     template_name = 'note/login.html'
+    throttle_scope = 'login'
     success_url = reverse_lazy('noteapp:index')
 
     def dispatch(self, request, *args, **kwargs):
-        logout(request)  # Logout the user before
+        logout_signed_in_user(request)
         return super().dispatch(request, *args, **kwargs)
 
     def get_success_url(self):
@@ -94,13 +364,14 @@ class UserLogout(ReMixinLoginRequired, LogoutView):
         return self.success_url
 
 
-class UserSignup(FormView):
+class UserSignup(ReMixinThrottle, FormView):
     template_name = 'note/signup.html'
+    throttle_scope = 'signup'
     form_class = UserCreationForm
     success_url = reverse_lazy('noteapp:login')
 
     def dispatch(self, request, *args, **kwargs):
-        logout(request)  # Logout the user before
+        logout_signed_in_user(request)
         return super().dispatch(request, *args, **kwargs)
 
     def form_valid(self, form):